@@ -0,0 +1,194 @@
+# backend/cache/hold_expiry.py
+"""
+React to seat hold and reservation expirations.
+
+Per-seat holds (`{show:<id>}:hold:<seat>`) end by PEXPIRE, which nothing in
+the app observes. This listener subscribes to Redis keyevent `expired`
+notifications, records each expired hold's seat as free in the show's seat
+log and emits `seat_released` through `emit_seat_update`. The broadcaster
+then merges a burst of expirations into one diff per show. An expired
+`{show:<id>}:reservation:<n>` makes the listener reclaim that show's expired
+count-based reservations, so their seats return to capacity right away.
+
+Every process that serves websockets starts the listener, but only the one
+holding `HOLD_EXPIRY_LEADER_KEY` subscribes, so each expiry is broadcast
+once. The others retry the lock and take over if the leader goes away.
+Redis must have `notify-keyspace-events` containing `Ex`. The listener tries
+to enable that itself, which managed Redis services may refuse.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+HOLD_EXPIRY_LEADER_KEY = "hold_expiry:leader"
+LEADER_TTL_SECONDS = 30
+LEADER_RENEW_SECONDS = 10
+EXPIRED_PATTERN = "__keyevent@*__:expired"
+
+_HOLD_KEY_RE = re.compile(r"^\{show:(\d+)\}:hold:(.+)$")
+_RESERVATION_KEY_RE = re.compile(r"^\{show:(\d+)\}:reservation:\d+$")
+
+
+def _default_redis():
+    from cache.seat_cache import seat_cache
+    return seat_cache.get_redis()
+
+
+def parse_hold_key(key: str) -> Optional[Tuple[int, str]]:
+    """Return (show_id, seat_id) for a hold key, else None."""
+    match = _HOLD_KEY_RE.match(key)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def handle_expired_key(key: str) -> bool:
+    """Emit `seat_released` for an expired hold key and reclaim capacity for
+    an expired reservation key; other keys are ignored."""
+    from cache.seat_cache import seat_cache
+
+    reservation = _RESERVATION_KEY_RE.match(key)
+    if reservation:
+        # Seat-hold reservations expire here too; nothing pending means nothing to do
+        result = seat_cache.reclaim_expired_reservations(int(reservation.group(1)), source='listener')
+        return result['reservations'] > 0
+
+    parsed = parse_hold_key(key)
+    if parsed is None:
+        return False
+    show_id, seat_id = parsed
+    from sockets import emit_seat_update
+    version = seat_cache.mark_seats_free(show_id, [seat_id])
+    if not version:
+        # Held again already, or Redis is unavailable
+        return False
+    # The key's value (the reservation id) is gone once it has expired
+    emit_seat_update(show_id, 'seat_released', {'reservation_id': None, 'seats': [seat_id], 'expired': True, 'version': version})
+    return True
+
+
+def enable_expiry_notifications(r) -> bool:
+    """Make sure `notify-keyspace-events` includes expired keyevents (`Ex`)."""
+    try:
+        current = r.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+        if ("E" in current and "x" in current) or ("E" in current and "A" in current):
+            return True
+        r.config_set("notify-keyspace-events", "".join(sorted(set(current + "Ex"))))
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Could not enable keyspace expiry notifications ({e}); set notify-keyspace-events=Ex on the server")
+        return False
+
+
+def _node_clients(r) -> List:
+    # Keyspace notifications are per node, so on a cluster listen to every primary
+    if hasattr(r, "get_primaries"):
+        return [r.get_redis_connection(node) for node in r.get_primaries()]
+    return [r]
+
+
+class _Leadership:
+    """Renewable Redis lock deciding which process runs the subscription."""
+
+    def __init__(self, r):
+        self.r = r
+        self.token = uuid.uuid4().hex
+        self.renewed_at = 0.0
+
+    def acquire(self) -> bool:
+        if self.r.set(HOLD_EXPIRY_LEADER_KEY, self.token, nx=True, ex=LEADER_TTL_SECONDS):
+            self.renewed_at = time.monotonic()
+            return True
+        return False
+
+    def renew(self) -> bool:
+        if time.monotonic() - self.renewed_at < LEADER_RENEW_SECONDS:
+            return True
+        if self.r.get(HOLD_EXPIRY_LEADER_KEY) != self.token:
+            return False
+        self.r.expire(HOLD_EXPIRY_LEADER_KEY, LEADER_TTL_SECONDS)
+        self.renewed_at = time.monotonic()
+        return True
+
+    def release(self):
+        try:
+            if self.r.get(HOLD_EXPIRY_LEADER_KEY) == self.token:
+                self.r.delete(HOLD_EXPIRY_LEADER_KEY)
+        except redis.RedisError:
+            pass
+
+
+def _subscribe_and_dispatch(r, leadership: _Leadership):
+    pubsubs = []
+    try:
+        for node in _node_clients(r):
+            enable_expiry_notifications(node)
+            pubsub = node.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(EXPIRED_PATTERN)
+            pubsubs.append(pubsub)
+        logger.info("Hold expiry listener subscribed")
+        while leadership.renew():
+            for pubsub in pubsubs:
+                # Poll rather than listen() so the shared pool's socket_timeout
+                # does not fire on a quiet channel
+                message = pubsub.get_message(timeout=1.0 / len(pubsubs))
+                if message is None:
+                    continue
+                key = message.get("data")
+                if isinstance(key, bytes):
+                    key = key.decode()
+                try:
+                    handle_expired_key(key)
+                except Exception as e:
+                    logger.exception(f"Failed to publish hold expiry for {key}: {e}")
+        logger.info("Hold expiry listener lost leadership")
+    finally:
+        for pubsub in pubsubs:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+
+def _listen(redis_getter: Callable):
+    leadership = None
+    while True:
+        try:
+            r = redis_getter()
+            if leadership is None:
+                leadership = _Leadership(r)
+            if leadership.acquire():
+                try:
+                    _subscribe_and_dispatch(r, leadership)
+                finally:
+                    leadership.release()
+            else:
+                time.sleep(LEADER_RENEW_SECONDS)
+        except Exception as e:
+            logger.warning(f"Hold expiry listener disconnected: {e}")
+            time.sleep(5)
+
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def start_hold_expiry_listener(redis_getter: Callable = _default_redis):
+    """Start this process's hold expiry listener thread once (again after fork)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen, args=(redis_getter,), name="hold-expiry", daemon=True).start()
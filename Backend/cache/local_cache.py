@@ -0,0 +1,361 @@
+# backend/cache/local_cache.py
+"""
+In-process LRU/TTL cache layered in front of Redis for hot read paths.
+
+`LocalCache` is a bounded per-process dict with a TTL per entry.
+`TwoTierCache` puts a `LocalCache` in front of JSON values stored in Redis.
+Invalidations are published on the `cache:invalidate` Redis channel; every
+process runs one listener thread that drops the matching local entries, so
+a change made in one worker is not served stale by another.
+
+A load that started before an invalidation must not write its result back
+afterwards. Each key has a generation, bumped locally on every discard and
+in Redis on every invalidate; `get_or_load` only stores what it loaded when
+neither generation moved while the loader ran.
+
+Hit/miss counters for every named cache are returned by `cache_stats()`
+(exposed at /admin/cache/stats).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_MISSING = object()
+
+# KEYS: entry, generation. ARGV: json value, ttl seconds, generation seen
+# before loading. Stores the value only if nothing invalidated it since.
+_SET_IF_GENERATION_LUA = r"""
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+# name -> LocalCache, for the invalidation listener
+_registry: Dict[str, "LocalCache"] = {}
+# name -> LocalCache or TwoTierCache, for cache_stats()
+_stats_sources: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _default_redis():
+    from cache.seat_cache import seat_cache
+    return seat_cache.get_redis()
+
+
+class LocalCache:
+    """Size-bounded, TTL-expiring LRU dict for one process."""
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 30.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by discard(); a whole-cache discard moves the epoch instead
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        with _registry_lock:
+            _registry[name] = self
+            _stats_sources[name] = self
+
+    def get(self, key, default=None):
+        key = str(key)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        key = str(key)
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: str, value, ttl: Optional[float]):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self, key):
+        """Opaque token that changes whenever `key` is discarded."""
+        key = str(key)
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set_if_generation(self, key, value, generation) -> bool:
+        """`set` unless the key was discarded since `generation` was taken."""
+        key = str(key)
+        with self._lock:
+            if (self._epoch, self._generations.get(key, 0)) != generation:
+                return False
+            self._store(key, value, None)
+            return True
+
+    def discard(self, key=None):
+        """Drop one key, or everything when `key` is None. Local only."""
+        with self._lock:
+            if key is None or len(self._generations) >= self.maxsize * 4:
+                # Moving the epoch also covers every per-key generation dropped here
+                self._epoch += 1
+                self._generations.clear()
+            if key is None:
+                self._data.clear()
+            else:
+                key = str(key)
+                self._data.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self.invalidations += 1
+
+    def invalidate(self, key=None, redis_getter: Callable = _default_redis):
+        """Drop the key here and tell every other process to drop it too."""
+        self.discard(key)
+        publish_invalidation(self.name, key, redis_getter)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class TwoTierCache:
+    """JSON values in Redis (`cache:{<name>:<key>}`) with a `LocalCache` in front.
+
+    Each entry has a generation counter next to it (same hash slot), which
+    `invalidate` increments; `get_or_load` writes its result with a
+    compare-and-set on that counter.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 30.0, redis_ttl: int = 300,
+                 redis_getter: Callable = _default_redis):
+        self.name = name
+        self.local = LocalCache(name, maxsize=maxsize, ttl=ttl)
+        self.redis_ttl = redis_ttl
+        self._redis_getter = redis_getter
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.stale_loads = 0
+        self._set_script = None
+        self._set_script_client = None
+        with _registry_lock:
+            _stats_sources[name] = self
+
+    def _key(self, key) -> str:
+        # Hash-tagged so the entry and its generation share a cluster slot
+        return f"cache:{{{self.name}:{key}}}"
+
+    def _gen_key(self, key) -> str:
+        return self._key(key) + ":gen"
+
+    def _set_if_generation(self, r):
+        # Script objects are bound to the client that registered them
+        if self._set_script is None or self._set_script_client is not r:
+            self._set_script = r.register_script(_SET_IF_GENERATION_LUA)
+            self._set_script_client = r
+        return self._set_script
+
+    def _lookup(self, key):
+        """(value or _MISSING, Redis generation or None if Redis is unavailable)."""
+        try:
+            r = self._redis_getter()
+            ensure_invalidation_listener(self._redis_getter)
+            data, generation = r.mget(self._key(key), self._gen_key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for {self.name} cache get: {e}")
+            return _MISSING, None
+        generation = int(generation or 0)
+        if data is None:
+            self.redis_misses += 1
+            return _MISSING, generation
+        self.redis_hits += 1
+        return json.loads(data), generation
+
+    def get(self, key, default=None):
+        local_generation = self.local.generation(key)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value, _ = self._lookup(key)
+        if value is _MISSING:
+            return default
+        self.local.set_if_generation(key, value, local_generation)
+        return value
+
+    def set(self, key, value):
+        """Unconditional write; for results of a load, use `get_or_load`."""
+        self.local.set(key, value)
+        try:
+            r = self._redis_getter()
+            ensure_invalidation_listener(self._redis_getter)
+            r.set(self._key(key), json.dumps(value), ex=self.redis_ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for {self.name} cache set: {e}")
+
+    def get_or_load(self, key, loader: Callable[[], Any]):
+        """Return the cached value, calling `loader` on a miss. None results are not cached.
+
+        The result is returned either way, but only stored when the key was
+        not invalidated (here or in any other process) while `loader` ran.
+        """
+        local_generation = self.local.generation(key)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value, generation = self._lookup(key)
+        if value is not _MISSING:
+            self.local.set_if_generation(key, value, local_generation)
+            return value
+
+        value = loader()
+        if value is None:
+            return value
+        if generation is not None:
+            try:
+                r = self._redis_getter()
+                stored = self._set_if_generation(r)(
+                    keys=[self._key(key), self._gen_key(key)],
+                    args=[json.dumps(value), self.redis_ttl, generation],
+                )
+            except redis.RedisError as e:
+                logger.warning(f"Redis unavailable for {self.name} cache set: {e}")
+                stored = 1
+            if not stored:
+                self.stale_loads += 1
+                return value
+        if not self.local.set_if_generation(key, value, local_generation):
+            self.stale_loads += 1
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key (or the whole cache) locally, in Redis and in every other process."""
+        self.local.discard(key)
+        try:
+            if key is not None:
+                # Bump first: a load that already passed its check has written
+                # by the time the DELETE runs, and any later check fails
+                pipe = self._redis_getter().pipeline(transaction=False)
+                pipe.incr(self._gen_key(key))
+                # Only has to outlive loads that started before this call
+                pipe.expire(self._gen_key(key), self.redis_ttl)
+                pipe.delete(self._key(key))
+                pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for {self.name} cache invalidation: {e}")
+        # Whole-cache invalidation leaves Redis entries to expire via redis_ttl
+        publish_invalidation(self.name, key, self._redis_getter)
+
+    def stats(self) -> Dict[str, Any]:
+        out = self.local.stats()
+        out["redis_hits"] = self.redis_hits
+        out["redis_misses"] = self.redis_misses
+        out["stale_loads"] = self.stale_loads
+        return out
+
+
+def publish_invalidation(name: str, key=None, redis_getter: Callable = _default_redis):
+    try:
+        redis_getter().publish(INVALIDATION_CHANNEL, json.dumps({"cache": name, "key": None if key is None else str(key)}))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to publish invalidation for {name}: {e}")
+
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _listen(redis_getter: Callable):
+    while True:
+        try:
+            pubsub = redis_getter().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                # Poll rather than listen() so the shared pool's socket_timeout
+                # does not fire on a quiet channel
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                    cache = _registry.get(data.get("cache"))
+                    if cache is not None:
+                        cache.discard(data.get("key"))
+                except (TypeError, ValueError):
+                    continue
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected: {e}")
+            # Anything published while disconnected was missed; start clean
+            for cache in list(_registry.values()):
+                cache.discard()
+            time.sleep(5)
+
+
+def ensure_invalidation_listener(redis_getter: Callable = _default_redis):
+    """Start this process's invalidation listener thread once (again after fork)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen, args=(redis_getter,), name="cache-invalidation", daemon=True).start()
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters for every named cache in this process."""
+    with _registry_lock:
+        sources = dict(_stats_sources)
+    return {name: source.stats() for name, source in sources.items()}
+
+
+# Shared caches for hot read paths; TTLs come from Config (*_LOCAL_TTL_SECONDS,
+# HOT_CACHE_REDIS_TTL_SECONDS)
+# Show metadata by show id, plus the full listing under "all"
+show_cache = TwoTierCache("show", maxsize=1024, ttl=Config.SHOW_CACHE_LOCAL_TTL_SECONDS,
+                          redis_ttl=Config.HOT_CACHE_REDIS_TTL_SECONDS)
+# Active offer listing under "active", single offers under "code:<code>"
+offer_cache = TwoTierCache("offer", maxsize=512, ttl=Config.OFFER_CACHE_LOCAL_TTL_SECONDS,
+                           redis_ttl=Config.HOT_CACHE_REDIS_TTL_SECONDS)
+
+
+def invalidate_show(show_id=None, listing=True):
+    """Drop a show's cached metadata (if given) and the cached show listing.
+
+    Pass listing=False when only the seat count changed: the listing serves
+    live capacities from Redis, so its cached copy does not go stale.
+    """
+    if show_id is not None:
+        show_cache.invalidate(show_id)
+    if listing:
+        show_cache.invalidate("all")
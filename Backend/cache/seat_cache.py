@@ -5,12 +5,56 @@ Redis-based seat booking cache with atomic operations using Lua scripts.
 This module provides a SeatCache class with Lua scripts registered on startup.
 If Redis or script registration fails at startup, the instance will provide
 safe fallbacks that raise ConnectionError; callers should handle degraded mode.
+
+Every key belonging to a show carries the `{show:<id>}` hash tag, so all of a
+show's keys map to one Redis Cluster slot and a script only ever touches one
+node:
+
+    {show:<id>}:capacity              remaining seats
+    {show:<id>}:reservation_seq       per-show reservation id sequence
+    {show:<id>}:reservation:<n>       pending reservation (hash, expires)
+    {show:<id>}:pending               sorted set: count-based reservation -> expiry (ms)
+    {show:<id>}:pending_seats         hash: count-based reservation -> seats taken
+    {show:<id>}:inventory_rev         bumped by every script that changes capacity or pending
+    {show:<id>}:hold:<seat>           per-seat hold -> reservation id
+    {show:<id>}:booking:<n>           confirmed booking (hash)
+    {show:<id>}:seat_version          seat state version, bumped on every change
+    {show:<id>}:seat_log              sorted set: seat -> version of its last change
+    {show:<id>}:seat_state            hash: seat -> 'held:<reservation>' | 'free' | 'booked'
+
+Reservation ids are therefore unique per show, not globally. Scripts get
+their keys through KEYS; where a key is derived inside the script (the
+reservation key from the new id, hold keys from a reservation's seat list)
+the script is given the hash-tagged prefix in KEYS instead.
+
+Count-based reservations take seats straight off `capacity` without a
+per-show lock. Each one is tracked in `pending` with its expiry; one that
+is neither confirmed nor released in time has its seats given back by the
+next reservation for the show, by the hold expiry listener when the
+reservation key expires, or by the `sweep_expired_reservations` Celery
+task, whichever comes first.
+
+The cached capacity should always equal the DB's remaining capacity minus
+the seats in `pending`. `get_inventory_states` reads what is needed to check
+that for a batch of shows and `repair_show_capacities` fixes any that drifted; it only writes if `inventory_rev` is
+unchanged since the caller read it, so a booking that lands in between is
+never overwritten with a stale DB value.
+
+The hold, confirm and release scripts bump `seat_version` and record each
+changed seat in `seat_log`/`seat_state` in the same call. A client that
+knows version N can ask for just the seats changed after N with
+`get_seat_changes`.
 """
 
 import logging
 from typing import Optional, Dict, List
 
 import redis
+
+from cache.local_cache import LocalCache, ensure_invalidation_listener, publish_invalidation
+from cache.seat_map_codec import encode_seat_map, decode_seat_map
+from config import Config
+from utils.redis_pool import get_redis_client
 try:
     # optional sockets integration
     from sockets import emit_seat_update
@@ -19,12 +63,87 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# How long a count-based reservation lives before it must be confirmed
+RESERVATION_TTL_SECONDS = 300
+
+# Shows that may have pending count-based reservations, for the sweeper
+PENDING_SHOWS_KEY = "reservations:pending_shows"
+# Cross-process counters for reclaimed reservations (see reservation_reaper_stats)
+REAPER_METRICS_KEY = "metrics:reservation_reaper"
+
+
+# Prepended to scripts that reserve capacity: count-based reservations that
+# passed their expiry without a confirm or release give their seats back.
+_RECLAIM_LUA = r"""
+local function now_ms()
+    local t = redis.call('TIME')
+    return tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+end
+
+local function reclaim_expired(capacity_key, pending_key, pending_seats_key, rev_key, now, limit)
+    local expired = redis.call('ZRANGEBYSCORE', pending_key, '-inf', now, 'LIMIT', 0, limit)
+    if #expired > 0 then
+        redis.call('INCR', rev_key)
+    end
+    local restored = 0
+    for _, reservation_id in ipairs(expired) do
+        local seats = tonumber(redis.call('HGET', pending_seats_key, reservation_id) or '0')
+        if seats > 0 then
+            redis.call('INCRBY', capacity_key, seats)
+            restored = restored + seats
+        end
+        redis.call('ZREM', pending_key, reservation_id)
+        redis.call('HDEL', pending_seats_key, reservation_id)
+    end
+    return {#expired, restored}
+end
+"""
+
+# Prepended to the reconciliation scripts
+_INVENTORY_LUA = r"""
+local function pending_seat_total(pending_seats_key)
+    local total = 0
+    for _, seats in ipairs(redis.call('HVALS', pending_seats_key)) do
+        total = total + tonumber(seats)
+    end
+    return total
+end
+"""
+
+# Prepended to the seat hold scripts: bump the show's seat version and record
+# the new state of each changed seat. KEYS for the three seat_* keys are passed
+# in by the caller script.
+_SEAT_LOG_LUA = r"""
+local function record_seat_changes(version_key, log_key, state_key, seats, state)
+    local version = redis.call('INCR', version_key)
+    for _, seat in ipairs(seats) do
+        redis.call('ZADD', log_key, version, seat)
+        redis.call('HSET', state_key, seat, state)
+    end
+    return version
+end
+
+local function split_csv(csv)
+    local out = {}
+    for seat in string.gmatch(csv or '', '([^,]+)') do
+        table.insert(out, seat)
+    end
+    return out
+end
+"""
+
+
+def show_key(show_id, *parts) -> str:
+    """Key in the show's hash slot, e.g. show_key(5, 'hold', 'A1') -> '{show:5}:hold:A1'."""
+    return ":".join([f"{{show:{show_id}}}", *(str(p) for p in parts)])
+
 
 class SeatCache:
     """Redis-backed seat cache and atomic reservation helpers."""
 
     def __init__(self):
         self._redis = None
+        self._seat_map_local = LocalCache("seat_map", maxsize=Config.SEAT_MAP_LRU_SIZE, ttl=Config.SEAT_MAP_LOCAL_TTL_SECONDS)
 
         # fallback callable used when scripts cannot be registered
         def _scripts_unavailable(*args, **kwargs):
@@ -38,55 +157,74 @@ class SeatCache:
                 return _scripts_unavailable
 
         try:
-            # Reserve seats (count-based) - returns reservation id and new capacity
-            self.reserve_seats_script = _register(r"""
-                local show_key = KEYS[1]
-                local capacity_key = KEYS[2]
-                local lock_key = KEYS[3]
+            # Reserve seats (count-based) - returns reservation id and new capacity.
+            # No per-show lock: the check and DECRBY run inside one script, so
+            # concurrent buyers of the same show proceed in parallel
+            self.reserve_seats_script = _register(_RECLAIM_LUA + r"""
+                local capacity_key = KEYS[1]
+                local seq_key = KEYS[2]
+                local reservation_prefix = KEYS[3]
+                local pending_key = KEYS[4]
+                local pending_seats_key = KEYS[5]
+                local rev_key = KEYS[6]
                 local requested_seats = tonumber(ARGV[1])
-                local lock_timeout = tonumber(ARGV[2])
-
-                if redis.call('SETNX', lock_key, '1') == 0 then
-                    return redis.error_reply('LOCK_ACQUISITION_FAILED')
-                end
+                local show_id = ARGV[2]
+                local ttl = tonumber(ARGV[3])
 
-                redis.call('PEXPIRE', lock_key, lock_timeout)
+                local now = now_ms()
+                local reclaimed = reclaim_expired(capacity_key, pending_key, pending_seats_key, rev_key, now, 100)
 
                 local current_capacity = tonumber(redis.call('GET', capacity_key) or '0')
                 if current_capacity < requested_seats then
-                    redis.call('DEL', lock_key)
-                    return redis.error_reply('INSUFFICIENT_CAPACITY')
+                    -- Not an error reply, so the caller still learns what was reclaimed
+                    return {-1, current_capacity, reclaimed[1], reclaimed[2]}
                 end
 
-                local new_capacity = current_capacity - requested_seats
-                redis.call('SET', capacity_key, tostring(new_capacity))
+                local new_capacity = redis.call('DECRBY', capacity_key, requested_seats)
 
-                local reservation_id = redis.call('INCR', 'reservation_counter')
-                local reservation_key = 'reservation:' .. reservation_id
-                redis.call('HMSET', reservation_key,
-                    'show_id', show_key,
+                local reservation_id = redis.call('INCR', seq_key)
+                local reservation_key = reservation_prefix .. reservation_id
+                redis.call('HSET', reservation_key,
+                    'show_id', show_id,
                     'seats_reserved', tostring(requested_seats),
                     'timestamp', redis.call('TIME')[1]
                 )
-                redis.call('EXPIRE', reservation_key, 300)
+                redis.call('EXPIRE', reservation_key, ttl)
+                redis.call('ZADD', pending_key, now + ttl * 1000, reservation_id)
+                redis.call('HSET', pending_seats_key, reservation_id, requested_seats)
+                redis.call('INCR', rev_key)
 
-                return {reservation_id, new_capacity}
+                return {reservation_id, new_capacity, reclaimed[1], reclaimed[2]}
             """)
 
-            # Confirm a reservation and release lock
+            # Give back the seats of expired count-based reservations; returns
+            # {reservations, seats} reclaimed. ZREM inside the script makes each
+            # reservation's seats come back exactly once, whoever reclaims it
+            self.reclaim_expired_script = _register(_RECLAIM_LUA + r"""
+                return reclaim_expired(KEYS[1], KEYS[2], KEYS[3], KEYS[4], now_ms(), tonumber(ARGV[1]))
+            """)
+
+            # Confirm a reservation. The pending entry, not the reservation
+            # hash, decides: a reservation that outlived its TTL but was not
+            # reclaimed yet can still be confirmed, and a reclaimed one cannot
             self.confirm_booking_script = _register(r"""
                 local reservation_key = KEYS[1]
-                local lock_key = KEYS[2]
-                local booking_key = KEYS[3]
-                local user_id = ARGV[1]
-                local show_id = ARGV[2]
-                local seats = ARGV[3]
-
-                if redis.call('EXISTS', reservation_key) == 0 then
+                local booking_key = KEYS[2]
+                local pending_key = KEYS[3]
+                local pending_seats_key = KEYS[4]
+                local rev_key = KEYS[5]
+                local reservation_id = ARGV[1]
+                local user_id = ARGV[2]
+                local show_id = ARGV[3]
+                local seats = ARGV[4]
+
+                if redis.call('ZREM', pending_key, reservation_id) == 0 then
                     return redis.error_reply('RESERVATION_NOT_FOUND')
                 end
+                redis.call('HDEL', pending_seats_key, reservation_id)
+                redis.call('INCR', rev_key)
 
-                redis.call('HMSET', booking_key,
+                redis.call('HSET', booking_key,
                     'user_id', user_id,
                     'show_id', show_id,
                     'seats', seats,
@@ -95,65 +233,204 @@ class SeatCache:
                 )
 
                 redis.call('DEL', reservation_key)
-                redis.call('DEL', lock_key)
 
                 return redis.status_reply('OK')
             """)
 
-            # Release lock and restore capacity
-            self.release_lock_script = _register(r"""
+            # Cancel a pending reservation and give its seats back
+            self.release_reservation_script = _register(r"""
                 local capacity_key = KEYS[1]
-                local lock_key = KEYS[2]
-                local reservation_key = KEYS[3]
-                local seats_to_restore = tonumber(ARGV[1])
-
-                if redis.call('EXISTS', reservation_key) == 1 then
-                    local current_capacity = tonumber(redis.call('GET', capacity_key) or '0')
-                    local restored_capacity = current_capacity + seats_to_restore
-                    redis.call('SET', capacity_key, tostring(restored_capacity))
+                local reservation_key = KEYS[2]
+                local pending_key = KEYS[3]
+                local pending_seats_key = KEYS[4]
+                local rev_key = KEYS[5]
+                local reservation_id = ARGV[1]
+
+                if redis.call('ZREM', pending_key, reservation_id) == 1 then
+                    local seats = tonumber(redis.call('HGET', pending_seats_key, reservation_id) or '0')
+                    if seats > 0 then
+                        redis.call('INCRBY', capacity_key, seats)
+                    end
+                    redis.call('HDEL', pending_seats_key, reservation_id)
+                    redis.call('INCR', rev_key)
                 end
-
                 redis.call('DEL', reservation_key)
-                redis.call('DEL', lock_key)
 
                 return redis.status_reply('OK')
             """)
 
-            # Hold specific seats (per-seat holds)
-            self.hold_seats_script = _register(r"""
+            # Add to a show's capacity only if it is cached; a missing key is
+            # left for the next warm-up rather than created from a delta
+            self.adjust_capacity_script = _register(r"""
+                if redis.call('EXISTS', KEYS[1]) == 0 then
+                    return false
+                end
+                redis.call('INCR', KEYS[2])
+                return redis.call('INCRBY', KEYS[1], ARGV[1])
+            """)
+
+            # Cached capacity (-1 if missing), seats in pending reservations
+            # and inventory revision, read together for reconciliation
+            self.inventory_state_script = _register(_INVENTORY_LUA + r"""
+                local capacity = redis.call('GET', KEYS[1])
+                return {tonumber(capacity or '-1'), pending_seat_total(KEYS[2]), tonumber(redis.call('GET', KEYS[3]) or '0')}
+            """)
+
+            # Set capacity to ARGV[1] (the DB's remaining seats) minus pending
+            # seats, unless the revision moved past ARGV[2]; returns
+            # {previous (-1 if missing), new}, or {-2} when skipped
+            self.repair_capacity_script = _register(_INVENTORY_LUA + r"""
+                if tonumber(redis.call('GET', KEYS[3]) or '0') ~= tonumber(ARGV[2]) then
+                    return {-2}
+                end
+                local previous = tonumber(redis.call('GET', KEYS[1]) or '-1')
+                local target = math.max(tonumber(ARGV[1]) - pending_seat_total(KEYS[2]), 0)
+                if previous ~= target then
+                    redis.call('SET', KEYS[1], target)
+                    redis.call('INCR', KEYS[3])
+                end
+                return {previous, target}
+            """)
+
+            # Hold seats without giving up on the first conflict. KEYS[6] is the
+            # hold key prefix; ARGV pairs each requested seat with a csv of
+            # same-row alternatives, nearest first. Requested seats are tried
+            # before any alternative, so one request never takes another's
+            # seat. With ARGV[4] == '1' the seats that could be held are kept
+            # even if others could not; otherwise nothing is held unless every
+            # seat (or its substitute) could be. Returns
+            # {id | 0, held csv, version, conflicts csv, substitutions csv, unavailable csv}
+            self.hold_seats_bulk_script = _register(_SEAT_LOG_LUA + r"""
+                local seq_key = KEYS[1]
+                local reservation_prefix = KEYS[2]
+                local state_key = KEYS[5]
+                local hold_prefix = KEYS[6]
                 local user_id = ARGV[1]
                 local show_id = ARGV[2]
                 local ttl = tonumber(ARGV[3])
-                local seats = {}
-                for i=4, #ARGV do
-                    table.insert(seats, ARGV[i])
+                local partial = ARGV[4] == '1'
+
+                local reservation_id = redis.call('INCR', seq_key)
+                local held, taken = {}, {}
+                local function try_hold(seat)
+                    if taken[seat] or redis.call('HGET', state_key, seat) == 'booked' then
+                        return false
+                    end
+                    if redis.call('SET', hold_prefix .. seat, reservation_id, 'NX', 'PX', ttl * 1000) then
+                        taken[seat] = true
+                        table.insert(held, seat)
+                        return true
+                    end
+                    return false
                 end
 
-                local reservation_id = redis.call('INCR', 'reservation_counter')
-                local reservation_key = 'reservation:' .. reservation_id
-                local set_keys = {}
+                local conflicts = {}
+                for i = 5, #ARGV, 2 do
+                    if not try_hold(ARGV[i]) then
+                        table.insert(conflicts, i)
+                    end
+                end
 
-                for i, seat in ipairs(seats) do
-                    local hold_key = 'hold:show:' .. show_id .. ':seat:' .. seat
-                    if redis.call('SETNX', hold_key, reservation_id) == 0 then
-                        for _, k in ipairs(set_keys) do
-                            redis.call('DEL', k)
+                local conflict_seats, substitutions, unavailable = {}, {}, {}
+                for _, i in ipairs(conflicts) do
+                    local seat = ARGV[i]
+                    table.insert(conflict_seats, seat)
+                    local substitute = nil
+                    for _, alt in ipairs(split_csv(ARGV[i + 1])) do
+                        if try_hold(alt) then
+                            substitute = alt
+                            break
                         end
-                        return redis.error_reply('SEAT_ALREADY_HELD:' .. seat)
                     end
-                    redis.call('PEXPIRE', hold_key, ttl * 1000)
-                    table.insert(set_keys, hold_key)
+                    if substitute then
+                        table.insert(substitutions, seat .. '=' .. substitute)
+                    else
+                        table.insert(unavailable, seat)
+                    end
+                end
+
+                if #held == 0 or (#unavailable > 0 and not partial) then
+                    for _, seat in ipairs(held) do
+                        redis.call('DEL', hold_prefix .. seat)
+                    end
+                    return {0, '', 0, table.concat(conflict_seats, ','), '', table.concat(unavailable, ',')}
                 end
 
-                redis.call('HMSET', reservation_key, 'user_id', tostring(user_id), 'show_id', tostring(show_id), 'seats', table.concat(seats, ','), 'timestamp', redis.call('TIME')[1])
+                local reservation_key = reservation_prefix .. reservation_id
+                redis.call('HSET', reservation_key, 'user_id', tostring(user_id), 'show_id', tostring(show_id), 'seats', table.concat(held, ','), 'timestamp', redis.call('TIME')[1])
                 redis.call('EXPIRE', reservation_key, ttl)
+                local version = record_seat_changes(KEYS[3], KEYS[4], KEYS[5], held, 'held:' .. reservation_id)
+
+                return {reservation_id, table.concat(held, ','), version, table.concat(conflict_seats, ','),
+                        table.concat(substitutions, ','), table.concat(unavailable, ',')}
+            """)
 
-                return {tostring(reservation_id), table.concat(seats, ',')}
+            # Extend a seat hold (heartbeat): push the reservation and every hold
+            # key it still owns to now + ARGV[3] seconds, but never past
+            # ARGV[4] seconds after the hold was created and never earlier than
+            # the current expiry. ARGV[2] (if set) must be the hold's owner.
+            # Returns {expires_at_ms, lost seats csv, capped}
+            self.extend_seat_hold_script = _register(_SEAT_LOG_LUA + r"""
+                local reservation_key = KEYS[1]
+                local hold_prefix = KEYS[2]
+                local reservation_id = ARGV[1]
+                local fields = redis.call('HMGET', reservation_key, 'user_id', 'seats', 'timestamp')
+                if not fields[2] then
+                    return redis.error_reply('RESERVATION_NOT_FOUND')
+                end
+                if ARGV[2] ~= '' and fields[1] ~= ARGV[2] then
+                    return redis.error_reply('NOT_OWNER')
+                end
+
+                local t = redis.call('TIME')
+                local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+                local cap = (tonumber(fields[3]) + tonumber(ARGV[4])) * 1000
+                local target = now + tonumber(ARGV[3]) * 1000
+                local capped = 0
+                if target >= cap then
+                    target = cap
+                    capped = 1
+                end
+                -- Never shorten a hold. PTTL rounds down, so a target within a
+                -- millisecond of the current expiry leaves the keys untouched
+                local current = now + math.max(redis.call('PTTL', reservation_key), 0)
+                local extend = target > current + 1
+                if not extend then
+                    target = current
+                end
+
+                local lost, kept = {}, {}
+                for _, seat in ipairs(split_csv(fields[2])) do
+                    local hold_key = hold_prefix .. seat
+                    if redis.call('GET', hold_key) == reservation_id then
+                        if extend then
+                            redis.call('PEXPIREAT', hold_key, target)
+                        end
+                        table.insert(kept, seat)
+                    else
+                        table.insert(lost, seat)
+                    end
+                end
+                -- Lost seats may be held by someone else by now; a later
+                -- confirm or release must not touch their hold keys
+                if #kept == 0 then
+                    redis.call('DEL', reservation_key)
+                    return redis.error_reply('HOLD_EXPIRED')
+                end
+                if #lost > 0 then
+                    redis.call('HSET', reservation_key, 'seats', table.concat(kept, ','))
+                end
+                if extend then
+                    redis.call('PEXPIREAT', reservation_key, target)
+                end
+                return {target, table.concat(lost, ','), capped}
             """)
 
             # Confirm seat-level hold
-            self.confirm_seat_hold_script = _register(r"""
+            self.confirm_seat_hold_script = _register(_SEAT_LOG_LUA + r"""
                 local reservation_key = KEYS[1]
+                local hold_prefix = KEYS[2]
+                local booking_key = KEYS[3]
                 local user_id = ARGV[1]
                 local show_id = ARGV[2]
 
@@ -162,41 +439,58 @@ class SeatCache:
                 end
 
                 local seats_csv = redis.call('HGET', reservation_key, 'seats') or ''
-                local seats = {}
                 if seats_csv ~= '' then
                     for seat in string.gmatch(seats_csv, '([^,]+)') do
-                        table.insert(seats, seat)
+                        redis.call('DEL', hold_prefix .. seat)
                     end
                 end
 
-                for _, seat in ipairs(seats) do
-                    local hold_key = 'hold:show:' .. show_id .. ':seat:' .. seat
-                    redis.call('DEL', hold_key)
-                end
-
-                local booking_key = 'booking:' .. reservation_key:sub(13)
-                redis.call('HMSET', booking_key, 'user_id', user_id, 'show_id', show_id, 'seats', seats_csv, 'status', 'confirmed', 'timestamp', redis.call('TIME')[1])
+                redis.call('HSET', booking_key, 'user_id', user_id, 'show_id', show_id, 'seats', seats_csv, 'status', 'confirmed', 'timestamp', redis.call('TIME')[1])
 
                 redis.call('DEL', reservation_key)
-                return redis.status_reply('OK')
+                -- Returns the new seat version
+                return record_seat_changes(KEYS[4], KEYS[5], KEYS[6], split_csv(seats_csv), 'booked')
             """)
 
             # Release seat-level hold
-            self.release_seat_hold_script = _register(r"""
+            # Returns the new seat version, or 0 if the reservation was already gone
+            self.release_seat_hold_script = _register(_SEAT_LOG_LUA + r"""
                 local reservation_key = KEYS[1]
+                local hold_prefix = KEYS[2]
                 if redis.call('EXISTS', reservation_key) == 0 then
-                    return redis.status_reply('OK')
+                    return 0
                 end
-                local show_id = redis.call('HGET', reservation_key, 'show_id')
                 local seats_csv = redis.call('HGET', reservation_key, 'seats') or ''
                 if seats_csv ~= '' then
                     for seat in string.gmatch(seats_csv, '([^,]+)') do
-                        local hold_key = 'hold:show:' .. show_id .. ':seat:' .. seat
-                        redis.call('DEL', hold_key)
+                        redis.call('DEL', hold_prefix .. seat)
                     end
                 end
                 redis.call('DEL', reservation_key)
-                return redis.status_reply('OK')
+                return record_seat_changes(KEYS[3], KEYS[4], KEYS[5], split_csv(seats_csv), 'free')
+            """)
+
+            # Mark seats free outside a release (hold expired, ticket cancelled).
+            # Seats that are held again are skipped; returns the new seat
+            # version, or 0 if nothing changed
+            self.mark_seats_free_script = _register(_SEAT_LOG_LUA + r"""
+                local hold_prefix = KEYS[4]
+                local seats = {}
+                for _, seat in ipairs(ARGV) do
+                    if redis.call('EXISTS', hold_prefix .. seat) == 0 then
+                        table.insert(seats, seat)
+                    end
+                end
+                if #seats == 0 then
+                    return 0
+                end
+                return record_seat_changes(KEYS[1], KEYS[2], KEYS[3], seats, 'free')
+            """)
+
+            # Mark seats booked outside a seat hold (count-based bookings);
+            # returns the new seat version
+            self.mark_seats_booked_script = _register(_SEAT_LOG_LUA + r"""
+                return record_seat_changes(KEYS[1], KEYS[2], KEYS[3], ARGV, 'booked')
             """)
 
 
@@ -205,49 +499,114 @@ class SeatCache:
             # Safe fallbacks
             self.reserve_seats_script = _scripts_unavailable
             self.confirm_booking_script = _scripts_unavailable
-            self.release_lock_script = _scripts_unavailable
-            self.hold_seats_script = _scripts_unavailable
+            self.release_reservation_script = _scripts_unavailable
+            self.reclaim_expired_script = _scripts_unavailable
+            self.adjust_capacity_script = _scripts_unavailable
+            self.inventory_state_script = _scripts_unavailable
+            self.repair_capacity_script = _scripts_unavailable
+            self.hold_seats_bulk_script = _scripts_unavailable
+            self.extend_seat_hold_script = _scripts_unavailable
             self.confirm_seat_hold_script = _scripts_unavailable
             self.release_seat_hold_script = _scripts_unavailable
+            self.mark_seats_free_script = _scripts_unavailable
+            self.mark_seats_booked_script = _scripts_unavailable
 
     def get_redis(self):
         if self._redis is None:
-            import os
-            redis_url = os.environ.get("REDIS_URL")
-            if not redis_url:
-                raise redis.ConnectionError("REDIS_URL not set")
-            self._redis = redis.Redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-            )
+            self._redis = get_redis_client()
         return self._redis
 
     def get_show_capacity(self, show_id: int) -> Optional[int]:
         try:
-            capacity = self.get_redis().get(f"show:{show_id}:capacity")
+            capacity = self.get_redis().get(show_key(show_id, "capacity"))
             return int(capacity) if capacity is not None else None
         except redis.ConnectionError:
             logger.warning("Redis unavailable for capacity check")
             return None
 
+    def get_show_capacities(self, show_ids: List[int]) -> Dict[int, Optional[int]]:
+        """Read many show capacities with one MGET; missing shows map to None."""
+        show_ids = list(show_ids)
+        if not show_ids:
+            return {}
+        try:
+            r = self.get_redis()
+            keys = [show_key(show_id, "capacity") for show_id in show_ids]
+            # Shows hash to different cluster slots; RedisCluster splits the read per node
+            values = r.mget_nonatomic(keys) if hasattr(r, "mget_nonatomic") else r.mget(keys)
+            return {show_id: int(value) if value is not None else None for show_id, value in zip(show_ids, values)}
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable for bulk capacity check")
+            return {show_id: None for show_id in show_ids}
+
     def set_show_capacity(self, show_id: int, capacity: int) -> bool:
         try:
-            return self.get_redis().set(f"show:{show_id}:capacity", str(capacity))
+            return self.get_redis().set(show_key(show_id, "capacity"), str(capacity))
         except redis.ConnectionError:
             logger.warning("Redis unavailable for capacity update")
             return False
 
-    def reserve_seats_atomic(self, show_id: int, seats_requested: int, lock_timeout_ms: int = 10000) -> Dict:
+    def set_show_capacities(self, capacities: Dict[int, int]) -> bool:
+        """Set many show capacities in a single MSET round trip."""
+        if not capacities:
+            return True
         try:
-            show_key = f"show:{show_id}"
-            capacity_key = f"show:{show_id}:capacity"
-            lock_key = f"lock:show:{show_id}"
+            r = self.get_redis()
+            mapping = {show_key(show_id, "capacity"): str(capacity) for show_id, capacity in capacities.items()}
+            return r.mset_nonatomic(mapping) if hasattr(r, "mset_nonatomic") else r.mset(mapping)
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable for bulk capacity update")
+            return False
 
-            result = self.reserve_seats_script(keys=[show_key, capacity_key, lock_key], args=[seats_requested, lock_timeout_ms])
+    def fill_show_capacities(self, capacities: Dict[int, int]) -> int:
+        """Set capacities only for shows without a Redis value, in one pipeline.
 
-            if isinstance(result, list) and len(result) == 2:
-                reservation_id, new_capacity = result
+        Existing values are left alone since they already reflect in-flight
+        reservations. Returns the number of keys written.
+        """
+        if not capacities:
+            return 0
+        try:
+            pipe = self.get_redis().pipeline(transaction=False)
+            for show_id, capacity in capacities.items():
+                pipe.set(show_key(show_id, "capacity"), str(capacity), nx=True)
+            return sum(1 for written in pipe.execute() if written)
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable for capacity warm-up")
+            return 0
+
+    def get_reservation(self, show_id: int, reservation_id: int) -> Dict:
+        """Return a pending reservation's fields (user_id, seats, ...), or {} if it has expired."""
+        try:
+            return self.get_redis().hgetall(show_key(show_id, "reservation", reservation_id))
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable for reservation lookup")
+            raise
+
+    @staticmethod
+    def _pending_keys(show_id: int) -> List[str]:
+        return [show_key(show_id, "pending"), show_key(show_id, "pending_seats"), show_key(show_id, "inventory_rev")]
+
+    def reserve_seats_atomic(self, show_id: int, seats_requested: int) -> Dict:
+        try:
+            keys = [
+                show_key(show_id, "capacity"),
+                show_key(show_id, "reservation_seq"),
+                show_key(show_id, "reservation", ""),
+            ] + self._pending_keys(show_id)
+            result = self.reserve_seats_script(keys=keys, args=[seats_requested, show_id, RESERVATION_TTL_SECONDS])
+
+            if isinstance(result, list) and len(result) == 4:
+                reservation_id, new_capacity, reclaimed, reclaimed_seats = result
+                if reclaimed:
+                    self._record_reclaim(show_id, 'reserve', reclaimed, reclaimed_seats)
+                if reservation_id < 0:
+                    return {'success': False, 'error': 'INSUFFICIENT_CAPACITY'}
+                try:
+                    self.get_redis().sadd(PENDING_SHOWS_KEY, show_id)
+                except redis.RedisError as e:
+                    # The expiry listener and the next reservation still reclaim it
+                    logger.warning(f"Failed to index pending reservation for show {show_id}: {e}")
                 return {'success': True, 'reservation_id': reservation_id, 'new_capacity': new_capacity}
             return {'success': False, 'error': str(result)}
 
@@ -260,11 +619,11 @@ class SeatCache:
 
     def confirm_booking(self, reservation_id: int, user_id: int, show_id: int, seats: int) -> bool:
         try:
-            reservation_key = f"reservation:{reservation_id}"
-            lock_key = f"lock:show:{show_id}"
-            booking_key = f"booking:{reservation_id}"
-
-            result = self.confirm_booking_script(keys=[reservation_key, lock_key, booking_key], args=[user_id, show_id, seats])
+            keys = [
+                show_key(show_id, "reservation", reservation_id),
+                show_key(show_id, "booking", reservation_id),
+            ] + self._pending_keys(show_id)
+            result = self.confirm_booking_script(keys=keys, args=[reservation_id, user_id, show_id, seats])
             return result == 'OK'
 
         except redis.ConnectionError:
@@ -274,66 +633,171 @@ class SeatCache:
             logger.error(f"Booking confirmation failed: {e}")
             return False
 
-    def release_lock_and_restore(self, show_id: int, reservation_id: int, seats_to_restore: int) -> bool:
+    def release_reservation(self, show_id: int, reservation_id: int) -> bool:
+        """Give a pending count-based reservation's seats back; a no-op if it is already gone."""
         try:
-            capacity_key = f"show:{show_id}:capacity"
-            lock_key = f"lock:show:{show_id}"
-            reservation_key = f"reservation:{reservation_id}"
-
-            result = self.release_lock_script(keys=[capacity_key, lock_key, reservation_key], args=[seats_to_restore])
+            keys = [
+                show_key(show_id, "capacity"),
+                show_key(show_id, "reservation", reservation_id),
+            ] + self._pending_keys(show_id)
+            result = self.release_reservation_script(keys=keys, args=[reservation_id])
             return result == 'OK'
 
         except redis.ConnectionError:
-            logger.warning("Redis unavailable for lock release")
+            logger.warning("Redis unavailable for reservation release")
             return False
         except Exception as e:
-            logger.error(f"Lock release failed: {e}")
+            logger.error(f"Reservation release failed: {e}")
             return False
 
-    def hold_seats(self, user_id: int, show_id: int, seat_list: List[str], ttl_seconds: int = 120) -> Dict:
+    def reclaim_expired_reservations(self, show_id: int, source: str = 'sweeper', batch_size: int = 500) -> Dict:
+        """Give back the seats of every expired count-based reservation for a show."""
+        keys = [show_key(show_id, "capacity")] + self._pending_keys(show_id)
+        total = {'reservations': 0, 'seats': 0}
+        while True:
+            reclaimed, seats = self.reclaim_expired_script(keys=keys, args=[batch_size])
+            total['reservations'] += reclaimed
+            total['seats'] += seats
+            if reclaimed < batch_size:
+                break
+        if total['reservations']:
+            self._record_reclaim(show_id, source, total['reservations'], total['seats'])
+        return total
+
+    def _record_reclaim(self, show_id: int, source: str, reservations: int, seats: int):
+        logger.info(f"Reclaimed {seats} seats from {reservations} expired reservations for show {show_id} ({source})")
         try:
-            args = [str(user_id), str(show_id), str(ttl_seconds)] + seat_list
-            result = self.hold_seats_script(args=args)
-            if isinstance(result, list) and len(result) == 2:
-                reservation_id = int(result[0])
-                seats_csv = result[1]
-                seats = seats_csv.split(',') if seats_csv else []
-                result = {'success': True, 'reservation_id': reservation_id, 'seats': seats}
-                # emit websocket event for held seats
-                try:
-                    if emit_seat_update:
-                        try:
-                            logger.info(f"Emitting seat_held for show {show_id}, reservation {reservation_id}, seats={seats}")
-                            emit_seat_update(int(show_id), 'seat_held', {'reservation_id': reservation_id, 'seats': seats})
-                        except Exception as ee:
-                            logger.exception(f"Failed to emit seat_held for reservation {reservation_id}: {ee}")
-                except Exception:
-                    pass
-                return result
-            return {'success': False, 'error': str(result)}
+            pipe = self.get_redis().pipeline(transaction=False)
+            pipe.hincrby(REAPER_METRICS_KEY, 'reservations_reclaimed', reservations)
+            pipe.hincrby(REAPER_METRICS_KEY, 'seats_reclaimed', seats)
+            pipe.hincrby(REAPER_METRICS_KEY, f'reservations_reclaimed_by_{source}', reservations)
+            pipe.hincrby(REAPER_METRICS_KEY, f'seats_reclaimed_by_{source}', seats)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record reclaim metrics: {e}")
+
+    def reservation_reaper_stats(self) -> Dict:
+        """Totals across all processes, by source: reserve, listener and sweeper."""
+        try:
+            r = self.get_redis()
+            stats = {k: int(v) if v.lstrip('-').isdigit() else v for k, v in r.hgetall(REAPER_METRICS_KEY).items()}
+            stats['shows_with_pending'] = r.scard(PENDING_SHOWS_KEY)
+            return stats
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for reaper stats: {e}")
+            return {}
+
+    def adjust_show_capacity(self, show_id: int, delta: int) -> Optional[int]:
+        """Add `delta` to a cached capacity; returns the new value, or None if not cached.
+
+        Use this rather than `set_show_capacity` after bookings and
+        cancellations: the cached value already excludes seats in pending
+        reservations, which the DB capacity does not know about.
+        """
+        try:
+            keys = [show_key(show_id, "capacity"), show_key(show_id, "inventory_rev")]
+            result = self.adjust_capacity_script(keys=keys, args=[int(delta)])
+            return None if result is None else int(result)
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable for capacity adjustment")
+            return None
+        except Exception as e:
+            logger.error(f"Capacity adjustment failed: {e}")
+            return None
 
+    def get_inventory_states(self, show_ids: List[int]) -> Dict[int, Dict]:
+        """Cached capacity (None if missing), pending seats and inventory revision per show, in one pipeline."""
+        if not show_ids:
+            return {}
+        pipe = self.get_redis().pipeline(transaction=False)
+        for show_id in show_ids:
+            keys = [show_key(show_id, "capacity")] + self._pending_keys(show_id)[1:]
+            self.inventory_state_script(keys=keys, client=pipe)
+        states = {}
+        for show_id, (capacity, pending, rev) in zip(show_ids, pipe.execute()):
+            states[show_id] = {"capacity": None if capacity < 0 else capacity, "pending": pending, "rev": rev}
+        return states
+
+    def repair_show_capacities(self, targets: Dict[int, tuple]) -> Dict[int, Optional[int]]:
+        """Reset cached capacities from `{show_id: (db_capacity, rev)}`, in one pipeline.
+
+        Each show is set to its DB remaining capacity minus the seats pending
+        at that moment, but only if its inventory revision still equals `rev`.
+        Read `rev` with `get_inventory_states` *before* reading the DB, so a
+        booking committed in between moves the revision and is skipped.
+        Returns the new capacity per show, or None for skipped shows.
+        """
+        if not targets:
+            return {}
+        pipe = self.get_redis().pipeline(transaction=False)
+        for show_id, (db_capacity, rev) in targets.items():
+            keys = [show_key(show_id, "capacity")] + self._pending_keys(show_id)[1:]
+            self.repair_capacity_script(keys=keys, args=[int(db_capacity), int(rev)], client=pipe)
+        return {show_id: None if result[0] == -2 else result[1]
+                for show_id, result in zip(targets, pipe.execute())}
+
+    def hold_seats_bulk(self, user_id, show_id: int, seat_list: List[str], ttl_seconds: int = 120,
+                        partial: bool = False, alternatives: Optional[Dict[str, List[str]]] = None) -> Dict:
+        """Hold seats in one atomic call, reporting every conflict instead of the first.
+
+        `alternatives` maps a requested seat to substitutes to try, nearest
+        first, if it is taken. With `partial` the free seats are held even
+        when some requested seats (and their substitutes) are not. The result
+        always carries `conflicts` (requested seats that were taken),
+        `substitutions` ({requested: substitute}) and `unavailable`
+        (conflicts left without a substitute).
+        """
+        alternatives = alternatives or {}
+        try:
+            keys = [show_key(show_id, "reservation_seq"), show_key(show_id, "reservation", "")]
+            keys += self._seat_log_keys(show_id) + [show_key(show_id, "hold", "")]
+            args = [str(user_id), str(show_id), str(ttl_seconds), '1' if partial else '0']
+            for seat in seat_list:
+                args += [seat, ','.join(alternatives.get(seat, []))]
+            reservation_id, held_csv, version, conflicts_csv, substitutions_csv, unavailable_csv = \
+                self.hold_seats_bulk_script(keys=keys, args=args)
         except redis.ConnectionError:
-            logger.warning('Redis unavailable for hold seats')
+            logger.warning('Redis unavailable for bulk hold seats')
             return {'success': False, 'error': 'REDIS_UNAVAILABLE'}
         except Exception as e:
-            logger.error(f'Hold seats failed: {e}')
+            logger.error(f'Bulk hold seats failed: {e}')
             return {'success': False, 'error': str(e)}
 
+        result = {
+            'success': bool(reservation_id),
+            'conflicts': conflicts_csv.split(',') if conflicts_csv else [],
+            'substitutions': dict(pair.split('=', 1) for pair in substitutions_csv.split(',')) if substitutions_csv else {},
+            'unavailable': unavailable_csv.split(',') if unavailable_csv else [],
+        }
+        if not reservation_id:
+            result['error'] = 'SEATS_UNAVAILABLE'
+            return result
+        seats = held_csv.split(',')
+        result.update({'reservation_id': int(reservation_id), 'seats': seats, 'version': int(version)})
+        if emit_seat_update:
+            try:
+                emit_seat_update(int(show_id), 'seat_held', {'reservation_id': result['reservation_id'], 'seats': seats, 'version': result['version']})
+            except Exception as e:
+                logger.exception(f"Failed to emit seat_held for reservation {reservation_id}: {e}")
+        return result
+
     def confirm_seat_hold(self, reservation_id: int, user_id: int, show_id: int) -> bool:
         try:
-            reservation_key = f'reservation:{reservation_id}'
-            result = self.confirm_seat_hold_script(keys=[reservation_key], args=[str(user_id), str(show_id)])
-            ok = result == 'OK'
+            reservation_key = show_key(show_id, "reservation", reservation_id)
+            # Read the seats first; the script deletes the reservation
+            seats_csv = self.get_redis().hget(reservation_key, 'seats') or ''
+            keys = [reservation_key, show_key(show_id, "hold", ""), show_key(show_id, "booking", reservation_id)]
+            keys += self._seat_log_keys(show_id)
+            version = self.confirm_seat_hold_script(keys=keys, args=[str(user_id), str(show_id)])
+            ok = isinstance(version, int) and version > 0
             if ok:
                 try:
                     if emit_seat_update:
                         # notify that seats were confirmed (no longer held)
-                        # fetch seats from reservation key
                         try:
-                            seats_csv = self.get_redis().hget(reservation_key, 'seats') or ''
                             seats = seats_csv.split(',') if seats_csv else []
                             logger.info(f"Emitting seat_confirmed for show {show_id}, reservation {reservation_id}, seats={seats}")
-                            emit_seat_update(int(show_id), 'seat_confirmed', {'reservation_id': reservation_id, 'seats': seats})
+                            emit_seat_update(int(show_id), 'seat_confirmed', {'reservation_id': reservation_id, 'seats': seats, 'version': version})
                         except Exception as ee:
                             logger.exception(f"Failed to emit seat_confirmed for reservation {reservation_id}: {ee}")
                 except Exception:
@@ -346,23 +810,52 @@ class SeatCache:
             logger.error(f'Confirm seat hold failed: {e}')
             return False
 
-    def release_seat_hold(self, reservation_id: int) -> bool:
+    def extend_seat_hold(self, reservation_id: int, show_id: int, ttl_seconds: int, max_lifetime_seconds: int,
+                         user_id=None) -> Dict:
+        """Extend all of a reservation's seat holds in one call, up to `max_lifetime_seconds` after creation.
+
+        Returns {'success', 'expires_at_ms', 'lost', 'capped'}; `lost` lists
+        seats whose hold had already expired, which are dropped from the
+        reservation. Errors are RESERVATION_NOT_FOUND, NOT_OWNER,
+        HOLD_EXPIRED (no seat still held; the reservation is deleted) and
+        REDIS_UNAVAILABLE.
+        """
         try:
-            reservation_key = f'reservation:{reservation_id}'
-            result = self.release_seat_hold_script(keys=[reservation_key])
-            ok = result == 'OK'
-            if ok:
+            keys = [show_key(show_id, "reservation", reservation_id), show_key(show_id, "hold", "")]
+            args = [str(reservation_id), '' if user_id is None else str(user_id), int(ttl_seconds), int(max_lifetime_seconds)]
+            expires_at, lost_csv, capped = self.extend_seat_hold_script(keys=keys, args=args)
+            return {
+                'success': True,
+                'expires_at_ms': int(expires_at),
+                'lost': lost_csv.split(',') if lost_csv else [],
+                'capped': bool(capped),
+            }
+        except redis.ConnectionError:
+            logger.warning('Redis unavailable for extend seat hold')
+            return {'success': False, 'error': 'REDIS_UNAVAILABLE'}
+        except redis.ResponseError as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            logger.error(f'Extend seat hold failed: {e}')
+            return {'success': False, 'error': str(e)}
+
+    def release_seat_hold(self, reservation_id: int, show_id: int) -> bool:
+        try:
+            reservation_key = show_key(show_id, "reservation", reservation_id)
+            # Read the seats first; the script deletes the reservation
+            seats_csv = self.get_redis().hget(reservation_key, 'seats') or ''
+            keys = [reservation_key, show_key(show_id, "hold", "")] + self._seat_log_keys(show_id)
+            version = self.release_seat_hold_script(keys=keys)
+            # 0 means the reservation was already gone, which still counts as released
+            ok = isinstance(version, int)
+            if ok and version:
                 try:
                     if emit_seat_update:
-                        # attempt to read show_id and seats from reservation before deletion
                         try:
-                            data = self.get_redis().hgetall(reservation_key)
-                            show_id = int(data.get('show_id')) if data.get('show_id') else None
-                            seats_csv = data.get('seats') or ''
                             seats = seats_csv.split(',') if seats_csv else []
-                            if show_id:
+                            if seats:
                                 logger.info(f"Emitting seat_released for show {show_id}, reservation {reservation_id}, seats={seats}")
-                                emit_seat_update(show_id, 'seat_released', {'reservation_id': reservation_id, 'seats': seats})
+                                emit_seat_update(int(show_id), 'seat_released', {'reservation_id': reservation_id, 'seats': seats, 'version': version})
                         except Exception as ee:
                             logger.exception(f"Failed to emit seat_released for reservation {reservation_id}: {ee}")
                 except Exception:
@@ -375,21 +868,98 @@ class SeatCache:
             logger.error(f'Release seat hold failed: {e}')
             return False
 
+    @staticmethod
+    def _seat_log_keys(show_id: int) -> List[str]:
+        return [show_key(show_id, "seat_version"), show_key(show_id, "seat_log"), show_key(show_id, "seat_state")]
+
+    def mark_seats_free(self, show_id: int, seats: List[str]) -> int:
+        """Record seats as free (expired hold, cancelled ticket); returns the new version or 0."""
+        if not seats:
+            return 0
+        try:
+            keys = self._seat_log_keys(show_id) + [show_key(show_id, "hold", "")]
+            return int(self.mark_seats_free_script(keys=keys, args=list(seats)))
+        except redis.ConnectionError:
+            logger.warning('Redis unavailable for mark seats free')
+            return 0
+        except Exception as e:
+            logger.error(f'Mark seats free failed: {e}')
+            return 0
+
+    def mark_seats_booked(self, show_id: int, seats: List[str]) -> int:
+        """Record seats booked without a seat hold; returns the new version or 0."""
+        if not seats:
+            return 0
+        try:
+            return int(self.mark_seats_booked_script(keys=self._seat_log_keys(show_id), args=list(seats)))
+        except redis.ConnectionError:
+            logger.warning('Redis unavailable for mark seats booked')
+            return 0
+        except Exception as e:
+            logger.error(f'Mark seats booked failed: {e}')
+            return 0
+
+    def get_seat_version(self, show_id: int) -> Optional[int]:
+        try:
+            return int(self.get_redis().get(show_key(show_id, "seat_version")) or 0)
+        except redis.ConnectionError:
+            logger.warning('Redis unavailable for seat version check')
+            return None
+
+    def get_seat_changes(self, show_id: int, since_version: int):
+        """Return (current_version, changes) for seats changed after `since_version`.
+
+        Each change is {'seat_id', 'state', 'reservation_id', 'version'} with
+        state 'held' | 'free' | 'booked'. Returns (None, []) if Redis is down.
+        """
+        try:
+            r = self.get_redis()
+            version_key, log_key, state_key = self._seat_log_keys(show_id)
+            pipe = r.pipeline(transaction=True)
+            pipe.get(version_key)
+            pipe.zrangebyscore(log_key, f"({int(since_version)}", "+inf", withscores=True)
+            current, changed = pipe.execute()
+            if not changed:
+                return int(current or 0), []
+            seats = [seat for seat, _ in changed]
+            # A state read after the MULTI may be newer than `current`, which is
+            # fine: the client sees it again in a later delta or diff
+            states = r.hmget(state_key, seats)
+            # A hold whose expiry event was missed is still 'held:<id>' in
+            # seat_state; trust the hold key, as the full seat map does
+            held = [seat for seat, state in zip(seats, states) if state and state.startswith('held:')]
+            holders = dict(zip(held, r.mget([show_key(show_id, "hold", seat) for seat in held]))) if held else {}
+            changes = []
+            for (seat, version), state in zip(changed, states):
+                state = state or 'free'
+                reservation_id = None
+                if state.startswith('held:'):
+                    if holders.get(seat) == state[5:]:
+                        state, reservation_id = 'held', int(state[5:])
+                    else:
+                        state = 'free'
+                changes.append({'seat_id': seat, 'state': state, 'reservation_id': reservation_id, 'version': int(version)})
+            return int(current or 0), changes
+        except redis.ConnectionError:
+            logger.warning('Redis unavailable for seat changes')
+            return None, []
+
     def get_active_holds(self, show_id: int) -> List[Dict]:
         try:
-            pattern = f'hold:show:{show_id}:seat:*'
-            keys = self.get_redis().keys(pattern)
+            r = self.get_redis()
+            prefix = show_key(show_id, "hold", "")
+            keys = list(r.scan_iter(match=prefix + "*", count=500))
+            if not keys:
+                return []
             holds = []
-            for k in keys:
-                parts = k.split(':')
-                seat_id = parts[-1]
-                reservation_id = self.get_redis().get(k)
+            # All hold keys share the show's slot, so one MGET works on a cluster too
+            for k, reservation_id in zip(keys, r.mget(keys)):
                 if reservation_id:
                     try:
                         res_id = int(reservation_id)
                     except Exception:
                         res_id = reservation_id
-                    holds.append({'seat_id': seat_id, 'reservation_id': res_id})
+                    holds.append({'seat_id': k[len(prefix):], 'reservation_id': res_id})
             return holds
         except redis.ConnectionError:
             logger.warning('Redis unavailable for active holds check')
@@ -400,17 +970,19 @@ class SeatCache:
 
     def get_active_reservations(self, show_id: int) -> List[Dict]:
         try:
-            pattern = f"reservation:*"
-            keys = self.get_redis().keys(pattern)
+            r = self.get_redis()
+            pending_key, pending_seats_key, _ = self._pending_keys(show_id)
+            pending = r.zrange(pending_key, 0, -1, withscores=True)
+            if not pending:
+                return []
+            ids = [reservation_id for reservation_id, _ in pending]
             reservations = []
-            for key in keys:
-                data = self.get_redis().hgetall(key)
-                if data.get('show_id') == str(show_id):
-                    reservations.append({
-                        'reservation_id': key.split(':')[1],
-                        'seats_reserved': int(data.get('seats_reserved', 0)),
-                        'timestamp': int(data.get('timestamp', 0))
-                    })
+            for (reservation_id, expires_at), seats in zip(pending, r.hmget(pending_seats_key, ids)):
+                reservations.append({
+                    'reservation_id': reservation_id,
+                    'seats_reserved': int(seats or 0),
+                    'expires_at_ms': int(expires_at),
+                })
             return reservations
         except redis.ConnectionError:
             logger.warning("Redis unavailable for reservations check")
@@ -419,28 +991,53 @@ class SeatCache:
             logger.error(f"Failed to get reservations: {e}")
             return []
 
-    def cleanup_expired_locks(self) -> int:
+    # Theatre seat map caching helpers
+    #
+    # Seat maps are stored compactly (see cache/seat_map_codec.py) under a
+    # per-layout version counter, both hash-tagged by layout scope. Decoded maps are kept in a per-process
+    # LocalCache (see cache/local_cache.py) and served without touching Redis;
+    # invalidations reach other processes over pub/sub.
+    @staticmethod
+    def _seat_map_scope(theatre_id: int, screen_id: Optional[int] = None) -> str:
+        if screen_id:
+            return f"theatre:{theatre_id}:screen:{screen_id}"
+        return f"theatre:{theatre_id}"
+
+    def get_theatre_seat_map_version(self, theatre_id: int, screen_id: Optional[int] = None) -> int:
+        """Current layout version; read it before querying the DB for a map to cache."""
         try:
-            # Basic cleanup placeholder: returns 0 (no-op). More complex logic
-            # should be implemented in production.
-            return 0
+            version = self.get_redis().get(f"{{{self._seat_map_scope(theatre_id, screen_id)}}}:seatmap:version")
+            return int(version or 0)
         except redis.ConnectionError:
-            logger.warning("Redis unavailable for cleanup")
-            return 0
-        except Exception as e:
-            logger.error(f"Cleanup failed: {e}")
+            logger.warning('Redis unavailable for theatre seat map version')
             return 0
 
+    def get_theatre_seat_map_generation(self, theatre_id: int, screen_id: Optional[int] = None):
+        """Local invalidation token; take it before the version and DB reads and pass it to `set_theatre_seat_map`."""
+        return self._seat_map_local.generation(self._seat_map_scope(theatre_id, screen_id))
 
-    # Theatre seat map caching helpers
-    def get_theatre_seat_map(self, theatre_id: int) -> Optional[List[Dict]]:
+    def get_theatre_seat_map(self, theatre_id: int, screen_id: Optional[int] = None) -> Optional[List[Dict]]:
+        """Return the cached seat list, or None on a miss.
+
+        The list may be shared with other callers and must not be modified.
+        """
+        scope = self._seat_map_scope(theatre_id, screen_id)
+        generation = self._seat_map_local.generation(scope)
+        seats = self._seat_map_local.get(scope)
+        if seats is not None:
+            return seats
         try:
-            key = f"theatre:{theatre_id}:seats"
-            data = self.get_redis().get(key)
+            r = self.get_redis()
+            ensure_invalidation_listener(self.get_redis)
+            current, data = r.mget(f"{{{scope}}}:seatmap:version", f"{{{scope}}}:seatmap")
             if not data:
                 return None
-            import json
-            return json.loads(data)
+            version, seats = decode_seat_map(data)
+            # A blob built before the last invalidation is as good as missing
+            if version != int(current or 0):
+                return None
+            self._seat_map_local.set_if_generation(scope, seats, generation)
+            return seats
         except redis.ConnectionError:
             logger.warning('Redis unavailable for theatre seat map get')
             return None
@@ -448,11 +1045,23 @@ class SeatCache:
             logger.error(f'Failed to get theatre seat map: {e}')
             return None
 
-    def set_theatre_seat_map(self, theatre_id: int, seat_list: List[Dict]) -> bool:
+    def set_theatre_seat_map(self, theatre_id: int, seat_list: List[Dict], version: Optional[int] = None,
+                             screen_id: Optional[int] = None, generation=None) -> bool:
+        """Cache a seat list built from the DB.
+
+        Pass the `version` and local `generation` read before the DB query so
+        a map built from stale rows is never served after a concurrent
+        invalidation: Redis readers drop a blob with an old version, and the
+        local copy is not stored once the generation has moved.
+        """
+        scope = self._seat_map_scope(theatre_id, screen_id)
         try:
-            key = f"theatre:{theatre_id}:seats"
-            import json
-            self.get_redis().set(key, json.dumps(seat_list))
+            if generation is None:
+                generation = self._seat_map_local.generation(scope)
+            if version is None:
+                version = self.get_theatre_seat_map_version(theatre_id, screen_id)
+            self.get_redis().set(f"{{{scope}}}:seatmap", encode_seat_map(seat_list, version), ex=Config.SEAT_MAP_TTL_SECONDS)
+            self._seat_map_local.set_if_generation(scope, seat_list, generation)
             return True
         except redis.ConnectionError:
             logger.warning('Redis unavailable for theatre seat map set')
@@ -461,10 +1070,21 @@ class SeatCache:
             logger.error(f'Failed to set theatre seat map: {e}')
             return False
 
-    def delete_theatre_seat_map(self, theatre_id: int) -> bool:
+    def delete_theatre_seat_map(self, theatre_id: int, screen_id: Optional[int] = None) -> bool:
+        """Invalidate the theatre-wide map and, when given, the screen's map."""
+        scopes = [self._seat_map_scope(theatre_id)]
+        if screen_id:
+            scopes.append(self._seat_map_scope(theatre_id, screen_id))
+        for scope in scopes:
+            self._seat_map_local.discard(scope)
         try:
-            key = f"theatre:{theatre_id}:seats"
-            self.get_redis().delete(key)
+            pipe = self.get_redis().pipeline()
+            for scope in scopes:
+                pipe.incr(f"{{{scope}}}:seatmap:version")
+                pipe.delete(f"{{{scope}}}:seatmap")
+            pipe.execute()
+            for scope in scopes:
+                publish_invalidation("seat_map", scope, self.get_redis)
             return True
         except redis.ConnectionError:
             logger.warning('Redis unavailable for theatre seat map delete')
@@ -0,0 +1,75 @@
+# backend/cache/seat_map_codec.py
+"""
+Compact encoding for cached theatre seat maps.
+
+A seat map is stored as row labels, seat types and run-length encoded seat
+ranges instead of one JSON object per seat. A run is a stretch of seats in
+one row with consecutive numbers and ids and the same type and active flag:
+
+    [row_index, first_seat_number, length, type_index, is_active, first_id]
+
+A standard 10x15 layout collapses to a few dozen runs.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+FORMAT_VERSION = 1
+
+
+def encode_seat_map(seat_list: List[Dict], version: int) -> str:
+    """Encode seat dicts (as returned by TheatreSeatsResource.get), keeping their order."""
+    rows: List[str] = []
+    row_index: Dict[str, int] = {}
+    types: List[str] = []
+    type_index: Dict[str, int] = {}
+    runs: List[List[int]] = []
+
+    for seat in seat_list:
+        row = seat["row_label"]
+        if row not in row_index:
+            row_index[row] = len(rows)
+            rows.append(row)
+        seat_type = seat.get("seat_type") or "regular"
+        if seat_type not in type_index:
+            type_index[seat_type] = len(types)
+            types.append(seat_type)
+
+        r, t = row_index[row], type_index[seat_type]
+        active = 1 if seat.get("is_active", True) else 0
+        number, seat_id = seat["seat_number"], seat.get("id") or 0
+        if runs:
+            last = runs[-1]
+            if (last[0] == r and last[3] == t and last[4] == active
+                    and last[1] + last[2] == number
+                    and last[5] and last[5] + last[2] == seat_id):
+                last[2] += 1
+                continue
+        runs.append([r, number, 1, t, active, seat_id])
+
+    return json.dumps(
+        {"f": FORMAT_VERSION, "v": version, "rows": rows, "types": types, "runs": runs},
+        separators=(",", ":"),
+    )
+
+
+def decode_seat_map(data: str) -> Tuple[int, List[Dict]]:
+    """Return (version, seat dicts) from an encoded seat map."""
+    payload = json.loads(data)
+    if payload.get("f") != FORMAT_VERSION:
+        raise ValueError(f"unsupported seat map format {payload.get('f')}")
+    rows, types = payload["rows"], payload["types"]
+    seats = []
+    for r, first_number, length, t, active, first_id in payload["runs"]:
+        row, seat_type, is_active = rows[r], types[t], bool(active)
+        for offset in range(length):
+            number = first_number + offset
+            seats.append({
+                "id": first_id + offset if first_id else None,
+                "row_label": row,
+                "seat_number": number,
+                "seat_type": seat_type,
+                "is_active": is_active,
+                "seat_id": f"{row}{number}",
+            })
+    return payload["v"], seats
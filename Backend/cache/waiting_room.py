@@ -0,0 +1,180 @@
+# backend/cache/waiting_room.py
+"""
+Per-show waiting room for on-sale spikes.
+
+While a show's waiting room is open, seat holds and bookings need an
+admission token. Users join a FIFO queue and get a ticket number. Tickets
+are admitted at the configured rate, and an admitted user exchanges their
+ticket for a signed token valid for ADMISSION_TOKEN_TTL_SECONDS.
+
+    {show:<id>}:queue           hash: rate, last_ms, issued, admitted
+    {show:<id>}:queue:members   hash: user -> ticket number
+    waiting_rooms:active        set of show ids with an open waiting room
+
+Admission is computed lazily by `admit()` from the time since the last
+admission, so running it from several processes (or on every request)
+never admits faster than the rate. The socket server calls it on a timer
+and broadcasts one `queue_update` per show for clients to work out their
+position.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import redis
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from cache.seat_cache import seat_cache, show_key
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_SET_KEY = "waiting_rooms:active"
+TOKEN_SALT = "waiting-room-admission"
+
+
+def _queue_keys(show_id: int) -> List[str]:
+    return [show_key(show_id, "queue"), show_key(show_id, "queue", "members")]
+
+
+class WaitingRoom:
+    """Redis-backed admission queue per show."""
+
+    def __init__(self):
+        self._scripts = None
+
+    def _get_scripts(self):
+        if self._scripts is None:
+            r = seat_cache.get_redis()
+            self._scripts = {
+                # Returns {admitted, issued}; {-1, 0} when the room is closed
+                "admit": r.register_script(r"""
+                    local state = redis.call('HMGET', KEYS[1], 'rate', 'last_ms', 'admitted', 'issued')
+                    local rate = tonumber(state[1])
+                    if not rate then
+                        return {-1, 0}
+                    end
+                    local t = redis.call('TIME')
+                    local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+                    local last = tonumber(state[2])
+                    local admitted = tonumber(state[3]) or 0
+                    local issued = tonumber(state[4]) or 0
+                    if not last then
+                        redis.call('HSET', KEYS[1], 'last_ms', now)
+                        return {admitted, issued}
+                    end
+                    local n = math.floor((now - last) * rate / 1000)
+                    if admitted >= issued then
+                        -- Nobody waiting: don't bank admissions for a later burst
+                        redis.call('HSET', KEYS[1], 'last_ms', now)
+                    elseif n > 0 then
+                        if admitted + n >= issued then
+                            admitted = issued
+                            last = now
+                        else
+                            admitted = admitted + n
+                            last = last + math.floor(n * 1000 / rate)
+                        end
+                        redis.call('HSET', KEYS[1], 'admitted', admitted, 'last_ms', last)
+                    end
+                    return {admitted, issued}
+                """),
+                # Returns the user's ticket number (the same one on re-join), or -1 when closed
+                "join": r.register_script(r"""
+                    if redis.call('HEXISTS', KEYS[1], 'rate') == 0 then
+                        return -1
+                    end
+                    local ticket = redis.call('HGET', KEYS[2], ARGV[1])
+                    if ticket then
+                        return tonumber(ticket)
+                    end
+                    ticket = redis.call('HINCRBY', KEYS[1], 'issued', 1)
+                    redis.call('HSET', KEYS[2], ARGV[1], ticket)
+                    return ticket
+                """),
+            }
+        return self._scripts
+
+    # -- admin ---------------------------------------------------------------
+
+    def open(self, show_id: int, rate_per_second: float) -> None:
+        """Open (or re-rate) the waiting room; existing tickets keep their place."""
+        r = seat_cache.get_redis()
+        r.hset(_queue_keys(show_id)[0], "rate", rate_per_second)
+        r.sadd(ACTIVE_SET_KEY, show_id)
+
+    def close(self, show_id: int) -> None:
+        r = seat_cache.get_redis()
+        r.delete(*_queue_keys(show_id))
+        r.srem(ACTIVE_SET_KEY, show_id)
+
+    def active_show_ids(self) -> List[int]:
+        return sorted(int(s) for s in seat_cache.get_redis().smembers(ACTIVE_SET_KEY))
+
+    # -- queue ---------------------------------------------------------------
+
+    def is_active(self, show_id: int) -> bool:
+        try:
+            return bool(seat_cache.get_redis().hexists(_queue_keys(show_id)[0], "rate"))
+        except redis.ConnectionError:
+            # Fail open: without Redis no holds can be placed anyway
+            logger.warning("Redis unavailable for waiting room check")
+            return False
+
+    def admit(self, show_id: int) -> Optional[Dict]:
+        """Advance admissions by the elapsed time; None when the room is closed."""
+        admitted, issued = self._get_scripts()["admit"](keys=_queue_keys(show_id)[:1])
+        if admitted < 0:
+            return None
+        state = seat_cache.get_redis().hget(_queue_keys(show_id)[0], "rate")
+        return {"show_id": show_id, "admitted_through": int(admitted), "last_ticket": int(issued),
+                "rate_per_second": float(state) if state else None}
+
+    def join(self, show_id: int, user: str) -> Dict:
+        """Queue `user` (idempotent) and return their status, with a token once admitted."""
+        ticket = int(self._get_scripts()["join"](keys=_queue_keys(show_id), args=[user]))
+        if ticket < 0:
+            return {"show_id": show_id, "active": False, "admitted": True, "admission_token": self.issue_token(show_id, user)}
+        status = self.admit(show_id) or {"admitted_through": ticket}
+        admitted = ticket <= status["admitted_through"]
+        out = {
+            "show_id": show_id,
+            "active": True,
+            "ticket": ticket,
+            "admitted": admitted,
+            "position": max(ticket - status["admitted_through"], 0),
+        }
+        if admitted:
+            out["admission_token"] = self.issue_token(show_id, user)
+        return out
+
+    # -- tokens --------------------------------------------------------------
+
+    @staticmethod
+    def _serializer() -> URLSafeTimedSerializer:
+        return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+    def issue_token(self, show_id: int, user: str) -> str:
+        return self._serializer().dumps({"s": int(show_id), "u": str(user)})
+
+    def verify_token(self, token: Optional[str], show_id: int, user: str) -> bool:
+        if not token:
+            return False
+        try:
+            data = self._serializer().loads(token, max_age=current_app.config.get("ADMISSION_TOKEN_TTL_SECONDS", 600))
+        except (BadSignature, SignatureExpired):
+            return False
+        return data.get("s") == int(show_id) and data.get("u") == str(user)
+
+    def check_admission(self, show_id: int, user: str, token: Optional[str]):
+        """Return None if the request may proceed, else a (body, status) rejection."""
+        if not self.is_active(show_id) or self.verify_token(token, show_id, user):
+            return None
+        return {
+            "message": "This show has a waiting room; join the queue to get an admission token",
+            "error": "ADMISSION_REQUIRED",
+            "queue_url": f"/shows/{show_id}/queue",
+        }, 403
+
+
+waiting_room = WaitingRoom()
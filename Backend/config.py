@@ -17,6 +17,43 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=2)
 
     UPLOAD_FOLDER = os.path.join(basedir, "static", "uploads")
+    # Finished theatre exports (UPLOAD_FOLDER/exports) are deleted after this many seconds
+    EXPORT_TTL_SECONDS = int(os.getenv("EXPORT_TTL_SECONDS", 3600))
+    EXPORT_CLEANUP_INTERVAL_SECONDS = int(os.getenv("EXPORT_CLEANUP_INTERVAL_SECONDS", 900))
+    EXPORT_STREAM_BATCH_SIZE = int(os.getenv("EXPORT_STREAM_BATCH_SIZE", 1000))
+    SEAT_IMPORT_BATCH_SIZE = int(os.getenv("SEAT_IMPORT_BATCH_SIZE", 500))
+    SHOW_IMPORT_CHUNK_SIZE = int(os.getenv("SHOW_IMPORT_CHUNK_SIZE", 500))
+    # Show CSV uploads larger than this are imported by a Celery job
+    SHOW_IMPORT_ASYNC_BYTES = int(os.getenv("SHOW_IMPORT_ASYNC_BYTES", 256 * 1024))
+
+    # Seat holds start (and each heartbeat extends them) at SEAT_HOLD_TTL_SECONDS
+    # and never last longer than SEAT_HOLD_MAX_SECONDS in total
+    SEAT_HOLD_TTL_SECONDS = int(os.getenv("SEAT_HOLD_TTL_SECONDS", 60))
+    SEAT_HOLD_MAX_SECONDS = int(os.getenv("SEAT_HOLD_MAX_SECONDS", 900))
+
+    # Seat map cache: Redis TTL, decoded maps kept per process, and seconds a
+    # local copy is served (changes also invalidate it via pub/sub)
+    SEAT_MAP_TTL_SECONDS = int(os.getenv("SEAT_MAP_TTL_SECONDS", 86400))
+    SEAT_MAP_LRU_SIZE = int(os.getenv("SEAT_MAP_LRU_SIZE", 256))
+    SEAT_MAP_LOCAL_TTL_SECONDS = float(os.getenv("SEAT_MAP_LOCAL_TTL_SECONDS", 30))
+
+    # In-process show/offer caches in front of Redis (see cache/local_cache.py)
+    SHOW_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("SHOW_CACHE_LOCAL_TTL_SECONDS", 30))
+    OFFER_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("OFFER_CACHE_LOCAL_TTL_SECONDS", 60))
+    HOT_CACHE_REDIS_TTL_SECONDS = int(os.getenv("HOT_CACHE_REDIS_TTL_SECONDS", 300))
+
+    # Backstop sweep giving back seats of expired count-based reservations (see tasks/reservations.py)
+    RESERVATION_SWEEP_INTERVAL_SECONDS = int(os.getenv("RESERVATION_SWEEP_INTERVAL_SECONDS", 60))
+
+    # Periodic Redis-vs-DB capacity check and repair (see tasks/reconciliation.py)
+    RECONCILE_INTERVAL_SECONDS = int(os.getenv("RECONCILE_INTERVAL_SECONDS", 300))
+    RECONCILE_CHUNK_SIZE = int(os.getenv("RECONCILE_CHUNK_SIZE", 500))
+    RECONCILE_LOCK_SECONDS = int(os.getenv("RECONCILE_LOCK_SECONDS", 600))
+
+    # Redis capacity warm-up (see tasks/cache_warmup.py)
+    CAPACITY_WARMUP_CHUNK_SIZE = int(os.getenv("CAPACITY_WARMUP_CHUNK_SIZE", 1000))
+    CAPACITY_WARMUP_LOCK_SECONDS = int(os.getenv("CAPACITY_WARMUP_LOCK_SECONDS", 600))
+    CAPACITY_WARMUP_ON_WORKER_START = os.getenv("CAPACITY_WARMUP_ON_WORKER_START", "True").lower() in ("1", "true", "yes")
 
     # Mail config - prefer environment variables for credentials/secrets
     MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
@@ -31,6 +68,17 @@ class Config:
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/2")
     CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 4))
 
+    # Shared Redis connection pool for app data (see utils/redis_pool.py)
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Treat REDIS_URL as a Redis Cluster seed node; seat keys are hash-tagged by show
+    REDIS_CLUSTER = os.getenv("REDIS_CLUSTER", "False").lower() in ("1", "true", "yes")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    # Seconds to wait for a free pooled connection before failing
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+    REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 5))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+
     # Cache
     CACHE_TYPE = "RedisCache"
     CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
@@ -41,6 +89,37 @@ class Config:
     SMTP_PORT = int(os.getenv("SMTP_PORT", MAIL_PORT))
     SMTP_USERNAME = os.getenv("SMTP_USERNAME", MAIL_USERNAME)
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", MAIL_PASSWORD)
+    SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", 10))
+    # Pooled SMTP sessions per worker process (see utils/smtp_pool.py)
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+    SMTP_KEEPALIVE_SECONDS = int(os.getenv("SMTP_KEEPALIVE_SECONDS", 30))
+
+    # Periodic reminder fan-out (see tasks/emails.py)
+    REMINDER_INTERVAL_SECONDS = int(os.getenv("REMINDER_INTERVAL_SECONDS", 2000))
+    REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", 500))
+    REMINDER_CHUNKS_PER_GROUP = int(os.getenv("REMINDER_CHUNKS_PER_GROUP", 10))
+    REMINDER_RATE_PER_SECOND = float(os.getenv("REMINDER_RATE_PER_SECOND", 10))
+    REMINDER_RATE_BURST = int(os.getenv("REMINDER_RATE_BURST", 10))
+
+    # Monthly report runs on the 1st at this hour and covers the previous month
+    MONTHLY_REPORT_HOUR = int(os.getenv("MONTHLY_REPORT_HOUR", 6))
+    REPORT_STREAM_BATCH_SIZE = int(os.getenv("REPORT_STREAM_BATCH_SIZE", 1000))
+
+    # Seat updates are coalesced per show room and broadcast once per interval (see sockets.py)
+    SOCKET_BROADCAST_INTERVAL_MS = int(os.getenv("SOCKET_BROADCAST_INTERVAL_MS", 75))
+    # Redis pub/sub that fans Socket.IO events out across web workers and lets
+    # Celery workers emit; set to an empty string for a single-process server
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", REDIS_URL)
+    SOCKETIO_CHANNEL = os.getenv("SOCKETIO_CHANNEL", "flask-socketio")
+    # Broadcast seat_released when a hold key expires and reclaim expired reservations
+    # right away (needs notify-keyspace-events Ex)
+    HOLD_EXPIRY_EVENTS = os.getenv("HOLD_EXPIRY_EVENTS", "True").lower() in ("1", "true", "yes")
+
+    # Waiting room for on-sale spikes (see cache/waiting_room.py); opened per show by an admin
+    WAITING_ROOM_DEFAULT_RATE = float(os.getenv("WAITING_ROOM_DEFAULT_RATE", 10))
+    WAITING_ROOM_TICK_SECONDS = float(os.getenv("WAITING_ROOM_TICK_SECONDS", 1))
+    ADMISSION_TOKEN_TTL_SECONDS = int(os.getenv("ADMISSION_TOKEN_TTL_SECONDS", 600))
 
     # Feature flags for progressive rollout. Can be overridden in environment.
     FEATURE_FLAGS = {
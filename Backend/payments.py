@@ -11,18 +11,19 @@ from typing import Dict, Optional
 
 import redis
 
+from utils.redis_pool import get_redis_client
+
 logger = logging.getLogger(__name__)
 
 
 class PaymentSimulator:
     def __init__(self, redis_url: Optional[str] = None):
-        # Connect to Redis used by the app (accept REDIS_URL env var)
+        # Use the app's shared Redis pool unless a dedicated URL is given
         try:
             if redis_url:
                 self.redis = redis.from_url(redis_url, decode_responses=True)
             else:
-                # honor REDIS_URL env if set, otherwise default host
-                self.redis = redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'), decode_responses=True)
+                self.redis = get_redis_client()
         except Exception:
             # fall back to a local client that will raise on use
             self.redis = None
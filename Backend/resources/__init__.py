@@ -9,9 +9,10 @@ from .tickets import UserTicketsResource, TicketDetailResource, TicketDownloadRe
 from .booking import BookShowsResource
 from .search import SearchTheatresResource, SearchShowsResource
 from .user import UserProfileResource, RateShowResource
-from .export import ExportTheatreResource
+from .export import ExportTheatreResource, ExportJobResource, ExportDownloadResource
 from .theatre_seats import TheatreSeatResource, TheatreSeatsResource
-from .seat_holds import SeatHoldResource, SeatHoldReleaseResource
+from .seat_holds import SeatHoldResource, SeatHoldReleaseResource, SeatHoldHeartbeatResource
+from .waiting_room import ShowQueueResource
 from .admin import (
     AdminShowsResource,
     AdminShowDetailResource,
@@ -31,6 +32,9 @@ from .admin import (
     AdminSeatImportResource,
     AdminSeatExportResource,
     AdminBulkShowsImportResource,
+    AdminBulkShowsImportJobResource,
+    AdminCacheStatsResource,
+    AdminShowQueueResource,
 )
 
 
@@ -60,6 +64,8 @@ def register_resources(api: Api, app=None):
     # Seat hold endpoints (place temporary holds on specific seat ids)
     api.add_resource(SeatHoldResource, "/shows/<int:show_id>/hold", methods=["POST"])
     api.add_resource(SeatHoldReleaseResource, "/shows/<int:show_id>/hold/<int:reservation_id>", methods=["DELETE"])
+    api.add_resource(SeatHoldHeartbeatResource, "/shows/<int:show_id>/hold/<int:reservation_id>/heartbeat", methods=["POST"])
+    api.add_resource(ShowQueueResource, "/shows/<int:show_id>/queue")
     api.add_resource(UploadFileResource, "/uploads", methods=["POST"])
     api.add_resource(UploadedFileResource, "/uploads/<filename>", methods=["GET"])
     api.add_resource(BookShowsResource, "/bookshows/<int:show_id>/book")
@@ -72,7 +78,10 @@ def register_resources(api: Api, app=None):
     api.add_resource(SearchShowsResource, "/search/shows", methods=["GET"])
     api.add_resource(UserProfileResource, "/userprofile")
     api.add_resource(RateShowResource, "/rate/<int:show_id>", methods=["POST"])
-    api.add_resource(ExportTheatreResource, "/export_theatre/<int:theatre_id>")
+    # Theatre export jobs: enqueue, poll status, download the finished CSV
+    api.add_resource(ExportTheatreResource, "/export_theatre/<int:theatre_id>", methods=["POST"])
+    api.add_resource(ExportJobResource, "/export_theatre/<int:theatre_id>/jobs/<string:job_id>", methods=["GET"])
+    api.add_resource(ExportDownloadResource, "/export_theatre/<int:theatre_id>/jobs/<string:job_id>/download", methods=["GET"])
     api.add_resource(TheatreSeatResource, "/theatre_seats", methods=["POST", "DELETE"])
     api.add_resource(TheatreSeatsResource, "/theatres/<int:theatre_id>/seats", methods=["GET", "POST"])
 
@@ -105,3 +114,6 @@ def register_resources(api: Api, app=None):
     api.add_resource(AdminSeatImportResource, "/admin/theatres/<int:theatre_id>/seats/import")
     api.add_resource(AdminSeatExportResource, "/admin/theatres/<int:theatre_id>/seats/export")
     api.add_resource(AdminBulkShowsImportResource, "/admin/shows/import")
+    api.add_resource(AdminBulkShowsImportJobResource, "/admin/shows/import/<string:job_id>")
+    api.add_resource(AdminCacheStatsResource, "/admin/cache/stats")
+    api.add_resource(AdminShowQueueResource, "/admin/shows/<int:show_id>/queue")
@@ -1,10 +1,20 @@
-from flask import request
+from flask import request, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models import User, Show, Theatre, Ticket, TheatreSeat
+from utils.bulk import insert_ignore_conflicts
+from cache.local_cache import cache_stats, invalidate_show
+from cache.seat_cache import seat_cache
+from cache.waiting_room import waiting_room
+from utils.redis_pool import redis_pool_stats
+from tasks.imports import import_show_rows, import_shows_csv
+from tasks.reconciliation import last_reconciliation_report
 import csv
 import io
+import math
+import os
+import uuid
 from datetime import datetime, timedelta
 
 
@@ -58,6 +68,7 @@ class AdminShowsResource(Resource):
         )
         db.session.add(show)
         db.session.commit()
+        invalidate_show()
         return {"message": "Show created", "id": show.id}, 201
 
 
@@ -82,6 +93,7 @@ class AdminShowDetailResource(Resource):
         if not s:
             return {"message": "Show not found"}, 404
         data = request.get_json(force=True)
+        old_capacity = s.capacity
         for k in ["name", "start_time", "end_time", "ticket_price", "capacity", "theatre_id"]:
             if k in data:
                 val = data.get(k)
@@ -90,6 +102,10 @@ class AdminShowDetailResource(Resource):
                 else:
                     setattr(s, k, val)
         db.session.commit()
+        invalidate_show(show_id)
+        if s.capacity != old_capacity:
+            # Shift the cached count by the same amount so pending reservations stay counted
+            seat_cache.adjust_show_capacity(show_id, (s.capacity or 0) - (old_capacity or 0))
         return {"message": "Show updated"}
 
     @admin_required
@@ -99,6 +115,7 @@ class AdminShowDetailResource(Resource):
             return {"message": "Show not found"}, 404
         db.session.delete(s)
         db.session.commit()
+        invalidate_show(show_id)
         return {"message": "Show deleted"}
 
 
@@ -179,6 +196,50 @@ class AdminStatsResource(Resource):
         return {"total_bookings": total_bookings, "total_revenue": total_revenue, "top_shows": per_show_out}
 
 
+class AdminCacheStatsResource(Resource):
+    @admin_required
+    def get(self):
+        # Counters are per process; each worker reports its own
+        return {
+            "pid": os.getpid(),
+            "caches": cache_stats(),
+            "redis_pool": redis_pool_stats(),
+            "reservation_reaper": seat_cache.reservation_reaper_stats(),
+            "capacity_reconciliation": last_reconciliation_report(),
+        }
+
+
+class AdminShowQueueResource(Resource):
+    """Open, re-rate, inspect or close a show's waiting room."""
+
+    @admin_required
+    def get(self, show_id):
+        status = waiting_room.admit(show_id)
+        if status is None:
+            return {"show_id": show_id, "active": False}
+        return dict(status, active=True)
+
+    @admin_required
+    def put(self, show_id):
+        data = request.get_json() or {}
+        try:
+            rate = float(data.get("rate_per_second", current_app.config.get("WAITING_ROOM_DEFAULT_RATE", 10)))
+        except (TypeError, ValueError):
+            return {"message": "rate_per_second must be a number"}, 400
+        # NaN and infinity pass a `<= 0` check but break the admission script
+        if not math.isfinite(rate) or rate <= 0:
+            return {"message": "rate_per_second must be a positive number"}, 400
+        if not Show.query.get(show_id):
+            return {"message": "Show not found"}, 404
+        waiting_room.open(show_id, rate)
+        return dict(waiting_room.admit(show_id), active=True)
+
+    @admin_required
+    def delete(self, show_id):
+        waiting_room.close(show_id)
+        return {"show_id": show_id, "active": False}
+
+
 class AdminStatsTimeseriesResource(Resource):
     @admin_required
     def get(self):
@@ -205,34 +266,73 @@ class AdminStatsTimeseriesResource(Resource):
 class AdminSeatImportResource(Resource):
     @admin_required
     def post(self, theatre_id):
-        """Import theatre seats from uploaded CSV (row_label,seat_number,seat_type,is_active)"""
+        """Import theatre seats from uploaded CSV (row_label,seat_number,seat_type,is_active)
+
+        The upload is parsed as a stream. Existing (row, number) keys for the
+        theatre (or `screen_id`, when given) are loaded in one query, and new
+        seats are inserted in batches that skip unique-constraint conflicts.
+        """
         if 'file' not in request.files:
             return {"message": "No file provided"}, 400
         f = request.files['file']
+        screen_id = request.form.get('screen_id', type=int) or request.args.get('screen_id', type=int)
+        batch_size = current_app.config.get("SEAT_IMPORT_BATCH_SIZE", 500)
+
+        existing_q = db.session.query(TheatreSeat.row_label, TheatreSeat.seat_number).filter(TheatreSeat.theatre_id == theatre_id)
+        if screen_id:
+            existing_q = existing_q.filter(TheatreSeat.screen_id == screen_id)
+        seen = {(r, n) for r, n in existing_q}
+
+        skipped = 0
+        candidates = 0
+        invalid = []
+
+        def _rows(reader):
+            nonlocal skipped, candidates
+            for line_no, row in enumerate(reader, start=2):
+                try:
+                    row_label = (row.get('row_label') or row.get('row') or '').strip()
+                    seat_number = int(row.get('seat_number') or row.get('number'))
+                    if not row_label or seat_number <= 0:
+                        raise ValueError("row_label and a positive seat_number are required")
+                except (TypeError, ValueError) as e:
+                    invalid.append({"line": line_no, "error": str(e)})
+                    continue
+                # Avoid duplicates against the database and within the file
+                if (row_label, seat_number) in seen:
+                    skipped += 1
+                    continue
+                seen.add((row_label, seat_number))
+                candidates += 1
+                yield {
+                    "theatre_id": theatre_id,
+                    "screen_id": screen_id,
+                    "row_label": row_label,
+                    "seat_number": seat_number,
+                    "seat_type": row.get('seat_type') or 'regular',
+                    "is_active": (row.get('is_active') or 'true').lower() in ('1', 'true', 'yes'),
+                }
+
         try:
-            stream = io.StringIO(f.stream.read().decode('utf-8'))
+            stream = io.TextIOWrapper(f.stream, encoding='utf-8-sig', newline='')
             reader = csv.DictReader(stream)
-            inserted = 0
-            for row in reader:
-                row_label = row.get('row_label') or row.get('row')
-                seat_number = int(row.get('seat_number') or row.get('number'))
-                seat_type = row.get('seat_type') or 'regular'
-                is_active = row.get('is_active', 'true').lower() in ('1','true','yes')
-                # Avoid duplicates
-                exists = TheatreSeat.query.filter_by(theatre_id=theatre_id, row_label=row_label, seat_number=seat_number).first()
-                if exists:
-                    continue
-                s = TheatreSeat(theatre_id=theatre_id, row_label=row_label, seat_number=seat_number, seat_type=seat_type, is_active=is_active)
-                db.session.add(s)
-                inserted += 1
+            inserted = insert_ignore_conflicts(TheatreSeat, _rows(reader), batch_size=batch_size)
+            # Rows rejected by ON CONFLICT (e.g. a concurrent import) count as skipped
+            skipped += candidates - inserted
             db.session.commit()
             # Invalidate theatre seat map cache so frontend picks up new layout
             try:
                 from cache.seat_cache import seat_cache
-                seat_cache.delete_theatre_seat_map(theatre_id)
+                seat_cache.delete_theatre_seat_map(theatre_id, screen_id=screen_id)
             except Exception:
                 pass
-            return {"message": f"Imported {inserted} seats"}
+            return {
+                "message": f"Imported {inserted} seats",
+                "inserted": inserted,
+                "skipped": skipped,
+                "invalid": len(invalid),
+                "errors": invalid[:50],
+            }
         except Exception as e:
             db.session.rollback()
             return {"message": f"Import failed: {e}"}, 500
@@ -261,29 +361,49 @@ class AdminBulkShowsImportResource(Resource):
         if 'file' not in request.files:
             return {"message": "No file provided"}, 400
         f = request.files['file']
+
+        # Large uploads are spooled to disk and imported by a Celery job
+        if (request.content_length or 0) > current_app.config.get("SHOW_IMPORT_ASYNC_BYTES", 256 * 1024):
+            folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "imports")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"shows_{uuid.uuid4().hex}.csv")
+            f.save(path)
+            try:
+                job = import_shows_csv.delay(path)
+            except Exception as e:
+                os.remove(path)
+                return {"message": f"Import service unavailable: {e}"}, 503
+            return {
+                "status": "queued",
+                "job_id": job.id,
+                "status_url": f"/admin/shows/import/{job.id}",
+            }, 202
+
         try:
-            stream = io.StringIO(f.stream.read().decode('utf-8'))
-            reader = csv.DictReader(stream)
-            created = 0
-            for row in reader:
-                try:
-                    show = Show(
-                        name=row.get('name'),
-                        start_time=datetime.fromisoformat(row.get('start_time')) if row.get('start_time') else None,
-                        end_time=datetime.fromisoformat(row.get('end_time')) if row.get('end_time') else None,
-                        theatre_id=int(row.get('theatre_id')) if row.get('theatre_id') else None,
-                        ticket_price=float(row.get('ticket_price') or 0.0),
-                        capacity=int(row.get('capacity') or 0),
-                    )
-                    db.session.add(show)
-                    created += 1
-                except Exception:
-                    continue
-            db.session.commit()
-            return {"message": f"Created {created} shows"}
+            reader = csv.DictReader(io.TextIOWrapper(f.stream, encoding='utf-8-sig', newline=''))
+            result = import_show_rows(reader, chunk_size=current_app.config.get("SHOW_IMPORT_CHUNK_SIZE", 500))
         except Exception as e:
             db.session.rollback()
             return {"message": f"Import failed: {e}"}, 500
+        result["message"] = f"Created {result['created']} shows"
+        return result
+
+
+class AdminBulkShowsImportJobResource(Resource):
+    @admin_required
+    def get(self, job_id):
+        result = import_shows_csv.AsyncResult(job_id)
+        if result.state == 'SUCCESS':
+            out = dict(result.result or {})
+            out["status"] = "success"
+            return out
+        if result.state == 'FAILURE':
+            return {"status": "failed", "message": str(result.result)}
+        if result.state == 'PROGRESS':
+            out = dict(result.info or {})
+            out["status"] = "progress"
+            return out
+        return {"status": result.state.lower()}
 
 
 class RecommendationsResource(Resource):
@@ -3,7 +3,7 @@
 Booking Resource with proper Redis locking, DB transactions, caching, and Celery tasks.
 
 Flow:
-1. Redis atomic seat reservation - Prevent race conditions with Lua scripts
+1. Redis atomic seat reservation - Lua scripts, no per-show lock, so buyers proceed in parallel
 2. DB validation inside transaction - Ensure data consistency
 3. Write booking, update DB - Create tickets and update capacity
 4. Update Redis cache - Invalidate/update cached data
@@ -16,11 +16,35 @@ from flask import request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from extensions import db, cache
+from extensions import db
 from models import User, Show, ShowRating, Ticket, TheatreSeat, Booking
 from cache.seat_cache import seat_cache
+from cache.local_cache import invalidate_show
+from cache.waiting_room import waiting_room
 from payments import payment_simulator
 from utils.audit import log_action
+try:
+    from sockets import emit_seat_update
+except Exception:
+    emit_seat_update = None
+
+
+def _release_reservation(show_id, reservation_id, reserved_seats):
+    """Undo STEP 1 after a failed booking.
+
+    Seat holds and count-based reservations share the reservation key space,
+    so the flow decides which release runs: a count-based reservation must
+    go through `release_reservation` to get its seats back on the capacity.
+    """
+    if not reservation_id:
+        return
+    try:
+        if reserved_seats is None:
+            seat_cache.release_reservation(show_id, reservation_id)
+        else:
+            seat_cache.release_seat_hold(reservation_id, show_id)
+    except Exception as e:
+        logging.warning(f"Failed to release reservation {reservation_id} for show {show_id}: {e}")
 
 
 class BookShowsResource(Resource):
@@ -78,18 +102,26 @@ class BookShowsResource(Resource):
                         "tickets": [{"id": t.id, "seat_id": t.seat_id} for t in tickets]
                     }, 200
 
+        # Replays above go through; new bookings need an admission token while the waiting room is open
+        admission_token = request.headers.get('X-Admission-Token') or data.get('admission_token')
+        rejection = waiting_room.check_admission(show_id, current_user_username, admission_token)
+        if rejection:
+            return rejection
+
+        # Seats of the seat-level hold being booked; stays None for count-based reservations
+        reserved_seats = None
+
         # ============================================================
         # STEP 1: If a reservation_id (seat-level hold) is provided, validate it; otherwise fall back to count-based atomic reservation
         if reservation_id:
             # Validate reservation belongs to current user and covers selected seats
             try:
-                reservation_key = f"reservation:{reservation_id}"
-                res_exists = seat_cache.redis.exists(reservation_key)
-                if not res_exists:
+                reservation = seat_cache.get_reservation(show_id, reservation_id)
+                if not reservation:
                     return {"message": "Reservation not found or expired"}, 404
 
-                owner = seat_cache.redis.hget(reservation_key, 'user_id')
-                seats_csv = seat_cache.redis.hget(reservation_key, 'seats') or ''
+                owner = reservation.get('user_id')
+                seats_csv = reservation.get('seats') or ''
                 reserved_seats = seats_csv.split(',') if seats_csv else []
 
                 # Normalize selected seat ids
@@ -118,8 +150,6 @@ class BookShowsResource(Resource):
                 error_msg = reservation_result['error']
                 if error_msg == 'INSUFFICIENT_CAPACITY':
                     return {"message": "Not enough available tickets"}, 400
-                elif error_msg == 'LOCK_ACQUISITION_FAILED':
-                    return {"message": "Show is currently busy. Please try again."}, 409
                 else:
                     return {"message": "Booking service temporarily unavailable"}, 503
 
@@ -137,20 +167,12 @@ class BookShowsResource(Resource):
                 show = Show.query.with_for_update().get(show_id)
                 if not show:
                     # Release reservation if show not found
-                    try:
-                        if reservation_id:
-                            released = seat_cache.release_seat_hold(reservation_id)
-                            if not released:
-                                seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        else:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                    except Exception:
-                        seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                    _release_reservation(show_id, reservation_id, reserved_seats)
                     return {"message": "Show not found"}, 404
 
                 # Double-check capacity with DB lock held (belt and suspenders)
                 if show.capacity < number_of_tickets:
-                    seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                    _release_reservation(show_id, reservation_id, reserved_seats)
                     return {"message": "Not enough available tickets"}, 400
 
                 # ============================================================
@@ -162,15 +184,7 @@ class BookShowsResource(Resource):
                     user_rating = int(user_rating)
                     if user_rating < 1 or user_rating > 5:
                         db.session.rollback()
-                        try:
-                            if reservation_id:
-                                released = seat_cache.release_seat_hold(reservation_id)
-                                if not released:
-                                    seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                            else:
-                                seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        except Exception:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                        _release_reservation(show_id, reservation_id, reserved_seats)
                         return {
                             "message": "Invalid rating value. It should be between 1 and 5.",
                         }, 400
@@ -212,15 +226,7 @@ class BookShowsResource(Resource):
                     
                     if not theatre_seat:
                         db.session.rollback()
-                        try:
-                            if reservation_id:
-                                released = seat_cache.release_seat_hold(reservation_id)
-                                if not released:
-                                    seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                            else:
-                                seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        except Exception:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                        _release_reservation(show_id, reservation_id, reserved_seats)
                         return {"message": f"Seat {seat_id} does not exist or is not available"}, 400
                 
                 # Check for already booked seats for this show
@@ -232,15 +238,7 @@ class BookShowsResource(Resource):
                 if existing_bookings:
                     booked_seats = [ticket.seat_id for ticket in existing_bookings]
                     db.session.rollback()
-                    try:
-                        if reservation_id:
-                            released = seat_cache.release_seat_hold(reservation_id)
-                            if not released:
-                                seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        else:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                    except Exception:
-                        seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                    _release_reservation(show_id, reservation_id, reserved_seats)
                     return {"message": f"Seats already booked: {', '.join(booked_seats)}"}, 400
 
                 # Calculate total and run payment simulation before creating DB records
@@ -260,18 +258,7 @@ class BookShowsResource(Resource):
                     except Exception:
                         pass
                     # Release reservation/holds on payment failure
-                    try:
-                        if reservation_id:
-                            released = seat_cache.release_seat_hold(reservation_id)
-                            if not released:
-                                seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        else:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                    except Exception:
-                        try:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                        except Exception:
-                            pass
+                    _release_reservation(show_id, reservation_id, reserved_seats)
 
                     reason = payment_result.get('reason') if payment_result else 'payment_failed'
                     return {"message": "Payment failed", "reason": reason}, 402
@@ -340,24 +327,16 @@ class BookShowsResource(Resource):
                 # Rollback on any error and log full traceback for debugging
                 db.session.rollback()
                 logging.exception("Booking transaction failed")
-                try:
-                    if reservation_id:
-                        released = seat_cache.release_seat_hold(reservation_id)
-                        if not released:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                    else:
-                        seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                except Exception:
-                    seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+                _release_reservation(show_id, reservation_id, reserved_seats)
                 return {"message": "Booking failed due to a database error"}, 500
 
             # ============================================================
             # STEP 4: Confirm booking in Redis cache
             # ============================================================
             # If a seat-level reservation was used, confirm the seat hold; otherwise use the count-based confirm
+            seat_hold_flow = reserved_seats is not None
             try:
-                if reservation_id and 'seats' in locals() and isinstance(reserved_seats, list):
-                    # seat-level hold flow
+                if seat_hold_flow:
                     booking_confirmed = seat_cache.confirm_seat_hold(reservation_id, current_user.id, show_id)
                 else:
                     booking_confirmed = seat_cache.confirm_booking(
@@ -368,12 +347,20 @@ class BookShowsResource(Resource):
             except Exception as e:
                 logging.error(f"Error confirming booking in cache: {e}")
 
-            # Update capacity in cache
-            seat_cache.set_show_capacity(show_id, show.capacity)
+            # Count-based reservations already took their seats off the cached
+            # capacity; seat holds do not, so take them off now. Writing the DB
+            # value back would hand out seats held by other pending reservations.
+            if seat_hold_flow:
+                seat_cache.adjust_show_capacity(show_id, -number_of_tickets)
+            else:
+                # Confirming a seat hold records its seats as booked; here the
+                # seats were never held, so record them for seat map deltas
+                version = seat_cache.mark_seats_booked(show_id, seat_ids)
+                if version and emit_seat_update:
+                    emit_seat_update(show_id, 'seat_confirmed', {'reservation_id': reservation_id, 'seats': seat_ids, 'version': version})
 
             # Invalidate any cached show data
-            cache.delete(f"show_{show_id}")
-            cache.delete("all_shows")
+            invalidate_show(show_id, listing=False)
 
             logging.info(f"Cache updated for show {show_id}, new capacity: {show.capacity}")
 
@@ -425,16 +412,7 @@ class BookShowsResource(Resource):
         except Exception as e:
             # Log full traceback to help diagnose DB errors
             logging.exception("Booking process failed")
-            if 'reservation_id' in locals():
-                try:
-                    if reservation_id:
-                        released = seat_cache.release_seat_hold(reservation_id)
-                        if not released:
-                            seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                    else:
-                        seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
-                except Exception:
-                    seat_cache.release_lock_and_restore(show_id, reservation_id, number_of_tickets)
+            _release_reservation(show_id, reservation_id, reserved_seats)
             return {"message": "Booking failed"}, 500
 
     def _book_without_lock(self, show_id, number_of_tickets, user_rating, current_user):
@@ -492,6 +470,7 @@ class BookShowsResource(Resource):
 
             show.capacity -= number_of_tickets
             db.session.commit()
+            invalidate_show(show_id, listing=False)
 
             # Try to enqueue email task
             try:
@@ -1,84 +1,198 @@
 # backend/resources/export.py
-import io
+"""
+Theatre CSV export as an asynchronous job.
+
+Flow:
+1. POST /export_theatre/<id> enqueues `export_theatre_csv` and returns 202 with a job id
+2. GET  /export_theatre/<id>/jobs/<job_id> polls the Celery task state
+3. GET  /export_theatre/<id>/jobs/<job_id>/download streams the finished file as text/csv
+
+Finished files live under UPLOAD_FOLDER/exports and are removed after
+EXPORT_TTL_SECONDS by the `cleanup_expired_exports` periodic task.
+"""
+import os
 import csv
-import base64
+import logging
+import shutil
+import tempfile
+
+from flask import current_app, send_file
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
+from sqlalchemy import case, func
+
+from extensions import celery, db
+from models import Theatre, Show, Ticket
+
+
+def exports_folder(config=None) -> str:
+    config = config or current_app.config
+    return os.path.join(config["UPLOAD_FOLDER"], "exports")
 
-from extensions import celery
-from models import Theatre, Show
+
+def _export_filename(theatre_id, job_id) -> str:
+    return f"theatre_{theatre_id}_{job_id}.csv"
 
 
 class ExportTheatreResource(Resource):
     @jwt_required()
-    def get(self, theatre_id):
+    def post(self, theatre_id):
+        if not Theatre.query.get(theatre_id):
+            return {"status": "error", "message": "Theatre not found"}, 404
         try:
-            # Trigger Celery task
-            result = export_theatre_csv.delay(theatre_id)
-            # Wait for result (with timeout)
-            csv_data = result.get(timeout=30)
-
-            if csv_data:
-                # Return as base64 encoded data for frontend to download
-                encoded = base64.b64encode(csv_data.encode('utf-8')).decode('utf-8')
-                return {
-                    "status": "success",
-                    "filename": f"theatre_{theatre_id}_report.csv",
-                    "data": encoded,
-                    "content_type": "text/csv"
-                }, 200
-
-            return {"status": "error", "message": "No data generated"}, 500
+            job = export_theatre_csv.delay(theatre_id)
         except Exception as e:
-            return {"status": "error", "message": str(e)}, 500
+            logging.exception("Failed to enqueue theatre export")
+            return {"status": "error", "message": f"Export service unavailable: {e}"}, 503
+
+        return {
+            "status": "queued",
+            "job_id": job.id,
+            "status_url": f"/export_theatre/{theatre_id}/jobs/{job.id}",
+            "download_url": f"/export_theatre/{theatre_id}/jobs/{job.id}/download",
+        }, 202
+
+
+class ExportJobResource(Resource):
+    @jwt_required()
+    def get(self, theatre_id, job_id):
+        result = celery.AsyncResult(job_id)
+        state = result.state
+        if state == "SUCCESS":
+            info = result.result or {}
+            if info.get("theatre_id") != theatre_id:
+                return {"status": "error", "message": "Export job not found"}, 404
+            return {
+                "status": "success",
+                "job_id": job_id,
+                "filename": info.get("download_name"),
+                "content_type": "text/csv",
+                "download_url": f"/export_theatre/{theatre_id}/jobs/{job_id}/download",
+            }, 200
+        if state == "FAILURE":
+            return {"status": "failed", "job_id": job_id, "message": str(result.result)}, 200
+        # PENDING also covers unknown ids; Celery cannot tell them apart
+        return {"status": state.lower(), "job_id": job_id}, 200
+
+
+class ExportDownloadResource(Resource):
+    @jwt_required()
+    def get(self, theatre_id, job_id):
+        result = celery.AsyncResult(job_id)
+        if result.state != "SUCCESS":
+            return {"status": "error", "message": "Export is not ready"}, 409
+        info = result.result or {}
+        if info.get("theatre_id") != theatre_id:
+            return {"status": "error", "message": "Export job not found"}, 404
+
+        path = os.path.join(exports_folder(), _export_filename(theatre_id, job_id))
+        if not os.path.exists(path):
+            return {"status": "error", "message": "Export has expired"}, 410
+
+        return send_file(
+            path,
+            mimetype="text/csv",
+            as_attachment=True,
+            download_name=info.get("download_name") or f"theatre_{theatre_id}_report.csv",
+        )
 
 
-@celery.task(name="export_theatre_csv")
-def export_theatre_csv(theatre_id):
-    """Celery task to generate theatre CSV report"""
+@celery.task(name="export_theatre_csv", bind=True)
+def export_theatre_csv(self, theatre_id):
+    """Celery task to write the theatre CSV report to the exports folder"""
     from run import app
-    
+
     with app.app_context():
         theatre = Theatre.query.get(theatre_id)
         if not theatre:
             raise Exception(f"Theatre with ID {theatre_id} not found")
 
-        shows = Show.query.filter_by(theatre_id=theatre_id).all()
-        
-        num_bookings = sum(
-            1 for show in shows for ticket in show.tickets if ticket.user_id is not None
+        # Per-show ticket aggregates for this theatre, computed in SQL rather
+        # than by loading every Ticket through show.tickets
+        active = Ticket.status != "cancelled"
+        ticket_stats = (
+            db.session.query(
+                Ticket.show_id.label("show_id"),
+                func.count(Ticket.id).label("bookings"),
+                func.sum(case((active, Ticket.price * Ticket.quantity), else_=0)).label("revenue"),
+                func.sum(case((active, Ticket.quantity), else_=0)).label("seats_sold"),
+            )
+            .join(Show, Show.id == Ticket.show_id)
+            .filter(Show.theatre_id == theatre_id, Ticket.user_id.isnot(None))
+            .group_by(Ticket.show_id)
+            .subquery()
         )
-        avg_rating = (
-            sum(show.rating or 0 for show in shows) / len(shows)
-            if shows
-            else 0
+
+        show_rows = (
+            db.session.query(
+                Show.name, Show.start_time, Show.end_time, Show.ticket_price,
+                Show.capacity, Show.rating,
+                func.coalesce(ticket_stats.c.bookings, 0).label("bookings"),
+                func.coalesce(ticket_stats.c.revenue, 0).label("revenue"),
+                func.coalesce(ticket_stats.c.seats_sold, 0).label("seats_sold"),
+            )
+            .outerjoin(ticket_stats, ticket_stats.c.show_id == Show.id)
+            .filter(Show.theatre_id == theatre_id)
+            .order_by(Show.id)
+            .yield_per(app.config.get("EXPORT_STREAM_BATCH_SIZE", 1000))
         )
 
-        # Create CSV data
-        csv_output = io.StringIO()
-        csv_writer = csv.writer(csv_output)
-        
-        # Write header and data
-        csv_writer.writerow(["Theatre Report"])
-        csv_writer.writerow([])
-        csv_writer.writerow(["Theatre Name", theatre.name])
-        csv_writer.writerow(["Location", theatre.place])
-        csv_writer.writerow(["Capacity", theatre.capacity])
-        csv_writer.writerow(["Number of Shows", len(shows)])
-        csv_writer.writerow(["Number of Bookings", num_bookings])
-        csv_writer.writerow(["Average Rating", f"{avg_rating:.2f}"])
-        csv_writer.writerow([])
-        csv_writer.writerow(["Shows:"])
-        csv_writer.writerow(["Name", "Start Time", "End Time", "Price", "Capacity", "Rating"])
-        
-        for show in shows:
-            csv_writer.writerow([
-                show.name,
-                show.start_time.isoformat() if show.start_time else "",
-                show.end_time.isoformat() if show.end_time else "",
-                show.ticket_price,
-                show.capacity,
-                show.rating or "N/A"
-            ])
-
-        return csv_output.getvalue()
+        folder = exports_folder(app.config)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, _export_filename(theatre_id, self.request.id))
+        tmp_path = path + ".part"
+
+        # One pass over the shows: rows are spooled to disk while the totals
+        # for the header are summed, so the aggregate query runs only once
+        num_shows = num_bookings = 0
+        rating_total = 0.0
+        with tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as body:
+            body_writer = csv.writer(body)
+            for show in show_rows:
+                num_shows += 1
+                num_bookings += show.bookings
+                rating_total += show.rating or 0
+                # Show.capacity holds the seats still available, so sold + available is the house size
+                total_seats = (show.capacity or 0) + show.seats_sold
+                occupancy = show.seats_sold / total_seats if total_seats else 0
+                body_writer.writerow([
+                    show.name,
+                    show.start_time.isoformat() if show.start_time else "",
+                    show.end_time.isoformat() if show.end_time else "",
+                    show.ticket_price,
+                    show.capacity,
+                    show.rating or "N/A",
+                    show.bookings,
+                    f"{show.revenue:.2f}",
+                    f"{occupancy:.1%}",
+                ])
+            avg_rating = rating_total / num_shows if num_shows else 0
+
+            with open(tmp_path, "w", newline="", encoding="utf-8") as fh:
+                csv_writer = csv.writer(fh)
+
+                # Write header and data
+                csv_writer.writerow(["Theatre Report"])
+                csv_writer.writerow([])
+                csv_writer.writerow(["Theatre Name", theatre.name])
+                csv_writer.writerow(["Location", theatre.place])
+                csv_writer.writerow(["Capacity", theatre.capacity])
+                csv_writer.writerow(["Number of Shows", num_shows])
+                csv_writer.writerow(["Number of Bookings", num_bookings])
+                csv_writer.writerow(["Average Rating", f"{avg_rating:.2f}"])
+                csv_writer.writerow([])
+                csv_writer.writerow(["Shows:"])
+                csv_writer.writerow([
+                    "Name", "Start Time", "End Time", "Price", "Capacity", "Rating",
+                    "Bookings", "Revenue", "Occupancy",
+                ])
+                body.seek(0)
+                shutil.copyfileobj(body, fh)
+
+        # Publish atomically so a download never sees a half-written file
+        os.replace(tmp_path, path)
+
+        return {
+            "theatre_id": theatre_id,
+            "download_name": f"theatre_{theatre_id}_report.csv",
+        }
@@ -4,29 +4,44 @@ from flask_jwt_extended import jwt_required
 from datetime import datetime
 
 from extensions import db
-from models import Offer, Show, Theatre
+from models import Offer
+from cache.local_cache import offer_cache
 from .admin import admin_required
+from .show import get_show_metadata
+
+
+def _serialize_offer(o):
+    return {
+        "id": o.id,
+        "code": o.code,
+        "description": o.description,
+        "discount_type": o.discount_type,
+        "discount_value": o.discount_value,
+        "show_id": o.show_id,
+        "theatre_id": o.theatre_id,
+        "active": o.active,
+        "starts_at": o.starts_at.isoformat() if o.starts_at else None,
+        "ends_at": o.ends_at.isoformat() if o.ends_at else None,
+    }
+
+
+def _load_offer_by_code(code):
+    offer = Offer.query.filter_by(code=code, active=True).first()
+    return _serialize_offer(offer) if offer else None
+
+
+def _invalidate_offer(code):
+    offer_cache.invalidate("active")
+    offer_cache.invalidate(f"code:{code}")
 
 
 class OffersResource(Resource):
     @jwt_required()
     def get(self):
         # Public listing (only active offers)
-        offers = Offer.query.filter_by(active=True).all()
-        out = []
-        for o in offers:
-            out.append({
-                "id": o.id,
-                "code": o.code,
-                "description": o.description,
-                "discount_type": o.discount_type,
-                "discount_value": o.discount_value,
-                "show_id": o.show_id,
-                "theatre_id": o.theatre_id,
-                "active": o.active,
-                "starts_at": o.starts_at.isoformat() if o.starts_at else None,
-                "ends_at": o.ends_at.isoformat() if o.ends_at else None,
-            })
+        out = offer_cache.get_or_load(
+            "active", lambda: [_serialize_offer(o) for o in Offer.query.filter_by(active=True).all()]
+        )
         return {"offers": out}
 
     @admin_required
@@ -60,6 +75,7 @@ class OffersResource(Resource):
 
         db.session.add(o)
         db.session.commit()
+        _invalidate_offer(o.code)
         return {"message": "Offer created", "id": o.id}, 201
 
 
@@ -81,6 +97,7 @@ class OfferDetailResource(Resource):
         except Exception:
             pass
         db.session.commit()
+        _invalidate_offer(o.code)
         return {"message": "Offer updated"}
 
     @admin_required
@@ -88,37 +105,44 @@ class OfferDetailResource(Resource):
         o = Offer.query.get(offer_id)
         if not o:
             return {"message": "Offer not found"}, 404
+        code = o.code
         db.session.delete(o)
         db.session.commit()
+        _invalidate_offer(code)
         return {"message": "Offer deleted"}
 
 
 class PricingResource(Resource):
     """Return price for a show, optionally applying an offer code."""
     def get(self, show_id):
-        show = Show.query.get(show_id)
+        show = get_show_metadata(show_id)
         if not show:
             return {"message": "Show not found"}, 404
 
-        price = float(show.ticket_price or 0.0)
+        price = float(show["ticket_price"] or 0.0)
         offer_code = request.args.get("offer_code")
         applied = None
         final_price = price
         if offer_code:
-            offer = Offer.query.filter_by(code=offer_code, active=True).first()
+            offer = offer_cache.get_or_load(f"code:{offer_code}", lambda: _load_offer_by_code(offer_code))
             now = datetime.utcnow()
-            if offer and (not offer.starts_at or offer.starts_at <= now) and (not offer.ends_at or offer.ends_at >= now):
+            if offer:
+                starts_at = datetime.fromisoformat(offer["starts_at"]) if offer["starts_at"] else None
+                ends_at = datetime.fromisoformat(offer["ends_at"]) if offer["ends_at"] else None
+                if (starts_at and starts_at > now) or (ends_at and ends_at < now):
+                    offer = None
+            if offer:
                 # check scope
-                if offer.show_id and int(offer.show_id) != int(show_id):
+                if offer["show_id"] and int(offer["show_id"]) != int(show_id):
                     offer = None
-                elif offer.theatre_id and int(offer.theatre_id) != int(show.theatre_id):
+                elif offer["theatre_id"] and int(offer["theatre_id"]) != int(show["theatre_id"]):
                     offer = None
 
             if offer:
-                if offer.discount_type == 'percent':
-                    final_price = max(0.0, price * (1.0 - (offer.discount_value or 0.0) / 100.0))
+                if offer["discount_type"] == 'percent':
+                    final_price = max(0.0, price * (1.0 - (offer["discount_value"] or 0.0) / 100.0))
                 else:
-                    final_price = max(0.0, price - (offer.discount_value or 0.0))
-                applied = {"code": offer.code, "discount_type": offer.discount_type, "discount_value": offer.discount_value}
+                    final_price = max(0.0, price - (offer["discount_value"] or 0.0))
+                applied = {"code": offer["code"], "discount_type": offer["discount_type"], "discount_value": offer["discount_value"]}
 
         return {"show_id": show_id, "base_price": price, "final_price": final_price, "applied_offer": applied}
@@ -16,18 +16,16 @@ try:
 except Exception:
     TwilioClient = None
 
-import redis
-
 from extensions import db
 from models import User
+from utils.redis_pool import get_redis_client
 
 logger = logging.getLogger(__name__)
 
 
 def _redis_client():
-    url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     try:
-        return redis.from_url(url, decode_responses=True)
+        return get_redis_client()
     except Exception:
         return None
 
@@ -1,10 +1,45 @@
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from cache.seat_cache import seat_cache
+from cache.waiting_room import waiting_room
 from utils.audit import log_action
-from models import User
+from models import Show, Ticket, User
+from resources.theatre_seats import load_theatre_seat_map
+
+# Substitutes offered per conflicting seat, nearest first
+MAX_ALTERNATIVES = 10
+
+
+def same_row_alternatives(show, seats):
+    """Map each requested seat to the nearest active seats in its row.
+
+    Uses the show's (cached) seat map. Requested and booked seats are left
+    out; seats held by others are skipped by the hold script itself.
+    """
+    if not show or not show.theatre_id:
+        return {}
+    seat_map = load_theatre_seat_map(show.theatre_id, screen_id=show.screen_id)
+    by_id = {s['seat_id']: s for s in seat_map if s.get('is_active', True)}
+    wanted = [by_id[seat] for seat in seats if seat in by_id]
+    if not wanted:
+        return {}
+    rows = {s['row_label'] for s in wanted}
+    booked = {
+        seat_id for (seat_id,) in Ticket.query.with_entities(Ticket.seat_id).filter(
+            Ticket.show_id == show.id, Ticket.status != 'cancelled', Ticket.seat_row.in_(rows))
+    }
+    row_seats = {}
+    for s in by_id.values():
+        if s['row_label'] in rows and s['seat_id'] not in booked and s['seat_id'] not in seats:
+            row_seats.setdefault(s['row_label'], []).append(s)
+    alternatives = {}
+    for s in wanted:
+        nearest = sorted(row_seats.get(s['row_label'], []),
+                         key=lambda o: (abs(o['seat_number'] - s['seat_number']), o['seat_number']))
+        alternatives[s['seat_id']] = [o['seat_id'] for o in nearest[:MAX_ALTERNATIVES]]
+    return alternatives
 
 
 class SeatHoldResource(Resource):
@@ -12,12 +47,21 @@ class SeatHoldResource(Resource):
     def post(self, show_id):
         data = request.get_json() or {}
         seats = data.get('seats', [])
-        ttl = int(data.get('ttl_seconds', 120))
+        try:
+            ttl = int(data.get('ttl_seconds') or current_app.config.get('SEAT_HOLD_TTL_SECONDS', 60))
+        except (TypeError, ValueError):
+            return {'message': 'ttl_seconds must be an integer'}, 400
+        # Long checkouts keep their seats with heartbeats rather than a long first TTL
+        ttl = max(1, min(ttl, current_app.config.get('SEAT_HOLD_MAX_SECONDS', 900)))
 
         if not seats or not isinstance(seats, list):
             return {'message': 'seats must be a non-empty list of seat ids (e.g. ["A1","A2"])'}, 400
 
         current_user = get_jwt_identity()
+        token = request.headers.get('X-Admission-Token') or data.get('admission_token')
+        rejection = waiting_room.check_admission(show_id, current_user, token)
+        if rejection:
+            return rejection
         try:
             # Log user clicked seat(s)
             try:
@@ -29,15 +73,26 @@ class SeatHoldResource(Resource):
                 log_action(user_id, show_id, None, 'seat_clicked', {'seats': seats})
             except Exception:
                 pass
-            # seat_cache.hold_seats expects a numeric user id if that's how system stores it
-            # Here we pass the username/identity; backend can use numeric ids if preferred
-            res = seat_cache.hold_seats(current_user, show_id, seats, ttl_seconds=ttl)
+            # Seats taken by someone else are swapped for the nearest free ones
+            # in the same row when `substitute` is set
+            alternatives = same_row_alternatives(Show.query.get(show_id), seats) if data.get('substitute') else None
+            # The username/identity is stored as the hold's owner
+            res = seat_cache.hold_seats_bulk(current_user, show_id, seats, ttl_seconds=ttl,
+                                             partial=bool(data.get('partial')), alternatives=alternatives)
             if not res.get('success'):
                 try:
-                    log_action(user_id, show_id, None, 'seat_lock_failed', {'error': res.get('error')})
+                    log_action(user_id, show_id, None, 'seat_lock_failed', {'error': res.get('error'), 'conflicts': res.get('conflicts')})
                 except Exception:
                     pass
-                return {'message': res.get('error', 'Failed to hold seats')}, 409
+                if res.get('error') != 'SEATS_UNAVAILABLE':
+                    return {'message': res.get('error', 'Failed to hold seats')}, 409
+                return {
+                    # First seat kept in the message for clients that parse it
+                    'message': f"SEAT_ALREADY_HELD:{res['unavailable'][0]}" if res['unavailable'] else 'No seats could be held',
+                    'error': 'SEATS_UNAVAILABLE',
+                    'conflicts': res['conflicts'],
+                    'unavailable': res['unavailable'],
+                }, 409
             # Log seat locked
             try:
                 log_action(user_id, show_id, None, 'seat_locked', {'reservation_id': res.get('reservation_id'), 'seats': res.get('seats')})
@@ -47,7 +102,10 @@ class SeatHoldResource(Resource):
             return {
                 'reservation_id': res['reservation_id'],
                 'seats': res['seats'],
-                'ttl_seconds': ttl
+                'ttl_seconds': ttl,
+                'conflicts': res['conflicts'],
+                'substitutions': res['substitutions'],
+                'unavailable': res['unavailable'],
             }, 201
         except Exception as e:
             return {'message': f'Error holding seats: {e}'}, 500
@@ -59,15 +117,44 @@ class SeatHoldReleaseResource(Resource):
         current_user = get_jwt_identity()
         try:
             # Verify reservation owner if possible
-            reservation_key = f'reservation:{reservation_id}'
-            owner = seat_cache.redis.hget(reservation_key, 'user_id')
+            owner = seat_cache.get_reservation(show_id, reservation_id).get('user_id')
             if owner and str(owner) != str(current_user):
                 return {'message': 'Not authorized to release this reservation'}, 403
 
-            ok = seat_cache.release_seat_hold(reservation_id)
+            ok = seat_cache.release_seat_hold(reservation_id, show_id)
             if ok:
                 return {'message': 'Released hold'}, 200
             else:
                 return {'message': 'Failed to release hold'}, 500
         except Exception as e:
             return {'message': f'Error releasing hold: {e}'}, 500
+
+
+class SeatHoldHeartbeatResource(Resource):
+    """Keep an active checkout's seats held: extends every hold of the reservation at once."""
+
+    @jwt_required()
+    def post(self, show_id, reservation_id):
+        data = request.get_json(silent=True) or {}
+        max_seconds = current_app.config.get('SEAT_HOLD_MAX_SECONDS', 900)
+        try:
+            ttl = int(data.get('ttl_seconds') or current_app.config.get('SEAT_HOLD_TTL_SECONDS', 60))
+        except (TypeError, ValueError):
+            return {'message': 'ttl_seconds must be an integer'}, 400
+        ttl = max(1, min(ttl, max_seconds))
+
+        res = seat_cache.extend_seat_hold(reservation_id, show_id, ttl, max_seconds, user_id=get_jwt_identity())
+        if not res.get('success'):
+            error = res.get('error', '')
+            if 'NOT_OWNER' in error:
+                return {'message': 'Not authorized to extend this reservation'}, 403
+            if 'RESERVATION_NOT_FOUND' in error or 'HOLD_EXPIRED' in error:
+                return {'message': 'Hold has expired', 'error': 'HOLD_EXPIRED'}, 410
+            return {'message': f'Error extending hold: {error}'}, 500
+        return {
+            'reservation_id': reservation_id,
+            'expires_at_ms': res['expires_at_ms'],
+            'lost': res['lost'],
+            # Further heartbeats will not push the expiry past this point
+            'capped': res['capped'],
+        }, 200
@@ -6,6 +6,8 @@ from flask_jwt_extended import jwt_required
 
 from extensions import db
 from models import Show, Theatre, Ticket
+from cache.local_cache import show_cache, invalidate_show
+from cache.seat_cache import seat_cache
 
 
 show_parser = reqparse.RequestParser()
@@ -61,35 +63,49 @@ show_fields = {
 }
 
 
+def _serialize_show(show):
+    rating = show.rating if show.rating is not None else 0.0
+    return {
+        "id": show.id,
+        "name": show.name,
+        "start_time": show.start_time.isoformat() if show.start_time else None,
+        "end_time": show.end_time.isoformat() if show.end_time else None,
+        "rating": rating,
+        "tags": show.tags,
+        "ticket_price": show.ticket_price,
+        # Return image URL directly from database (supports TMDB URLs)
+        "image": show.image if show.image else None,
+        "theatre_id": show.theatre_id,
+        "capacity": show.capacity,
+        "tmdb_id": show.tmdb_id,
+        "overview": show.overview,
+        "runtime": show.runtime,
+        "release_date": show.release_date,
+        "tmdb_rating": show.tmdb_rating,
+        "backdrop": show.backdrop,
+    }
+
+
+def _load_show(show_id):
+    show = Show.query.get(show_id)
+    return _serialize_show(show) if show else None
+
+
+def get_show_metadata(show_id):
+    """Serialized show from the hot cache, or None if the show does not exist."""
+    return show_cache.get_or_load(show_id, lambda: _load_show(show_id))
+
+
 class ShowResource(Resource):
     def get(self):
-        shows = Show.query.all()
-        show_list = []
-        for show in shows:
-            rating = show.rating if show.rating is not None else 0.0
-            # Return image URL directly from database (supports TMDB URLs)
-            img_url = show.image if show.image else None
-            show_list.append(
-                {
-                    "id": show.id,
-                    "name": show.name,
-                    "start_time": show.start_time.isoformat() if show.start_time else None,
-                    "end_time": show.end_time.isoformat() if show.end_time else None,
-                    "rating": rating,
-                    "tags": show.tags,
-                    "ticket_price": show.ticket_price,
-                    "image": img_url,
-                    "theatre_id": show.theatre_id,
-                    "capacity": show.capacity,
-                    "tmdb_id": show.tmdb_id,
-                    "overview": show.overview,
-                    "runtime": show.runtime,
-                    "release_date": show.release_date,
-                    "tmdb_rating": show.tmdb_rating,
-                    "backdrop": show.backdrop,
-                }
-            )
-        return jsonify(show_list)
+        show_list = show_cache.get_or_load("all", lambda: [_serialize_show(show) for show in Show.query.all()])
+        # Live seats left for every show in one Redis round trip; fall back to
+        # the DB capacity for shows Redis does not know about
+        live = seat_cache.get_show_capacities([show["id"] for show in show_list])
+        return jsonify([
+            dict(show, remaining_capacity=live.get(show["id"]) if live.get(show["id"]) is not None else show["capacity"])
+            for show in show_list
+        ])
 
     def post(self):
         from flask import current_app
@@ -149,6 +165,7 @@ class ShowResource(Resource):
             )
             db.session.add(new_show)
             db.session.commit()
+            invalidate_show()
             return {"message": "Show created successfully"}, 201
 
         # Form-data request (accepts image URL)
@@ -189,34 +206,16 @@ class ShowResource(Resource):
 
         db.session.add(new_show)
         db.session.commit()
+        invalidate_show()
         return {"message": "Show created successfully"}, 201
 
 
 class UpdateShowResource(Resource):
     def get(self, show_id):
-        show = Show.query.get(show_id)
-        if show is None:
+        data = get_show_metadata(show_id)
+        if data is None:
             return {"message": "Show not found"}, 404
-        
-        rating = show.rating if show.rating is not None else 0.0
-        return {
-            "id": show.id,
-            "name": show.name,
-            "start_time": show.start_time.isoformat() if show.start_time else None,
-            "end_time": show.end_time.isoformat() if show.end_time else None,
-            "rating": rating,
-            "tags": show.tags,
-            "ticket_price": show.ticket_price,
-            "image": show.image,
-            "theatre_id": show.theatre_id,
-            "capacity": show.capacity,
-            "tmdb_id": show.tmdb_id,
-            "overview": show.overview,
-            "runtime": show.runtime,
-            "release_date": show.release_date,
-            "tmdb_rating": show.tmdb_rating,
-            "backdrop": show.backdrop,
-        }
+        return data
 
     @marshal_with(show_fields)
     @jwt_required()
@@ -243,6 +242,7 @@ class UpdateShowResource(Resource):
             show.theatre_id = args["theatre_id"]
 
         db.session.commit()
+        invalidate_show(show_id)
         return show
 
     @jwt_required()
@@ -252,13 +252,20 @@ class UpdateShowResource(Resource):
         if show:
             db.session.delete(show)
             db.session.commit()
+            invalidate_show(show_id)
             return {"message": "Show deleted"}
         else:
             return {"message": "Show not found"}, 404
 
 
 class ShowBookedSeatsResource(Resource):
-    """Get booked seats for a specific show - Public access for booking"""
+    """Get booked seats for a specific show - Public access for booking
+
+    `?since_version=N` returns only the seats changed after seat version N:
+    {"version", "since_version", "full": false, "changes": [{"seat_id", "state", "reservation_id", "version"}]}.
+    If the delta cannot be served (Redis down or reset), the full
+    response below is returned with "full": true.
+    """
 
     def get(self, show_id):
         try:
@@ -266,13 +273,29 @@ class ShowBookedSeatsResource(Resource):
             if not show:
                 return {"message": "Show not found"}, 404
 
+            from cache.seat_cache import seat_cache
+            since_version = request.args.get("since_version", type=int)
+            if since_version is not None:
+                version, changes = seat_cache.get_seat_changes(show_id, since_version)
+                if version is not None and since_version <= version:
+                    return {
+                        "show_id": show_id,
+                        "version": version,
+                        "since_version": since_version,
+                        "full": False,
+                        "changes": changes,
+                    }
+
+            # Read the version before the seat lists so changes made meanwhile
+            # are picked up by the client's next delta
+            version = seat_cache.get_seat_version(show_id)
+
             # Get all booked seats for this show
-            booked_tickets = Ticket.query.filter_by(show_id=show_id).all()
+            booked_tickets = Ticket.query.filter(Ticket.show_id == show_id, Ticket.status != 'cancelled').all()
             booked_seat_ids = [ticket.seat_id for ticket in booked_tickets if ticket.seat_id]
 
             # Also include active holds from Redis so frontend can treat held seats as temporarily unavailable
             try:
-                from cache.seat_cache import seat_cache
                 active_holds = seat_cache.get_active_holds(show_id)
                 # Build a mapping seat_id -> reservation_id
                 held_map = {h['seat_id']: h['reservation_id'] for h in active_holds}
@@ -289,7 +312,9 @@ class ShowBookedSeatsResource(Resource):
                 "booked_seats": booked_seat_ids,
                 "held_seats_map": held_map,
                 "held_seats": held_seat_ids,
-                "total_booked": len(booked_seat_ids)
+                "total_booked": len(booked_seat_ids),
+                "version": version,
+                "full": True,
             }
         except Exception as e:
             import logging, traceback
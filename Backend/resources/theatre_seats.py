@@ -6,6 +6,10 @@ from flask_jwt_extended import jwt_required
 from extensions import db
 from models import Theatre, TheatreSeat
 from cache.seat_cache import seat_cache
+from utils.bulk import insert_ignore_conflicts
+
+# Upper bound on seats created by one bulk request
+MAX_BULK_SEATS = 5000
 
 
 theatre_seat_parser = reqparse.RequestParser()
@@ -15,6 +19,140 @@ theatre_seat_parser.add_argument("seat_number", type=int, required=True, help="S
 theatre_seat_parser.add_argument("seat_type", type=str, default="regular", help="Seat type (regular, premium, wheelchair)")
 
 
+def load_theatre_seat_map(theatre_id, screen_id=None):
+    """Seat list for a theatre (or one of its screens), from the seat map cache or the DB.
+
+    The list may be shared with other callers and must not be modified.
+    """
+    cached = seat_cache.get_theatre_seat_map(theatre_id, screen_id=screen_id)
+    if cached is not None:
+        return cached
+
+    # Read the layout version (and local generation) before the rows so a
+    # concurrent change is not cached
+    generation = seat_cache.get_theatre_seat_map_generation(theatre_id, screen_id=screen_id)
+    version = seat_cache.get_theatre_seat_map_version(theatre_id, screen_id=screen_id)
+    seats_q = TheatreSeat.query.filter_by(theatre_id=theatre_id)
+    if screen_id:
+        seats_q = seats_q.filter_by(screen_id=screen_id)
+    seats = seats_q.order_by(TheatreSeat.row_label, TheatreSeat.seat_number).all()
+    seat_list = []
+    for seat in seats:
+        seat_list.append({
+            "id": seat.id,
+            "row_label": seat.row_label,
+            "seat_number": seat.seat_number,
+            "seat_type": seat.seat_type,
+            "is_active": seat.is_active,
+            "seat_id": f"{seat.row_label}{seat.seat_number}"
+        })
+
+    # Populate cache for future reads
+    try:
+        seat_cache.set_theatre_seat_map(theatre_id, seat_list, version=version, screen_id=screen_id,
+                                        generation=generation)
+    except Exception:
+        pass
+    return seat_list
+
+
+def _row_count(spec):
+    """Number of rows `_expand_rows` would return, without building them."""
+    if isinstance(spec, list):
+        return len(spec)
+    spec = str(spec).strip()
+    if '-' in spec:
+        first, last = [p.strip().upper() for p in spec.split('-', 1)]
+        if len(first) != 1 or len(last) != 1 or first > last:
+            raise ValueError(f"bad row range '{spec}'")
+        return ord(last) - ord(first) + 1
+    return 1
+
+
+def _expand_rows(spec):
+    """Row labels from a list (["A", "B"]) or a letter range ("A-J")."""
+    if isinstance(spec, list):
+        return [str(r).strip() for r in spec]
+    spec = str(spec).strip()
+    if '-' in spec:
+        first = spec.split('-', 1)[0].strip().upper()
+        return [chr(c) for c in range(ord(first), ord(first) + _row_count(spec))]
+    return [spec]
+
+
+def _number_count(spec):
+    """Number of seats `_expand_numbers` would return, without building them."""
+    if isinstance(spec, list):
+        return len(spec)
+    spec = str(spec).strip()
+    if '-' in spec:
+        first, last = [int(p) for p in spec.split('-', 1)]
+        if first < 1 or first > last:
+            raise ValueError(f"bad seat range '{spec}'")
+        return last - first + 1
+    int(spec)
+    return 1
+
+
+def _expand_numbers(spec):
+    """Seat numbers from a list ([1, 2]), a range ("1-15") or a single number."""
+    if isinstance(spec, list):
+        return [int(n) for n in spec]
+    spec = str(spec).strip()
+    if '-' in spec:
+        first = int(spec.split('-', 1)[0])
+        return list(range(first, first + _number_count(spec)))
+    return [int(spec)]
+
+
+def _check_layout_size(blocks, max_seats):
+    """Reject a layout with more than `max_seats` seats, or an override
+    spanning more cells than that, using the range bounds alone so nothing
+    is expanded first."""
+    total = 0
+    for block in blocks:
+        block_numbers = _number_count(block['seats'])
+        total += _row_count(block['rows']) * block_numbers
+        if total > max_seats:
+            raise ValueError(f"layout covers more than {max_seats} seats")
+        for override in block.get('overrides') or []:
+            numbers = _number_count(override['seats']) if override.get('seats') else block_numbers
+            if _row_count(override['rows']) * numbers > max_seats:
+                raise ValueError(f"override covers more than {max_seats} seats")
+
+
+def expand_seat_layout(layout, max_seats=None):
+    """Expand a compact layout spec into seat dicts.
+
+    A layout is one block, or a list of blocks, of the form
+    {"rows": "A-J", "seats": "1-15", "seat_type": "regular",
+     "overrides": [{"rows": "I-J", "seat_type": "premium"},
+                   {"rows": "A", "seats": [1, 15], "seat_type": "wheelchair"}]}
+    Overrides apply in order; one without `seats` covers the whole row.
+    With `max_seats`, a larger layout raises ValueError before any seat is built.
+    """
+    blocks = layout if isinstance(layout, list) else [layout]
+    if max_seats is not None:
+        _check_layout_size(blocks, max_seats)
+    seats = {}
+    for block in blocks:
+        default_type = block.get('seat_type') or 'regular'
+        numbers = _expand_numbers(block['seats'])
+        for row in _expand_rows(block['rows']):
+            for number in numbers:
+                seats[(row, number)] = default_type
+        for override in block.get('overrides') or []:
+            override_numbers = _expand_numbers(override['seats']) if override.get('seats') else None
+            for row in _expand_rows(override['rows']):
+                for number in override_numbers or numbers:
+                    if (row, number) in seats:
+                        seats[(row, number)] = override['seat_type']
+    return [
+        {"row_label": row, "seat_number": number, "seat_type": seat_type}
+        for (row, number), seat_type in seats.items()
+    ]
+
+
 class TheatreSeatResource(Resource):
     """Manage individual theatre seats"""
 
@@ -49,6 +187,11 @@ class TheatreSeatResource(Resource):
         try:
             db.session.add(seat)
             db.session.commit()
+            # Invalidate theatre seat map cache
+            try:
+                seat_cache.delete_theatre_seat_map(seat.theatre_id)
+            except Exception:
+                pass
             return {
                 "message": "Seat created successfully",
                 "seat": {
@@ -76,7 +219,7 @@ class TheatreSeatResource(Resource):
             db.session.commit()
             # Invalidate theatre seat map cache
             try:
-                seat_cache.delete_theatre_seat_map(seat.theatre_id)
+                seat_cache.delete_theatre_seat_map(seat.theatre_id, screen_id=seat.screen_id)
             except Exception:
                 pass
             return {"message": "Seat deleted successfully"}
@@ -93,93 +236,88 @@ class TheatreSeatsResource(Resource):
         theatre = Theatre.query.get(theatre_id)
         if not theatre:
             return {"message": "Theatre not found"}, 404
-        # Try Redis cache first
-        cached = seat_cache.get_theatre_seat_map(theatre_id)
-        if cached is not None:
-            return {"seats": cached}
-
-        seats = TheatreSeat.query.filter_by(theatre_id=theatre_id).all()
-        seat_list = []
-        for seat in seats:
-            seat_list.append({
-                "id": seat.id,
-                "row_label": seat.row_label,
-                "seat_number": seat.seat_number,
-                "seat_type": seat.seat_type,
-                "is_active": seat.is_active,
-                "seat_id": f"{seat.row_label}{seat.seat_number}"
-            })
-
-        # Populate cache for future reads
-        try:
-            seat_cache.set_theatre_seat_map(theatre_id, seat_list)
-        except Exception:
-            pass
-
-        return {"seats": seat_list}
+        screen_id = request.args.get('screen_id', type=int)
+        return {"seats": load_theatre_seat_map(theatre_id, screen_id=screen_id)}
 
     @jwt_required()
     def post(self, theatre_id):
-        """Bulk create seats for a theatre"""
-        data = request.get_json()
+        """Bulk create seats for a theatre
+
+        Accepts either an explicit `seats` list or a compact `layout` spec
+        (see `expand_seat_layout`). Existing seats are loaded in one query
+        and the new ones are written with a set-based insert.
+        """
+        data = request.get_json() or {}
 
         theatre = Theatre.query.get(theatre_id)
         if not theatre:
             return {"message": "Theatre not found"}, 404
 
-        seats_data = data.get('seats', [])
+        errors = []
+        if data.get('layout'):
+            try:
+                seats_data = expand_seat_layout(data['layout'], max_seats=MAX_BULK_SEATS)
+            except (TypeError, ValueError, KeyError) as e:
+                return {"message": f"Invalid layout: {e}"}, 400
+        else:
+            seats_data = data.get('seats', [])
         if not seats_data:
             return {"message": "No seats data provided"}, 400
+        if len(seats_data) > MAX_BULK_SEATS:
+            return {"message": f"At most {MAX_BULK_SEATS} seats can be created per request"}, 400
 
-        created_seats = []
-        errors = []
+        screen_id = data.get('screen_id')
+        existing_q = db.session.query(TheatreSeat.row_label, TheatreSeat.seat_number).filter(TheatreSeat.theatre_id == theatre_id)
+        if screen_id:
+            existing_q = existing_q.filter(TheatreSeat.screen_id == screen_id)
+        seen = {(r, n) for r, n in existing_q}
 
+        rows = []
         for seat_data in seats_data:
             try:
-                # Check if seat already exists
-                existing_seat = TheatreSeat.query.filter_by(
-                    theatre_id=theatre_id,
-                    row_label=seat_data['row_label'],
-                    seat_number=seat_data['seat_number']
-                ).first()
-
-                if existing_seat:
-                    errors.append(f"Seat {seat_data['row_label']}{seat_data['seat_number']} already exists")
-                    continue
-
-                seat = TheatreSeat(
-                    theatre_id=theatre_id,
-                    row_label=seat_data['row_label'],
-                    seat_number=seat_data['seat_number'],
-                    seat_type=seat_data.get('seat_type', 'regular')
-                )
-
-                db.session.add(seat)
-                created_seats.append({
-                    "row_label": seat.row_label,
-                    "seat_number": seat.seat_number,
-                    "seat_type": seat.seat_type,
-                    "seat_id": f"{seat.row_label}{seat.seat_number}"
-                })
-
-            except Exception as e:
+                row_label = str(seat_data['row_label']).strip()
+                seat_number = int(seat_data['seat_number'])
+            except (KeyError, TypeError, ValueError) as e:
                 errors.append(f"Error creating seat {seat_data.get('row_label', '?')}{seat_data.get('seat_number', '?')}: {str(e)}")
+                continue
+            if (row_label, seat_number) in seen:
+                errors.append(f"Seat {row_label}{seat_number} already exists")
+                continue
+            seen.add((row_label, seat_number))
+            rows.append({
+                "theatre_id": theatre_id,
+                "screen_id": screen_id,
+                "row_label": row_label,
+                "seat_number": seat_number,
+                "seat_type": seat_data.get('seat_type') or 'regular',
+                "is_active": True,
+            })
 
-        if created_seats:
-            try:
-                db.session.commit()
-                # Invalidate theatre seat map cache
-                try:
-                    seat_cache.delete_theatre_seat_map(theatre_id)
-                except Exception:
-                    pass
-                return {
-                    "message": f"Created {len(created_seats)} seats successfully",
-                    "created_seats": created_seats,
-                    "errors": errors if errors else None
-                }, 201
-            except Exception as e:
-                db.session.rollback()
-                return {"message": "Failed to create seats", "error": str(e)}, 500
-        else:
-            return {"message": "No seats were created", "errors": errors}, 400
\ No newline at end of file
+        if not rows:
+            return {"message": "No seats were created", "errors": errors}, 400
+
+        try:
+            # The whole payload goes out as a single multi-row INSERT
+            inserted = insert_ignore_conflicts(TheatreSeat, rows, batch_size=len(rows))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {"message": "Failed to create seats", "error": str(e)}, 500
+
+        # Invalidate theatre seat map cache
+        try:
+            seat_cache.delete_theatre_seat_map(theatre_id, screen_id=screen_id)
+        except Exception:
+            pass
+        if inserted < len(rows):
+            errors.append(f"{len(rows) - inserted} seats were created concurrently and skipped")
+        return {
+            "message": f"Created {inserted} seats successfully",
+            "created_seats": [{
+                "row_label": r["row_label"],
+                "seat_number": r["seat_number"],
+                "seat_type": r["seat_type"],
+                "seat_id": f"{r['row_label']}{r['seat_number']}"
+            } for r in rows],
+            "errors": errors if errors else None
+        }, 201
@@ -4,17 +4,22 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from io import BytesIO
 from datetime import datetime, timedelta
 import os
+from functools import lru_cache
 from reportlab.lib.units import mm
 import logging
 
 from extensions import db
 from models import Ticket, Show, User
 from cache.seat_cache import seat_cache
+from cache.local_cache import invalidate_show
+try:
+    from sockets import emit_seat_update
+except Exception:
+    emit_seat_update = None
 
 try:
     from reportlab.lib.pagesizes import A4
     from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
     REPORTLAB_AVAILABLE = True
 except Exception:
     REPORTLAB_AVAILABLE = False
@@ -22,41 +27,112 @@ except Exception:
 
 try:
     import qrcode
-    from PIL import Image
     QR_AVAILABLE = True
 except Exception:
     QR_AVAILABLE = False
 
 
-def generate_ticket_pdf_bytes(ticket: Ticket) -> bytes:
-    """Generate a simple PDF for a ticket and return bytes. Requires reportlab."""
-    if not REPORTLAB_AVAILABLE:
-        raise RuntimeError('reportlab not installed')
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
+# Page geometry shared by the static template and the per-ticket drawing
+PAGE_MARGIN = 72
+QR_SIZE_PT = 120  # points (~1.67 inches)
+LABEL_COLUMN_PT = 80
+TICKET_TEMPLATE_FORM = 'ticket_template'
+QR_MASK_PATTERN = 0
 
-    margin = 72
+# Fixed positions of the metadata rows, top to bottom
+_DETAIL_LABELS = ('Ticket ID:', 'Date/Time:', 'Seat(s):', 'Price:', 'Booked By:')
+_DETAIL_LINE_PT = 16
+
+
+def _detail_rows_top(height):
+    # Leave room for the title and the optional theatre subheader
+    return height - PAGE_MARGIN - 46
+
+
+def _draw_ticket_template(c, width, height):
+    """Record the static parts of a ticket page as a form XObject.
+
+    The form is written once per document and placed on every page with
+    `doForm`, so multi-ticket PDFs do not redraw labels and captions.
+    """
+    c.beginForm(TICKET_TEMPLATE_FORM)
+    c.setFont('Helvetica', 12)
+    y = _detail_rows_top(height)
+    for label in _DETAIL_LABELS:
+        c.drawString(PAGE_MARGIN, y, label)
+        y -= _DETAIL_LINE_PT
+
+    c.setFont('Helvetica-Oblique', 9)
+    c.drawString(PAGE_MARGIN, y - 10, 'Generated:')
+
+    if QR_AVAILABLE:
+        qr_x = width - PAGE_MARGIN - QR_SIZE_PT
+        c.setFont('Helvetica', 8)
+        c.drawCentredString(qr_x + (QR_SIZE_PT / 2), PAGE_MARGIN - 10, 'Scan to view ticket')
+    c.endForm()
+
+
+def _qr_payload(ticket) -> str:
+    # Prefer a configured base URL so QR links directly to a downloadable URL when scanned.
+    base = os.environ.get('TICKETS_BASE_URL')
+    if base:
+        return f"{base.rstrip('/')}/tickets/{ticket.id}/download"
+    return f"ticket:{ticket.id}"
+
+
+@lru_cache(maxsize=1024)
+def _qr_path(payload: str):
+    """Return (modules, ops) for a QR code, where `ops` is the PDF fill path
+    for the dark modules in module units, one rectangle per horizontal run.
+
+    Working from the module matrix keeps PIL out of the hot path entirely.
+    A fixed mask pattern skips qrcode's eight-way mask scoring, which is the
+    bulk of its CPU cost; any mask yields a valid code.
+    """
+    qr = qrcode.QRCode(border=2, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    ops = []
+    for r, row in enumerate(matrix):
+        start = None
+        for col, dark in enumerate(row):
+            if dark and start is None:
+                start = col
+            elif not dark and start is not None:
+                ops.append(f"{start} {r} {col - start} 1 re")
+                start = None
+        if start is not None:
+            ops.append(f"{start} {r} {len(row) - start} 1 re")
+    ops.append('f')
+    return len(matrix), "\n".join(ops)
+
+
+def _draw_qr(c, payload: str, x: float, y: float, size: float):
+    """Draw a QR code as a single filled vector path."""
+    modules, ops = _qr_path(payload)
+    module = size / modules
+    c.saveState()
+    # Flip to row-major module coordinates anchored at the top-left corner
+    c.translate(x, y + size)
+    c.scale(module, -module)
+    c.addLiteral(ops)
+    c.restoreState()
+
+
+def _draw_ticket_page(c, ticket, width, height, generated_text):
+    c.doForm(TICKET_TEMPLATE_FORM)
 
     # Header - centered show / product name
     c.setFont('Helvetica-Bold', 22)
     title = (ticket.event.name if getattr(ticket, 'event', None) and ticket.event.name else 'Ticket')
-    c.drawCentredString(width / 2, height - margin, title)
+    c.drawCentredString(width / 2, height - PAGE_MARGIN, title)
 
-    # Subheader - theatre/place and booking id
-    c.setFont('Helvetica', 11)
-    y = height - margin - 28
+    # Subheader - theatre/place
     theatre_name = (ticket.event.theatre.name if getattr(ticket, 'event', None) and ticket.event.theatre else '')
     if theatre_name:
-        c.drawCentredString(width / 2, y, theatre_name)
-        y -= 18
-
-    # Ticket metadata box (left column)
-    left_x = margin
-    col_y = y
-    c.setFont('Helvetica', 12)
-    c.drawString(left_x, col_y, f'Ticket ID: {ticket.id}')
-    col_y -= 16
+        c.setFont('Helvetica', 11)
+        c.drawCentredString(width / 2, height - PAGE_MARGIN - 28, theatre_name)
 
     # Show date/time formatting
     show_time_text = 'N/A'
@@ -72,9 +148,6 @@ def generate_ticket_pdf_bytes(ticket: Ticket) -> bytes:
     except Exception:
         show_time_text = getattr(ticket, 'start_time', 'N/A') or 'N/A'
 
-    c.drawString(left_x, col_y, f'Date/Time: {show_time_text}')
-    col_y -= 16
-
     # Seats - prefer seat_id, else row+number, else quantity
     seats_text = 'General Admission'
     try:
@@ -87,48 +160,59 @@ def generate_ticket_pdf_bytes(ticket: Ticket) -> bytes:
     except Exception:
         seats_text = 'N/A'
 
-    c.drawString(left_x, col_y, f'Seat(s): {seats_text}')
-    col_y -= 16
-
-    c.drawString(left_x, col_y, f'Price: ₹{ticket.price}')
-    col_y -= 16
-    c.drawString(left_x, col_y, f'Booked By: {ticket.purchased_by.username if getattr(ticket, "purchased_by", None) else "N/A"}')
-    col_y -= 26
+    values = (
+        str(ticket.id),
+        show_time_text,
+        seats_text,
+        f'₹{ticket.price}',
+        ticket.purchased_by.username if getattr(ticket, "purchased_by", None) else "N/A",
+    )
+
+    # Ticket metadata values, aligned with the template labels
+    value_x = PAGE_MARGIN + LABEL_COLUMN_PT
+    y = _detail_rows_top(height)
+    c.setFont('Helvetica', 12)
+    for value in values:
+        c.drawString(value_x, y, value)
+        y -= _DETAIL_LINE_PT
 
-    # Footer generated timestamp
     c.setFont('Helvetica-Oblique', 9)
-    c.drawString(left_x, col_y, f'Generated: {datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")}')
+    c.drawString(PAGE_MARGIN + 50, y - 10, generated_text)
 
     # Embed QR code (if available) at bottom-right
     try:
         if QR_AVAILABLE:
-            # Prefer a configured base URL so QR links directly to a downloadable URL when scanned.
-            base = os.environ.get('TICKETS_BASE_URL')
-            if base:
-                qr_payload = f"{base.rstrip('/')}/tickets/{ticket.id}/download"
-            else:
-                qr_payload = f"ticket:{ticket.id}"
-
-            # Create a reasonably-sized QR and embed as points (PDF units)
-            qr_img = qrcode.make(qr_payload, box_size=8, border=2).convert('RGB')
-            qr_size_pt = 120  # points (~1.67 inches)
-            ir = ImageReader(qr_img)
-            qr_x = width - margin - qr_size_pt
-            qr_y = margin
-            c.drawImage(ir, qr_x, qr_y, width=qr_size_pt, height=qr_size_pt)
-
-            # Small caption under QR
-            c.setFont('Helvetica', 8)
-            c.drawCentredString(qr_x + (qr_size_pt / 2), qr_y - 10, 'Scan to view ticket')
+            qr_x = width - PAGE_MARGIN - QR_SIZE_PT
+            _draw_qr(c, _qr_payload(ticket), qr_x, PAGE_MARGIN, QR_SIZE_PT)
     except Exception:
         # Don't fail PDF generation for QR issues
         logging.exception('QR generation failed for ticket %s', getattr(ticket, 'id', 'unknown'))
 
-    c.showPage()
+
+def render_tickets_pdf(tickets) -> bytes:
+    """Render one page per ticket into a single PDF and return bytes. Requires reportlab.
+
+    The static template is recorded once and reused by every page.
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise RuntimeError('reportlab not installed')
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    _draw_ticket_template(c, width, height)
+    generated_text = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    for ticket in tickets:
+        _draw_ticket_page(c, ticket, width, height, generated_text)
+        c.showPage()
     c.save()
 
-    buffer.seek(0)
-    return buffer.read()
+    return buffer.getvalue()
+
+
+def generate_ticket_pdf_bytes(ticket: Ticket) -> bytes:
+    """Generate a simple PDF for a ticket and return bytes. Requires reportlab."""
+    return render_tickets_pdf([ticket])
 
 
 class UserTicketsResource(Resource):
@@ -256,7 +340,13 @@ class TicketCancelResource(Resource):
                 show.capacity = (show.capacity or 0) + ticket.quantity
                 db.session.add(show)
                 db.session.commit()
-                seat_cache.set_show_capacity(show.id, show.capacity)
+                seat_cache.adjust_show_capacity(show.id, ticket.quantity)
+                invalidate_show(show.id, listing=False)
+                if ticket.seat_id:
+                    # Free the seat in the show's seat log so live seat maps pick it up
+                    version = seat_cache.mark_seats_free(show.id, [ticket.seat_id])
+                    if version and emit_seat_update:
+                        emit_seat_update(show.id, 'seat_released', {'reservation_id': None, 'seats': [ticket.seat_id], 'version': version})
             except Exception:
                 db.session.rollback()
                 # still mark the ticket cancelled locally
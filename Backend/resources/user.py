@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from extensions import db
 from models import User, Ticket, Show, ShowRating
+from cache.local_cache import invalidate_show
 
 
 class UserProfileResource(Resource):
@@ -111,5 +112,6 @@ class RateShowResource(Resource):
         show.rating = average_rating
 
         db.session.commit()
+        invalidate_show(show_id)
 
         return {"message": "Rating submitted successfully", "new_rating": int(rating_value)}
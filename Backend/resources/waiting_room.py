@@ -0,0 +1,31 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import logging
+import redis
+
+from cache.waiting_room import waiting_room
+
+
+class ShowQueueResource(Resource):
+    """Waiting room for a show: join the queue and collect an admission token."""
+
+    def get(self, show_id):
+        # Public queue progress; clients compare it with their ticket number
+        try:
+            status = waiting_room.admit(show_id)
+        except redis.ConnectionError:
+            return {"message": "Waiting room unavailable"}, 503
+        if status is None:
+            return {"show_id": show_id, "active": False}
+        return dict(status, active=True)
+
+    @jwt_required()
+    def post(self, show_id):
+        # Idempotent: calling again returns the same ticket, plus a token once admitted
+        try:
+            return waiting_room.join(show_id, get_jwt_identity())
+        except redis.ConnectionError:
+            return {"message": "Waiting room unavailable"}, 503
+        except Exception as e:
+            logging.exception(f"Failed to join waiting room for show {show_id}: {e}")
+            return {"message": "Failed to join waiting room"}, 500
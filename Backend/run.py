@@ -97,14 +97,11 @@ else:
 def init_redis_cache():
     """Initialize Redis cache with current show capacities"""
     try:
-        from models import Show
-        from cache.seat_cache import seat_cache
-        
+        from tasks.cache_warmup import warm_show_capacities_from_db
+
         with app.app_context():
-            shows = Show.query.all()
-            for show in shows:
-                seat_cache.set_show_capacity(show.id, show.capacity)
-                print(f"Initialized cache for show {show.id}: capacity {show.capacity}")
+            result = warm_show_capacities_from_db()
+            print(f"Initialized cache for {result['written']} of {result['shows']} upcoming shows")
     except Exception as e:
         print(f"Failed to initialize Redis cache: {e}")
 
@@ -202,6 +199,18 @@ def popularity_graph_image():
     data_uri = "data:image/png;base64," + img_base64
     return jsonify(data_uri)
 
+# CLI: warm Redis show capacities (safe to run on every deploy)
+@app.cli.command("warm_cache")
+@click.option("--overwrite", is_flag=True, help="Reset capacities that are already in Redis")
+@click.option("--chunk-size", type=int, default=None, help="Shows per Redis pipeline")
+def warm_cache(overwrite, chunk_size):
+    from tasks.cache_warmup import warm_show_capacities_from_db
+
+    with app.app_context():
+        result = warm_show_capacities_from_db(chunk_size=chunk_size, overwrite=overwrite)
+    print(f"Warmed {result['written']} of {result['shows']} upcoming shows in {result['seconds']}s")
+
+
 @app.cli.command("seed_shows")
 def seed_shows():
     """Seed the database with a sample theatre and a few shows."""
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for ticket PDF rendering (tickets/sec on a single core).
+
+No database is needed; tickets are lightweight stand-ins with the attributes
+the renderer reads. Run from the `Backend` folder:
+    python3 scripts/bench_ticket_pdf.py --tickets 500
+    python3 scripts/bench_ticket_pdf.py --tickets 500 --batch 10
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Ensure project root is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resources.tickets import generate_ticket_pdf_bytes, render_tickets_pdf
+
+
+def make_ticket(i):
+    theatre = SimpleNamespace(name='NovaSeat Main')
+    show = SimpleNamespace(name='Dune: Part Two', theatre=theatre, start_time=datetime.utcnow() + timedelta(days=1))
+    return SimpleNamespace(
+        id=100000 + i,
+        event=show,
+        show_id=1,
+        seat_id=f"{chr(ord('A') + i % 10)}{i % 15 + 1}",
+        seat_row=None,
+        seat_number=None,
+        quantity=1,
+        price=350.0,
+        purchased_by=SimpleNamespace(username='bench'),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickets', type=int, default=200, help='number of tickets to render')
+    parser.add_argument('--batch', type=int, default=1, help='tickets per PDF document')
+    args = parser.parse_args()
+
+    tickets = [make_ticket(i) for i in range(args.tickets)]
+
+    # Warm up imports, fonts and the QR cache for one ticket
+    generate_ticket_pdf_bytes(make_ticket(-1))
+
+    start = time.perf_counter()
+    total_bytes = 0
+    if args.batch <= 1:
+        for t in tickets:
+            total_bytes += len(generate_ticket_pdf_bytes(t))
+    else:
+        for i in range(0, len(tickets), args.batch):
+            total_bytes += len(render_tickets_pdf(tickets[i:i + args.batch]))
+    elapsed = time.perf_counter() - start
+
+    print(f"Rendered {len(tickets)} tickets in {elapsed:.3f}s (batch={args.batch})")
+    print(f"  {len(tickets) / elapsed:.1f} tickets/sec/core")
+    print(f"  {total_bytes / max(len(tickets), 1) / 1024:.1f} KiB per ticket")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,20 +2,195 @@
 
 This module exposes `init_socketio(app)` which returns a `SocketIO` instance
 and `emit_seat_update(show_id, event_type, payload)` for other modules to call.
+
+Seat updates are not emitted from the request that caused them. They are
+queued per room and a background task flushes every SOCKET_BROADCAST_INTERVAL_MS,
+sending one `seat_diff` per room with the net change over the window:
+
+    {'show_id': 1, 'seq': 42, 'version': 310, 'held': {'A1': 17}, 'released': ['B3'], 'booked': ['C4']}
+
+`seq` increases by one per diff for a show. `version` is the show's seat
+state version (see cache/seat_cache.py) after the newest change in the diff.
+A client that sees a gap catches up with
+`GET /shows/<id>/booked-seats?since_version=<version>`, or emits
+`request_snapshot` and gets a `seat_snapshot` with the full state, tagged
+with the sequence and version it is current as of.
+
+Clients waiting in a show's waiting room join `queue_<id>` with
+`join_queue`. About once a second one process advances admissions for
+every open waiting room and broadcasts a `queue_update` with the highest
+admitted ticket number, which each client compares with its own ticket.
+
+With SOCKETIO_MESSAGE_QUEUE set, every emit goes through Redis pub/sub so
+clients connected to any web worker receive it. Processes that serve no
+clients (Celery workers) call `init_socketio_emitter()` to get a write-only
+instance; their seat updates are published straight away, one diff per call,
+using the same shared sequence.
 """
-from typing import Optional
+from typing import Dict, Optional
 import logging
+import os
+import threading
 
 socketio = None
 logger = logging.getLogger(__name__)
 
+# Seat state carried by each event type
+_EVENT_STATES = {
+    'seat_held': 'held',
+    'seat_released': 'released',
+    'seat_confirmed': 'booked',
+}
+
+
+class SeatBroadcaster:
+    """Coalesces seat events per room and flushes them from a background task."""
+
+    def __init__(self, interval: float = 0.075, background: bool = True):
+        self.interval = interval
+        # False in write-only processes, which flush on every enqueue
+        self.background = background
+        # room -> (show_id, {seat_id: (state, reservation_id, version)}); the
+        # event with the higher seat version wins, whatever order they arrive in
+        self._pending: Dict[str, tuple] = {}
+        # room -> highest seat version among the pending events
+        self._pending_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local_seq: Dict[int, int] = {}
+        self._task_pid = None
+        self.events = 0
+        self.diffs = 0
+
+    def enqueue(self, show_id: int, event_type: str, payload: dict, room: Optional[str] = None):
+        state = _EVENT_STATES.get(event_type)
+        target_room = room or f"show_{show_id}"
+        if state is None:
+            # Not a seat change we know how to merge; send it as before
+            data = {'show_id': show_id, 'type': event_type, 'data': payload}
+            if self.background:
+                socketio.start_background_task(socketio.emit, 'seat_update', data, room=target_room)
+            else:
+                socketio.emit('seat_update', data, room=target_room)
+            return
+        reservation_id = payload.get('reservation_id')
+        version = payload.get('version')
+        with self._lock:
+            _, seats = self._pending.setdefault(target_room, (show_id, {}))
+            for seat in payload.get('seats') or []:
+                previous = seats.get(seat)
+                # Events without a version fall back to arrival order
+                if previous and previous[2] and version and previous[2] > version:
+                    continue
+                seats[seat] = (state, reservation_id, version)
+            if payload.get('version'):
+                self._pending_versions[target_room] = max(self._pending_versions.get(target_room, 0), payload['version'])
+            self.events += 1
+        if self.background:
+            self._ensure_task()
+        else:
+            self.flush()
+
+    def _ensure_task(self):
+        if self._task_pid == os.getpid():
+            return
+        with self._lock:
+            if self._task_pid == os.getpid():
+                return
+            self._task_pid = os.getpid()
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Seat broadcast flush failed: {e}")
+
+    def flush(self) -> int:
+        """Emit one diff per room with pending changes; returns the number sent."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            versions, self._pending_versions = self._pending_versions, {}
+        for room, (show_id, seats) in pending.items():
+            diff = {
+                'show_id': show_id,
+                'seq': self.next_seq(show_id),
+                'version': versions.get(room),
+                'held': {},
+                'released': [],
+                'booked': [],
+            }
+            for seat, (state, reservation_id, _) in seats.items():
+                if state == 'held':
+                    diff['held'][seat] = reservation_id
+                else:
+                    diff[state].append(seat)
+            socketio.emit('seat_diff', diff, room=room)
+            self.diffs += 1
+        return len(pending)
+
+    def next_seq(self, show_id: int) -> int:
+        # Kept in Redis so every process broadcasting to a show shares one sequence
+        try:
+            from cache.seat_cache import seat_cache, show_key
+            return int(seat_cache.get_redis().incr(show_key(show_id, "broadcast_seq")))
+        except Exception as e:
+            logger.warning(f"Broadcast sequence unavailable in Redis for show {show_id}: {e}")
+            self._local_seq[show_id] = self._local_seq.get(show_id, 0) + 1
+            return self._local_seq[show_id]
+
+    def current_seq(self, show_id: int) -> int:
+        try:
+            from cache.seat_cache import seat_cache, show_key
+            return int(seat_cache.get_redis().get(show_key(show_id, "broadcast_seq")) or 0)
+        except Exception:
+            return self._local_seq.get(show_id, 0)
+
+
+broadcaster: Optional[SeatBroadcaster] = None
+
+
+def seat_snapshot(show_id: int) -> dict:
+    """Full seat state for a show, tagged with the diff sequence it reflects."""
+    from cache.seat_cache import seat_cache
+    from models import Ticket
+
+    # Read the sequence and version first: diffs after them may repeat changes
+    # already in the snapshot, which is harmless because applying a diff is idempotent
+    seq = broadcaster.current_seq(show_id) if broadcaster else 0
+    version = seat_cache.get_seat_version(show_id)
+    tickets = Ticket.query.filter(Ticket.show_id == show_id, Ticket.status != 'cancelled').all()
+    booked = [t.seat_id for t in tickets if t.seat_id]
+    held = {h['seat_id']: h['reservation_id'] for h in seat_cache.get_active_holds(show_id)}
+    return {'show_id': show_id, 'seq': seq, 'version': version, 'booked': booked, 'held': held}
+
+
+def _run_queue_ticker(interval: float):
+    from cache.seat_cache import seat_cache, show_key
+    from cache.waiting_room import waiting_room
+
+    while True:
+        socketio.sleep(interval)
+        try:
+            r = seat_cache.get_redis()
+            for show_id in waiting_room.active_show_ids():
+                # One process per tick advances and announces each queue
+                if not r.set(show_key(show_id, "queue", "tick"), "1", nx=True, px=max(int(interval * 1000) - 50, 1)):
+                    continue
+                status = waiting_room.admit(show_id)
+                if status is not None:
+                    socketio.emit('queue_update', status, room=f"queue_{show_id}")
+        except Exception as e:
+            logger.warning(f"Waiting room tick failed: {e}")
+
 
 def init_socketio(app):
     """Initialize and return a SocketIO instance tied to the Flask `app`.
 
     Use `eventlet` or `gevent` in production. CORS allowed for frontend.
     """
-    global socketio
+    global socketio, broadcaster
     try:
         from flask_socketio import SocketIO
     except Exception:
@@ -35,8 +210,20 @@ def init_socketio(app):
         except Exception:
             async_mode = 'threading'
 
-    logger.info(f"Initializing SocketIO with async_mode={async_mode}")
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode)
+    message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE') or None
+    logger.info(f"Initializing SocketIO with async_mode={async_mode}, message_queue={'on' if message_queue else 'off'}")
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins="*",
+        async_mode=async_mode,
+        message_queue=message_queue,
+        channel=app.config.get('SOCKETIO_CHANNEL', 'flask-socketio'),
+    )
+    broadcaster = SeatBroadcaster(interval=app.config.get('SOCKET_BROADCAST_INTERVAL_MS', 75) / 1000.0)
+    if app.config.get('HOLD_EXPIRY_EVENTS', True):
+        from cache.hold_expiry import start_hold_expiry_listener
+        start_hold_expiry_listener()
+    socketio.start_background_task(_run_queue_ticker, app.config.get('WAITING_ROOM_TICK_SECONDS', 1.0))
 
     @socketio.on('join')
     def _on_join(data):
@@ -61,22 +248,74 @@ def init_socketio(app):
             except Exception:
                 pass
 
+    @socketio.on('join_queue')
+    def _on_join_queue(data):
+        show_id = (data or {}).get('show_id')
+        if show_id:
+            from flask_socketio import join_room
+            join_room(f"queue_{show_id}")
+
+    @socketio.on('leave_queue')
+    def _on_leave_queue(data):
+        show_id = (data or {}).get('show_id')
+        if show_id:
+            from flask_socketio import leave_room
+            leave_room(f"queue_{show_id}")
+
+    @socketio.on('request_snapshot')
+    def _on_request_snapshot(data):
+        # data: { 'show_id': 123 }; the snapshot goes to the requesting client only
+        show_id = (data or {}).get('show_id')
+        if not show_id:
+            return
+        try:
+            from flask_socketio import emit
+            emit('seat_snapshot', seat_snapshot(int(show_id)))
+        except Exception as e:
+            logger.exception(f"Failed to send seat snapshot for show {show_id}: {e}")
+
+    return socketio
+
+
+def init_socketio_emitter(message_queue: Optional[str] = None, channel: Optional[str] = None):
+    """Set up a write-only SocketIO that publishes to the message queue.
+
+    For processes without connected clients (Celery workers, scripts). Does
+    nothing if this process already has a SocketIO or no queue is configured.
+    """
+    global socketio, broadcaster
+    if socketio is not None:
+        return socketio
+    from config import Config
+    message_queue = message_queue or Config.SOCKETIO_MESSAGE_QUEUE
+    if not message_queue:
+        return None
+    try:
+        from flask_socketio import SocketIO
+    except Exception:
+        logger.warning("flask_socketio not installed; seat events will not be published")
+        return None
+    socketio = SocketIO(
+        message_queue=message_queue,
+        channel=channel or Config.SOCKETIO_CHANNEL,
+        async_mode='threading',
+    )
+    broadcaster = SeatBroadcaster(background=False)
     return socketio
 
 
 def emit_seat_update(show_id: int, event_type: str, payload: dict, room: Optional[str] = None):
-    """Emit a seat-related update to clients listening for the given show.
+    """Queue a seat-related update for clients listening for the given show.
 
     - `event_type` is a short string like 'seat_held' | 'seat_released' | 'seat_confirmed'.
-    - `payload` contains event-specific data.
+    - `payload` contains event-specific data ('reservation_id', 'seats').
+
+    Returns immediately; the change goes out in the room's next `seat_diff`.
     """
     global socketio
-    if not socketio:
+    if not socketio or not broadcaster:
         return
     try:
-        event_name = 'seat_update'
-        data = {'show_id': show_id, 'type': event_type, 'data': payload}
-        target_room = room or f"show_{show_id}"
-        socketio.emit(event_name, data, room=target_room)
+        broadcaster.enqueue(show_id, event_type, payload, room=room)
     except Exception as e:
-        logger.exception(f"Failed to emit seat update: {e}")
+        logger.exception(f"Failed to queue seat update: {e}")
@@ -1,18 +1,57 @@
 # backend/tasks/__init__.py
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_ready
+
+from config import Config
 from extensions import celery
-from .emails import send_email_reminder, send_booking_confirmation
+from .emails import send_email_reminder, send_reminder_chunk, send_booking_confirmation
 from .reports import generate_monthly_report
+from .export import cleanup_expired_exports
+from .imports import import_shows_csv
+from .cache_warmup import warm_show_capacities
+from .reservations import sweep_expired_reservations
+from .reconciliation import reconcile_show_capacities
 
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(
-        2000.0,
+        float(Config.REMINDER_INTERVAL_SECONDS),
         send_email_reminder.s(),
         name="send_email_reminder_to_all_users",
     )
     sender.add_periodic_task(
-        60.0,
+        crontab(minute=0, hour=Config.MONTHLY_REPORT_HOUR, day_of_month=1),
         generate_monthly_report.s(),
         name="generate_monthly_report",
     )
+    sender.add_periodic_task(
+        float(Config.EXPORT_CLEANUP_INTERVAL_SECONDS),
+        cleanup_expired_exports.s(),
+        name="cleanup_expired_exports",
+    )
+    sender.add_periodic_task(
+        float(Config.RESERVATION_SWEEP_INTERVAL_SECONDS),
+        sweep_expired_reservations.s(),
+        name="sweep_expired_reservations",
+    )
+    sender.add_periodic_task(
+        float(Config.RECONCILE_INTERVAL_SECONDS),
+        reconcile_show_capacities.s(),
+        name="reconcile_show_capacities",
+    )
+
+
+@worker_ready.connect
+def warm_caches_on_worker_start(sender=None, **kwargs):
+    # Deploys start workers, so this warms Redis even when the web app runs under gunicorn
+    if Config.CAPACITY_WARMUP_ON_WORKER_START:
+        warm_show_capacities.delay()
+
+
+@worker_process_init.connect
+def init_seat_event_emitter(**kwargs):
+    # Lets tasks that release or confirm holds reach clients on every web worker
+    if Config.FEATURE_FLAGS.get("websocket_updates"):
+        from sockets import init_socketio_emitter
+        init_socketio_emitter()
@@ -0,0 +1,78 @@
+# backend/tasks/cache_warmup.py
+"""Warm Redis show capacities from the database.
+
+Used by the `warm_cache` CLI command, by `python run.py` at startup and by
+the `warm_show_capacities` Celery task, which also runs when a worker starts
+so deploys behind gunicorn get a warm cache.
+"""
+import logging
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import or_
+
+from extensions import celery, db
+from models import Show
+from utils.redis_lock import redis_lock
+
+WARMUP_LOCK_KEY = "warmup:show_capacities:lock"
+
+
+def warm_show_capacities_from_db(chunk_size=None, overwrite=False):
+    """Stream (id, capacity) for upcoming shows into Redis, one pipeline per chunk.
+
+    By default only shows without a Redis capacity are written, so running it
+    against a live system (or twice) is safe. `overwrite=True` resets every
+    upcoming show to its DB capacity with one MSET per chunk.
+    """
+    from cache.seat_cache import seat_cache
+
+    chunk_size = chunk_size or current_app.config.get("CAPACITY_WARMUP_CHUNK_SIZE", 1000)
+    # Fail fast instead of logging one warning per chunk
+    seat_cache.get_redis().ping()
+
+    started = time.monotonic()
+    rows = (
+        db.session.query(Show.id, Show.capacity)
+        .filter(or_(Show.end_time.is_(None), Show.end_time >= datetime.utcnow()))
+        .order_by(Show.id)
+        .yield_per(chunk_size)
+    )
+
+    shows = 0
+    written = 0
+    chunk = {}
+
+    def _flush():
+        nonlocal written
+        if overwrite:
+            if seat_cache.set_show_capacities(chunk):
+                written += len(chunk)
+        else:
+            written += seat_cache.fill_show_capacities(chunk)
+        chunk.clear()
+
+    for show_id, capacity in rows:
+        chunk[show_id] = capacity or 0
+        shows += 1
+        if len(chunk) >= chunk_size:
+            _flush()
+    _flush()
+
+    elapsed = time.monotonic() - started
+    logging.info(f"Warmed Redis capacities: {written} of {shows} upcoming shows written in {elapsed:.2f}s")
+    return {"shows": shows, "written": written, "seconds": round(elapsed, 3)}
+
+
+@celery.task
+def warm_show_capacities(overwrite=False):
+    """Celery entry point; a Redis lock keeps concurrent runs (several workers starting) to one."""
+    from cache.seat_cache import seat_cache
+
+    ttl = current_app.config.get("CAPACITY_WARMUP_LOCK_SECONDS", 600)
+    with redis_lock(seat_cache.get_redis(), WARMUP_LOCK_KEY, ttl) as acquired:
+        if not acquired:
+            logging.info("Capacity warm-up already running; skipping")
+            return {"skipped": True}
+        return warm_show_capacities_from_db(overwrite=overwrite)
@@ -1,15 +1,18 @@
 """backend/tasks/emails.py
 """
 import logging
-import smtplib
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
 
 from flask import current_app
-from extensions import celery
+from celery import group
+from extensions import celery, db
 from models import User, Show, Ticket
+from utils.smtp_pool import send_email
+from utils.rate_limit import TokenBucket
 
 
 @celery.task
@@ -23,10 +26,7 @@ def send_booking_confirmation(user_id, show_id, ticket_count, total_price, ticke
             logging.error(f"User {user_id} or Show {show_id} not found for booking confirmation")
             return False
 
-        smtp_server = current_app.config.get("SMTP_SERVER", "localhost")
-        smtp_port = current_app.config.get("SMTP_PORT", 587)
         smtp_username = current_app.config.get("SMTP_USERNAME", "")
-        smtp_password = current_app.config.get("SMTP_PASSWORD", "")
 
         subject = f"Booking Confirmation - {show.name}"
         message = (
@@ -79,20 +79,9 @@ def send_booking_confirmation(user_id, show_id, ticket_count, total_price, ticke
         msg["Subject"] = Header(subject, 'utf-8')
         msg.attach(MIMEText(message, "plain", "utf-8"))
 
-        # Attempt to send via SMTP. Many dev SMTP servers (MailHog, Mailtrap, etc.) don't require auth/TLS.
+        # Send through the pooled SMTP session. Many dev SMTP servers (MailHog, Mailtrap, etc.) don't require auth/TLS.
         try:
-            server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-            # If credentials are provided, attempt STARTTLS and login.
-            if smtp_username and smtp_password:
-                try:
-                    server.starttls()
-                except Exception:
-                    # STARTTLS may not be supported by dev SMTP; continue without it
-                    logging.debug('STARTTLS not supported by SMTP server; continuing without TLS')
-                server.login(smtp_username, smtp_password)
-
-            server.sendmail(envelope_from, [user.email], msg.as_string())
-            server.quit()
+            send_email(envelope_from, [user.email], msg.as_string())
             logging.info(f"Booking confirmation email sent to {user.email} (attachments: {attachments_added})")
             try:
                 # Audit: email sent
@@ -110,44 +99,146 @@ def send_booking_confirmation(user_id, show_id, ticket_count, total_price, ticke
         return False
 
 
+def _reminder_redis():
+    try:
+        from cache.seat_cache import seat_cache
+        return seat_cache.get_redis()
+    except Exception as e:
+        logging.warning(f"Redis unavailable for reminder checkpoints: {e}")
+        return None
+
+
+@celery.task(bind=True)
+def send_email_reminder(self):
+    """Fan the periodic reminder out to chunked subtasks.
+
+    User ids are streamed in keyset order (`id > last_id`) so no chunk loads
+    more than `REMINDER_CHUNK_SIZE` rows. The dispatch cursor is checkpointed
+    in Redis per run, so a redelivered dispatcher resumes where it stopped and
+    chunk tasks skip users already marked as sent for the run.
+    """
+    chunk_size = current_app.config.get("REMINDER_CHUNK_SIZE", 500)
+    chunks_per_group = current_app.config.get("REMINDER_CHUNKS_PER_GROUP", 10)
+    interval = current_app.config.get("REMINDER_INTERVAL_SECONDS", 2000)
+
+    # One run per beat dispatch: a redelivery keeps the task id (and the
+    # cursor), while the next scheduled dispatch starts from the beginning
+    # however close to this one beat fires it
+    run_id = self.request.id or uuid.uuid4().hex
+    cursor_key = f"reminder:{run_id}:cursor"
+    r = _reminder_redis()
+
+    last_id = 0
+    if r is not None:
+        try:
+            last_id = int(r.get(cursor_key) or 0)
+        except Exception as e:
+            logging.warning(f"Failed to read reminder cursor for run {run_id}: {e}")
+
+    dispatched = 0
+    pending = []
+    while True:
+        ids = [
+            row.id
+            for row in db.session.query(User.id)
+            .filter(User.id > last_id, User.email.isnot(None))
+            .order_by(User.id)
+            .limit(chunk_size)
+        ]
+        if ids:
+            pending.append(send_reminder_chunk.s(run_id, ids))
+            last_id = ids[-1]
+        if pending and (len(pending) >= chunks_per_group or not ids):
+            group(pending).apply_async()
+            dispatched += len(pending)
+            pending = []
+            if r is not None:
+                try:
+                    r.set(cursor_key, last_id, ex=interval * 2)
+                except Exception as e:
+                    logging.warning(f"Failed to checkpoint reminder cursor for run {run_id}: {e}")
+        if not ids:
+            break
+
+    logging.info(f"Reminder run {run_id}: dispatched {dispatched} chunks (cursor at user {last_id})")
+    return dispatched
+
+
 @celery.task
-def send_email_reminder():
-    """Send a daily reminder email to all users."""
-    users = User.query.all()
+def send_reminder_chunk(run_id, user_ids):
+    """Send the reminder to one chunk of users.
 
-    smtp_server = current_app.config.get("SMTP_SERVER", "localhost")
-    smtp_port = current_app.config.get("SMTP_PORT", 587)
+    Sends share the worker's pooled SMTP session and are paced by a token
+    bucket shared across workers (`REMINDER_RATE_PER_SECOND`). Each delivered
+    user id is added to the run's sent set so a retried chunk does not resend.
+    """
     smtp_username = current_app.config.get("SMTP_USERNAME", "")
     smtp_password = current_app.config.get("SMTP_PASSWORD", "")
+    interval = current_app.config.get("REMINDER_INTERVAL_SECONDS", 2000)
+    subject = "Daily Reminder: Visit/Book Something!"
+
+    users = (
+        db.session.query(User.id, User.username, User.email)
+        .filter(User.id.in_(user_ids))
+        .order_by(User.id)
+        .all()
+    )
+
+    if not (smtp_username and smtp_password):
+        for user in users:
+            logging.info(f"SMTP not configured. Would send to {user.email}: {subject}")
+        return 0
+
+    r = _reminder_redis()
+    sent_key = f"reminder:{run_id}:sent"
+    already_sent = set()
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for user in users:
+                pipe.sismember(sent_key, user.id)
+            already_sent = {user.id for user, hit in zip(users, pipe.execute()) if hit}
+        except Exception as e:
+            logging.warning(f"Failed to read reminder checkpoint for run {run_id}: {e}")
 
+    bucket = TokenBucket(
+        r,
+        "reminder:rate",
+        rate=current_app.config.get("REMINDER_RATE_PER_SECOND", 10),
+        burst=current_app.config.get("REMINDER_RATE_BURST", 10),
+    )
+    from_display = current_app.config.get("EMAIL_FROM_NAME", "Ticket Show")
+
+    sent = 0
     for user in users:
-        subject = "Daily Reminder: Visit/Book Something!"
+        if user.id in already_sent or not user.email:
+            continue
         message = (
             f"Hello {user.username},\n\n"
             "Don't forget to visit or book something on our Ticket Show platform today!\n\n"
             "Best regards,\nThe Ticket Show Team"
         )
-
-        if not (smtp_username and smtp_password):
-            logging.info(f"SMTP not configured. Would send to {user.email}: {subject}")
-            continue
-
         try:
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-
             msg = MIMEMultipart()
-            from_display = current_app.config.get("EMAIL_FROM_NAME", "Ticket Show")
             msg["From"] = formataddr((Header(from_display, 'utf-8').encode(), smtp_username))
             recipient_name = user.username or user.email
             msg["To"] = formataddr((Header(recipient_name, 'utf-8').encode(), user.email))
             msg["Subject"] = Header(subject, 'utf-8')
             msg.attach(MIMEText(message, "plain", "utf-8"))
 
-            server.sendmail(smtp_username, [user.email], msg.as_string())
-            server.quit()
-
+            bucket.acquire()
+            send_email(smtp_username, [user.email], msg.as_string())
+            sent += 1
             logging.info(f"Reminder email sent to {user.email}")
         except Exception as e:
             logging.error(f"Error sending reminder email to {user.email}: {e}")
+            continue
+
+        if r is not None:
+            try:
+                r.sadd(sent_key, user.id)
+                r.expire(sent_key, interval * 2)
+            except Exception as e:
+                logging.warning(f"Failed to checkpoint reminder for user {user.id}: {e}")
+
+    return sent
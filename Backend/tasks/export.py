@@ -0,0 +1,34 @@
+# backend/tasks/export.py
+import logging
+import os
+import time
+
+from flask import current_app
+from extensions import celery
+from resources.export import exports_folder
+
+
+@celery.task
+def cleanup_expired_exports():
+    """Delete finished export files older than EXPORT_TTL_SECONDS."""
+    ttl = current_app.config.get("EXPORT_TTL_SECONDS", 3600)
+    folder = exports_folder()
+    if not os.path.isdir(folder):
+        return 0
+
+    cutoff = time.time() - ttl
+    removed = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logging.warning(f"Failed to remove expired export {entry.name}: {e}")
+
+    if removed:
+        logging.info(f"Removed {removed} expired export files")
+    return removed
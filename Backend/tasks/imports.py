@@ -0,0 +1,142 @@
+# backend/tasks/imports.py
+"""Bulk show import shared by the admin endpoint and its Celery job."""
+import csv
+import logging
+import os
+from datetime import datetime
+
+from flask import current_app
+from extensions import celery, db
+from models import Show, Theatre
+
+# Cap on row-level errors returned to the client
+MAX_REPORTED_ERRORS = 200
+
+
+def _parse_show_row(row, theatres):
+    """Validate one CSV row and return Show column values, or raise ValueError."""
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise ValueError("name is required")
+    try:
+        start_time = datetime.fromisoformat(row.get('start_time') or '')
+        end_time = datetime.fromisoformat(row.get('end_time') or '')
+    except ValueError:
+        raise ValueError("start_time and end_time must be ISO 8601 datetimes")
+    if end_time < start_time:
+        raise ValueError("end_time is before start_time")
+
+    theatre_id = None
+    if row.get('theatre_id'):
+        theatre_id = int(row.get('theatre_id'))
+        if theatre_id not in theatres:
+            raise ValueError(f"theatre {theatre_id} not found")
+
+    ticket_price = float(row.get('ticket_price') or 0.0)
+    if ticket_price < 0:
+        raise ValueError("ticket_price must not be negative")
+
+    # Like ShowResource.post, default a show's capacity to its theatre's
+    if row.get('capacity'):
+        capacity = int(row.get('capacity'))
+    else:
+        capacity = theatres.get(theatre_id) or 0
+    if capacity < 0:
+        raise ValueError("capacity must not be negative")
+
+    return {
+        "name": name,
+        "start_time": start_time,
+        "end_time": end_time,
+        "theatre_id": theatre_id,
+        "ticket_price": ticket_price,
+        "capacity": capacity,
+        "tags": row.get('tags') or None,
+    }
+
+
+def import_show_rows(reader, chunk_size=500, progress=None):
+    """Validate and insert shows from a CSV DictReader, one chunk per commit.
+
+    Returns a summary with the created count and row-level errors. After all
+    chunks are committed, Redis capacities for the new shows are seeded in a
+    single MSET so they are immediately bookable via `reserve_seats_atomic`.
+    `progress(processed, created, errors)` is called after each chunk.
+    """
+    theatres = dict(db.session.query(Theatre.id, Theatre.capacity).all())
+    created_capacities = {}
+    errors = []
+    invalid = 0
+    processed = 0
+    chunk = []  # (line_no, Show)
+
+    def _flush():
+        nonlocal invalid
+        if not chunk:
+            return
+        shows = [s for _, s in chunk]
+        try:
+            db.session.add_all(shows)
+            db.session.flush()
+            # Read ids before commit; afterwards each access would reload the row
+            new_capacities = {s.id: s.capacity for s in shows}
+            db.session.commit()
+            created_capacities.update(new_capacities)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Show import chunk starting at line {chunk[0][0]} failed: {e}")
+            invalid += len(chunk)
+            for line_no, _ in chunk:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": f"insert failed: {e.__class__.__name__}"})
+        chunk.clear()
+        if progress:
+            progress(processed, len(created_capacities), invalid)
+
+    for line_no, row in enumerate(reader, start=2):
+        processed += 1
+        try:
+            values = _parse_show_row(row, theatres)
+        except (TypeError, ValueError) as e:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "error": str(e)})
+            continue
+        chunk.append((line_no, Show(**values)))
+        if len(chunk) >= chunk_size:
+            _flush()
+    _flush()
+
+    try:
+        from cache.seat_cache import seat_cache
+        from cache.local_cache import invalidate_show
+        seat_cache.set_show_capacities(created_capacities)
+        if created_capacities:
+            invalidate_show()
+    except Exception as e:
+        logging.warning(f"Failed to seed Redis capacities for imported shows: {e}")
+
+    return {
+        "processed": processed,
+        "created": len(created_capacities),
+        "invalid": invalid,
+        "errors": errors,
+    }
+
+
+@celery.task(bind=True)
+def import_shows_csv(self, path):
+    """Celery job for large show imports; reports progress via task state."""
+    chunk_size = current_app.config.get("SHOW_IMPORT_CHUNK_SIZE", 500)
+
+    def _progress(processed, created, invalid):
+        self.update_state(state='PROGRESS', meta={"processed": processed, "created": created, "invalid": invalid})
+
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            return import_show_rows(csv.DictReader(fh), chunk_size=chunk_size, progress=_progress)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,175 @@
+# backend/tasks/reconciliation.py
+"""Periodic check that Redis show capacities still match the database.
+
+`Show.capacity` is the remaining seat count and is updated in the same
+transaction as the tickets. The Redis copy should equal it minus the seats
+in pending count-based reservations, which the DB does not know about yet.
+The two drift when a Redis write after a commit is lost, or when an admin
+edits a show. Seat holds do not take seats off the Redis capacity until
+they are booked, so they play no part here.
+
+Each chunk of upcoming shows is checked with one pipeline of reads, a
+re-read of the DB rows for the shows that look off, and one pipeline of
+compare-and-set repairs (see `SeatCache.repair_show_capacities`). As a
+cross-check the DB itself is compared with sold tickets: for a show on a
+screen, remaining plus sold should equal the screen's capacity. Those
+mismatches are reported but not changed, since an admin may have set the
+capacity on purpose.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+from extensions import celery, db
+from models import Screen, Show, Ticket
+from utils.redis_lock import redis_lock
+
+RECONCILE_LOCK_KEY = "reconcile:show_capacities:lock"
+# Last run's report, served at /admin/cache/stats
+RECONCILE_REPORT_KEY = "metrics:capacity_reconciliation"
+# Discrepancies listed in one report; the counts cover all of them
+MAX_REPORTED = 200
+
+
+def _sold_by_show(show_ids):
+    rows = (
+        db.session.query(Ticket.show_id, func.coalesce(func.sum(Ticket.quantity), 0))
+        .filter(Ticket.show_id.in_(show_ids), Ticket.status != "cancelled")
+        .group_by(Ticket.show_id)
+    )
+    return {show_id: int(sold) for show_id, sold in rows}
+
+
+def reconcile_show_capacities_from_db(chunk_size=None, repair=True):
+    """Compare every upcoming show's Redis capacity with the DB and repair drift.
+
+    Returns a report with totals and up to MAX_REPORTED discrepancies, each
+    {show_id, kind, ...} where kind is 'redis_drift', 'redis_missing' or
+    'db_vs_tickets'.
+    """
+    from cache.seat_cache import seat_cache
+
+    chunk_size = chunk_size or current_app.config.get("RECONCILE_CHUNK_SIZE", 500)
+    seat_cache.get_redis().ping()
+
+    started = time.monotonic()
+    rows = (
+        db.session.query(Show.id, Show.capacity, Screen.capacity)
+        .outerjoin(Screen, Show.screen_id == Screen.id)
+        .filter(or_(Show.end_time.is_(None), Show.end_time >= datetime.utcnow()))
+        .order_by(Show.id)
+        .yield_per(chunk_size)
+    )
+
+    totals = {"shows": 0, "redis_drift": 0, "redis_missing": 0, "repaired": 0, "skipped_busy": 0, "db_vs_tickets": 0}
+    discrepancies = []
+    chunk = []
+
+    def _report(entry):
+        totals[entry["kind"]] += 1
+        if len(discrepancies) < MAX_REPORTED:
+            discrepancies.append(entry)
+
+    def _check(chunk):
+        show_ids = [show_id for show_id, _, _ in chunk]
+        # Revisions first: anything that changes capacity after this read moves them
+        states = seat_cache.get_inventory_states(show_ids)
+        sold = _sold_by_show(show_ids)
+
+        suspects = []
+        for show_id, capacity, screen_capacity in chunk:
+            capacity = capacity or 0
+            if screen_capacity and capacity + sold.get(show_id, 0) != screen_capacity:
+                _report({"show_id": show_id, "kind": "db_vs_tickets", "db_capacity": capacity,
+                         "sold": sold.get(show_id, 0), "screen_capacity": screen_capacity})
+            state = states[show_id]
+            if state["capacity"] is None or state["capacity"] != max(capacity - state["pending"], 0):
+                suspects.append(show_id)
+        if not suspects:
+            return
+
+        # A booking may have committed since the chunk was read; its Redis
+        # write either happened before the revision read or skips the repair.
+        # A new connection, so a repeatable-read snapshot cannot hide it
+        with db.engine.connect() as conn:
+            fresh = dict(conn.execute(select(Show.id, Show.capacity).where(Show.id.in_(suspects))).all())
+        targets = {}
+        for show_id in suspects:
+            if show_id not in fresh:
+                continue
+            state = states[show_id]
+            expected = max((fresh[show_id] or 0) - state["pending"], 0)
+            if state["capacity"] == expected:
+                continue
+            _report({
+                "show_id": show_id,
+                "kind": "redis_missing" if state["capacity"] is None else "redis_drift",
+                "db_capacity": fresh[show_id] or 0,
+                "pending": state["pending"],
+                "redis_capacity": state["capacity"],
+                "expected": expected,
+                "drift": None if state["capacity"] is None else state["capacity"] - expected,
+            })
+            targets[show_id] = (fresh[show_id] or 0, state["rev"])
+        if not repair or not targets:
+            return
+        for show_id, new_capacity in seat_cache.repair_show_capacities(targets).items():
+            if new_capacity is None:
+                totals["skipped_busy"] += 1
+            else:
+                totals["repaired"] += 1
+
+    for row in rows:
+        chunk.append(row)
+        totals["shows"] += 1
+        if len(chunk) >= chunk_size:
+            _check(chunk)
+            chunk = []
+    if chunk:
+        _check(chunk)
+
+    elapsed = time.monotonic() - started
+    report = dict(totals, seconds=round(elapsed, 3), finished_at=int(time.time()), discrepancies=discrepancies)
+    if totals["redis_drift"] or totals["redis_missing"] or totals["db_vs_tickets"]:
+        logging.warning(
+            f"Capacity reconciliation: {totals['redis_drift']} drifted and {totals['redis_missing']} missing in Redis "
+            f"({totals['repaired']} repaired, {totals['skipped_busy']} busy), {totals['db_vs_tickets']} DB/ticket "
+            f"mismatches across {totals['shows']} shows in {elapsed:.2f}s"
+        )
+        for entry in discrepancies:
+            logging.info(f"Capacity discrepancy: {entry}")
+    else:
+        logging.info(f"Capacity reconciliation: {totals['shows']} shows consistent in {elapsed:.2f}s")
+    try:
+        seat_cache.get_redis().set(RECONCILE_REPORT_KEY, json.dumps(report))
+    except Exception as e:
+        logging.warning(f"Failed to store reconciliation report: {e}")
+    return report
+
+
+def last_reconciliation_report():
+    from cache.seat_cache import seat_cache
+
+    try:
+        data = seat_cache.get_redis().get(RECONCILE_REPORT_KEY)
+        return json.loads(data) if data else None
+    except Exception as e:
+        logging.warning(f"Reconciliation report unavailable: {e}")
+        return None
+
+
+@celery.task
+def reconcile_show_capacities(repair=True):
+    """Celery entry point; a Redis lock keeps overlapping runs to one."""
+    from cache.seat_cache import seat_cache
+
+    ttl = current_app.config.get("RECONCILE_LOCK_SECONDS", 600)
+    with redis_lock(seat_cache.get_redis(), RECONCILE_LOCK_KEY, ttl) as acquired:
+        if not acquired:
+            logging.info("Capacity reconciliation already running; skipping")
+            return {"skipped": True}
+        return reconcile_show_capacities_from_db(repair=repair)
@@ -1,48 +1,62 @@
 # backend/tasks/reports.py
-from datetime import datetime
-import smtplib
+import logging
+from datetime import datetime, timedelta
+from html import escape
+from itertools import groupby
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 from flask import current_app
 from extensions import celery, db
 from models import User, Ticket, Show, ShowRating
+from utils.smtp_pool import send_email
 
 
-@celery.task
-def generate_monthly_report():
-    today = datetime.now()
-    first_day_of_current_month = today.replace(day=1)
-
-    users = User.query.all()
-    for user in users:
-        user_tickets = (
-            db.session.query(User, Ticket, Show)
-            .join(Ticket, Ticket.user_id == User.id)
-            .join(Show, Show.id == Ticket.show_id)
-            .filter(Show.start_time.between(first_day_of_current_month, today))
-            .all()
-        )
+def _month_bounds(year=None, month=None):
+    """Return (start, end) of the requested month, defaulting to the previous one."""
+    if year is None or month is None:
+        first_of_this_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = (first_of_this_month - timedelta(days=1)).replace(day=1)
+    else:
+        start = datetime(int(year), int(month), 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
 
-        user_ratings = (
-            db.session.query(User.username, Show.name, ShowRating.rating)
-            .join(ShowRating, User.id == ShowRating.user_id)
-            .join(Show, Show.id == ShowRating.show_id)
-            .filter(Show.start_time.between(first_day_of_current_month, today))
-            .all()
-        )
 
-        bookings_html = "".join(
-            f"<li>{u.username} purchased tickets for "
-            f"{t.event.name} on {t.event.start_time.strftime('%Y-%m-%d %H:%M')}</li>"
-            for u, t, s in user_tickets
-        )
-        ratings_html = "".join(
-            f"<li>{username} rated {show_name}: {rating}/5</li>"
-            for username, show_name, rating in user_ratings
-        )
+def _group_by_user(rows):
+    for user_id, user_rows in groupby(rows, key=lambda r: r.user_id):
+        yield user_id, list(user_rows)
+
 
-        report_html = f"""
+def _merge_by_user(tickets, ratings):
+    """Merge two user-ordered (user_id, rows) streams into (user_id, tickets, ratings)."""
+    t = next(tickets, None)
+    r = next(ratings, None)
+    while t is not None or r is not None:
+        if r is None or (t is not None and t[0] < r[0]):
+            yield t[0], t[1], []
+            t = next(tickets, None)
+        elif t is None or r[0] < t[0]:
+            yield r[0], [], r[1]
+            r = next(ratings, None)
+        else:
+            yield t[0], t[1], r[1]
+            t = next(tickets, None)
+            r = next(ratings, None)
+
+
+def _render_report(user, user_tickets, user_ratings):
+    bookings_html = "".join(
+        f"<li>{escape(user.username)} purchased tickets for "
+        f"{escape(t.show_name)} on {t.start_time.strftime('%Y-%m-%d %H:%M')}</li>"
+        for t in user_tickets
+    )
+    ratings_html = "".join(
+        f"<li>{escape(user.username)} rated {escape(r.show_name)}: {r.rating}/5</li>"
+        for r in user_ratings
+    )
+
+    return f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -62,18 +76,87 @@ def generate_monthly_report():
         </html>
         """
 
-        _send_report_as_email(user, report_html)
+
+def _report_redis():
+    try:
+        from cache.seat_cache import seat_cache
+        return seat_cache.get_redis()
+    except Exception as e:
+        logging.warning(f"Redis unavailable for report delivery tracking: {e}")
+        return None
+
+
+@celery.task
+def generate_monthly_report(year=None, month=None):
+    """Email each active user their bookings and ratings for one month.
+
+    The month's tickets and ratings are read once each, as user-ordered
+    streams, and merged per user, so the cost is linear in the month's
+    activity rather than users x tickets. Delivered user ids are recorded
+    per month in Redis, so a re-run only mails users that were missed.
+    """
+    start, end = _month_bounds(year, month)
+    period = start.strftime("%Y-%m")
+    batch_size = current_app.config.get("REPORT_STREAM_BATCH_SIZE", 1000)
+
+    tickets = (
+        db.session.query(
+            User.id.label("user_id"), User.username, User.email,
+            Show.name.label("show_name"), Show.start_time,
+        )
+        .join(Ticket, Ticket.user_id == User.id)
+        .join(Show, Show.id == Ticket.show_id)
+        .filter(Show.start_time >= start, Show.start_time < end)
+        .order_by(User.id, Show.start_time)
+        .yield_per(batch_size)
+    )
+    ratings = (
+        db.session.query(
+            User.id.label("user_id"), User.username, User.email,
+            Show.name.label("show_name"), ShowRating.rating,
+        )
+        .join(ShowRating, User.id == ShowRating.user_id)
+        .join(Show, Show.id == ShowRating.show_id)
+        .filter(Show.start_time >= start, Show.start_time < end)
+        .order_by(User.id, Show.id)
+        .yield_per(batch_size)
+    )
+
+    r = _report_redis()
+    sent_key = f"report:{period}:sent"
+    sent = skipped = 0
+    for user_id, user_tickets, user_ratings in _merge_by_user(_group_by_user(tickets), _group_by_user(ratings)):
+        user = (user_tickets or user_ratings)[0]
+        if not user.email:
+            continue
+        if r is not None:
+            try:
+                if r.sismember(sent_key, user_id):
+                    skipped += 1
+                    continue
+            except Exception as e:
+                logging.warning(f"Failed to read report delivery state for user {user_id}: {e}")
+
+        try:
+            _send_report_as_email(user, _render_report(user, user_tickets, user_ratings))
+        except Exception as e:
+            logging.error(f"Error sending {period} report to {user.email}: {e}")
+            continue
+        sent += 1
+
+        if r is not None:
+            try:
+                r.sadd(sent_key, user_id)
+                r.expire(sent_key, 60 * 60 * 24 * 62)
+            except Exception as e:
+                logging.warning(f"Failed to record report delivery for user {user_id}: {e}")
+
+    logging.info(f"Monthly report {period}: sent {sent}, already delivered {skipped}")
+    return {"period": period, "sent": sent, "skipped": skipped}
 
 
 def _send_report_as_email(user, report_html):
-    smtp_server = current_app.config["SMTP_SERVER"]
-    smtp_port = current_app.config["SMTP_PORT"]
     smtp_username = current_app.config["SMTP_USERNAME"]
-    smtp_password = current_app.config["SMTP_PASSWORD"]
-
-    server = smtplib.SMTP(smtp_server, smtp_port)
-    server.starttls()
-    server.login(smtp_username, smtp_password)
 
     msg = MIMEMultipart()
     msg["From"] = smtp_username
@@ -81,5 +164,4 @@ def _send_report_as_email(user, report_html):
     msg["Subject"] = "Monthly Entertainment Report"
     msg.attach(MIMEText(report_html, "html"))
 
-    server.sendmail(smtp_username, user.email, msg.as_string())
-    server.quit()
+    send_email(smtp_username, [user.email], msg.as_string())
@@ -1,13 +1,13 @@
 from flask import current_app
 from extensions import celery
 import logging
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
 
 from models import Ticket, User, Show
+from utils.smtp_pool import send_email
 
 from resources.tickets import generate_ticket_pdf_bytes
 
@@ -36,8 +36,6 @@ def generate_and_email_ticket(ticket_id: int):
             return False
 
         # Prepare email
-        smtp_server = current_app.config.get("SMTP_SERVER", "localhost")
-        smtp_port = current_app.config.get("SMTP_PORT", 587)
         smtp_username = current_app.config.get("SMTP_USERNAME", "")
         smtp_password = current_app.config.get("SMTP_PASSWORD", "")
 
@@ -51,10 +49,6 @@ def generate_and_email_ticket(ticket_id: int):
 
         if smtp_username and smtp_password:
             try:
-                server = smtplib.SMTP(smtp_server, smtp_port)
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-
                 msg = MIMEMultipart()
                 from_display = current_app.config.get("EMAIL_FROM_NAME", "TicketShow")
                 msg["From"] = formataddr((Header(from_display, 'utf-8').encode(), smtp_username))
@@ -73,8 +67,7 @@ def generate_and_email_ticket(ticket_id: int):
                 part.add_header('Content-Disposition', f'attachment; filename="ticket_{ticket.id}.pdf"')
                 msg.attach(part)
 
-                server.sendmail(smtp_username, [user.email], msg.as_string())
-                server.quit()
+                send_email(smtp_username, [user.email], msg.as_string())
                 logging.info(f"Sent ticket {ticket_id} to {user.email}")
                 try:
                     from utils.audit import log_action
@@ -0,0 +1,111 @@
+"""Shared fixtures: a Flask app on in-memory SQLite and an in-process Redis.
+
+Redis is fakeredis with Lua support, so the seat cache scripts run for real.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from config import Config  # noqa: E402
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    CACHE_TYPE = "SimpleCache"
+    JWT_SECRET_KEY = "test-secret-key-for-the-test-suite-only"
+    SOCKETIO_MESSAGE_QUEUE = ""
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """Point every Redis user at a fresh fakeredis and reload the seat cache scripts on it."""
+    import utils.redis_pool as redis_pool
+    from cache.seat_cache import seat_cache
+    from cache.waiting_room import waiting_room
+    from payments import payment_simulator
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_pool, "_client", client)
+    monkeypatch.setattr(payment_simulator, "redis", client)
+    # Scripts are bound to the client they were registered with
+    seat_cache.__init__()
+    waiting_room._scripts = None
+    yield client
+    seat_cache.__init__()
+    waiting_room._scripts = None
+
+
+@pytest.fixture
+def app(redis_client):
+    from flask import Flask
+    from flask_restful import Api
+
+    from extensions import celery, db, init_extensions
+    from resources import register_resources
+
+    # Enqueued tasks go nowhere instead of waiting on a real broker
+    celery.conf.update(broker_url="memory://", result_backend="cache+memory://", task_always_eager=False)
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    init_extensions(app)
+    register_resources(Api(app))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_show(app):
+    """Create a show (and optionally a theatre with a seat layout) and return it."""
+    from extensions import db
+    from models import Show, Theatre, TheatreSeat
+
+    def _make(capacity=10, rows="", seats_per_row=0, **fields):
+        theatre = Theatre(name="Main", place="Town", capacity=capacity)
+        db.session.add(theatre)
+        db.session.flush()
+        for row in rows:
+            for number in range(1, seats_per_row + 1):
+                db.session.add(TheatreSeat(theatre_id=theatre.id, row_label=row, seat_number=number))
+        now = datetime.utcnow()
+        show = Show(name="Show", start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=2),
+                    ticket_price=10.0, capacity=capacity, theatre_id=theatre.id, **fields)
+        db.session.add(show)
+        db.session.commit()
+        return show
+
+    return _make
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Create a user and return (user, headers with a bearer token)."""
+    from flask_jwt_extended import create_access_token
+
+    from extensions import db
+    from models import User
+
+    def _headers(username="alice", is_admin=False):
+        user = User(username=username, email=f"{username}@example.com", password="x", is_admin=is_admin)
+        db.session.add(user)
+        db.session.commit()
+        return user, {"Authorization": f"Bearer {create_access_token(identity=username)}"}
+
+    return _headers
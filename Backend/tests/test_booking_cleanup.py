@@ -0,0 +1,56 @@
+"""A failed booking must give its seats back straight away."""
+from cache.seat_cache import seat_cache, show_key
+
+
+def _book(client, show_id, headers, seats, **body):
+    return client.post(f"/bookshows/{show_id}/book", headers=headers,
+                       json=dict(seats=[{"row": s[0], "num": int(s[1:])} for s in seats], **body))
+
+
+def test_payment_failure_restores_count_reservation(client, make_show, auth_headers, redis_client):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    seat_cache.set_show_capacity(show.id, 10)
+    _, headers = auth_headers()
+
+    resp = _book(client, show.id, headers, ["A1", "A2", "A3"], payment={"force": "fail"})
+
+    assert resp.status_code == 402
+    assert seat_cache.get_show_capacity(show.id) == 10
+    assert redis_client.zcard(show_key(show.id, "pending")) == 0
+
+
+def test_validation_failure_restores_count_reservation(client, make_show, auth_headers):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    seat_cache.set_show_capacity(show.id, 10)
+    _, headers = auth_headers()
+
+    resp = _book(client, show.id, headers, ["A1", "Z9"], payment={"force": "success"})
+
+    assert resp.status_code == 400
+    assert seat_cache.get_show_capacity(show.id) == 10
+    assert seat_cache.get_active_reservations(show.id) == []
+
+
+def test_payment_failure_releases_seat_hold(client, make_show, auth_headers):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    seat_cache.set_show_capacity(show.id, 10)
+    _, headers = auth_headers()
+    hold = client.post(f"/shows/{show.id}/hold", headers=headers, json={"seats": ["A1", "A2"]}).get_json()
+
+    resp = _book(client, show.id, headers, ["A1", "A2"], reservation_id=hold["reservation_id"], payment={"force": "fail"})
+
+    assert resp.status_code == 402
+    assert seat_cache.get_active_holds(show.id) == []
+    assert seat_cache.get_show_capacity(show.id) == 10
+
+
+def test_successful_booking_takes_seats_off_capacity(client, make_show, auth_headers):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    seat_cache.set_show_capacity(show.id, 10)
+    _, headers = auth_headers()
+
+    resp = _book(client, show.id, headers, ["A1", "A2"], payment={"force": "success"})
+
+    assert resp.status_code == 201
+    assert seat_cache.get_show_capacity(show.id) == 8
+    assert seat_cache.get_active_reservations(show.id) == []
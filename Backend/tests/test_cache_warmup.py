@@ -0,0 +1,28 @@
+"""Capacity warm-up fills Redis once and only releases its own lock."""
+from cache.seat_cache import seat_cache
+from tasks.cache_warmup import WARMUP_LOCK_KEY, warm_show_capacities
+
+
+def test_warmup_fills_missing_capacities_only(make_show, redis_client):
+    cold = make_show(capacity=7)
+    warm = make_show(capacity=9)
+    seat_cache.set_show_capacity(warm.id, 4)
+
+    assert warm_show_capacities()["written"] == 1
+    assert seat_cache.get_show_capacity(cold.id) == 7
+    assert seat_cache.get_show_capacity(warm.id) == 4
+    assert not redis_client.exists(WARMUP_LOCK_KEY)
+
+
+def test_a_run_past_its_lock_ttl_keeps_the_next_runs_lock(app, redis_client, monkeypatch):
+    import tasks.cache_warmup as cache_warmup
+
+    def slow_run(overwrite=False):
+        # The lock expired mid-run and another worker's warm-up took it
+        redis_client.set(WARMUP_LOCK_KEY, "next-run")
+        return {}
+
+    monkeypatch.setattr(cache_warmup, "warm_show_capacities_from_db", slow_run)
+    warm_show_capacities()
+    assert redis_client.get(WARMUP_LOCK_KEY) == "next-run"
+    assert warm_show_capacities() == {"skipped": True}
@@ -0,0 +1,69 @@
+"""Theatre CSV export aggregates."""
+import csv
+import sys
+import types
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Ticket
+
+
+@pytest.fixture
+def run_export(app, monkeypatch, tmp_path):
+    # The task imports the app from run.py; hand it the test app instead
+    monkeypatch.setitem(sys.modules, "run", types.SimpleNamespace(app=app))
+    app.config["UPLOAD_FOLDER"] = str(tmp_path)
+
+    def _run(theatre_id):
+        from resources.export import export_theatre_csv, exports_folder, _export_filename
+        export_theatre_csv.apply(args=[theatre_id], task_id="job1").get()
+        with open(f"{exports_folder(app.config)}/{_export_filename(theatre_id, 'job1')}", newline="") as fh:
+            return list(csv.reader(fh))
+
+    return _run
+
+
+def test_export_counts_only_this_theatres_tickets(app, make_show, auth_headers, run_export):
+    user, _ = auth_headers()
+    show = make_show(capacity=8)
+    other = make_show(capacity=8)
+    db.session.add_all([
+        Ticket(price=10, quantity=2, user_id=user.id, show_id=show.id, status="confirmed"),
+        Ticket(price=10, quantity=1, user_id=user.id, show_id=show.id, status="cancelled"),
+        Ticket(price=10, quantity=5, user_id=user.id, show_id=other.id, status="confirmed"),
+    ])
+    db.session.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *a: statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        rows = run_export(show.theatre_id)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    header = {r[0]: r[1] for r in rows[:9] if len(r) == 2}
+    assert header["Number of Shows"] == "1"
+    assert header["Number of Bookings"] == "2"
+    show_row = rows[-1]
+    assert show_row[0] == "Show"
+    assert show_row[6:] == ["2", "20.00", "20.0%"]
+    # The ticket aggregate runs once, scoped to the theatre
+    aggregates = [s for s in statements if "FROM ticket" in s]
+    assert len(aggregates) == 1
+    assert "theatre_id" in aggregates[0]
+
+
+def test_export_of_theatre_without_shows(app, make_show, run_export):
+    from models import Theatre
+    theatre = Theatre(name="Empty", place="Nowhere", capacity=0)
+    db.session.add(theatre)
+    db.session.commit()
+
+    rows = run_export(theatre.id)
+
+    header = {r[0]: r[1] for r in rows if len(r) == 2}
+    assert header["Number of Shows"] == "0"
+    assert header["Average Rating"] == "0.00"
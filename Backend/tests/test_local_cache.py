@@ -0,0 +1,73 @@
+"""Two-tier cache: loads that race an invalidation are not written back."""
+from cache.local_cache import TwoTierCache, invalidate_show, show_cache
+
+
+def _cache(redis_client, name):
+    return TwoTierCache(name, maxsize=16, ttl=60, redis_ttl=60, redis_getter=lambda: redis_client)
+
+
+def test_get_or_load_stores_in_both_tiers(redis_client):
+    cache = _cache(redis_client, "test_store")
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"v": 1}
+
+    assert cache.get_or_load("k", loader) == {"v": 1}
+    assert cache.get_or_load("k", loader) == {"v": 1}
+    assert len(calls) == 1
+    assert redis_client.get(cache._key("k")) == '{"v": 1}'
+
+
+def test_load_invalidated_in_this_process_is_not_stored(redis_client):
+    cache = _cache(redis_client, "test_local_race")
+
+    def loader():
+        cache.invalidate("k")
+        return {"v": "stale"}
+
+    # The caller still gets what it loaded
+    assert cache.get_or_load("k", loader) == {"v": "stale"}
+    assert redis_client.get(cache._key("k")) is None
+    assert cache.local.get("k") is None
+    assert cache.stats()["stale_loads"] == 1
+    assert cache.get_or_load("k", lambda: {"v": "fresh"}) == {"v": "fresh"}
+
+
+def test_load_invalidated_by_another_process_is_not_stored(redis_client):
+    cache = _cache(redis_client, "test_remote_race")
+
+    def loader():
+        # Another worker's invalidate(): its pub/sub message has not arrived yet
+        redis_client.incr(cache._gen_key("k"))
+        redis_client.delete(cache._key("k"))
+        return {"v": "stale"}
+
+    assert cache.get_or_load("k", loader) == {"v": "stale"}
+    assert redis_client.get(cache._key("k")) is None
+    assert cache.local.get("k") is None
+
+
+def test_whole_cache_discard_during_load_skips_local_store(redis_client):
+    cache = _cache(redis_client, "test_epoch")
+
+    def loader():
+        cache.local.discard()
+        return {"v": "stale"}
+
+    cache.get_or_load("k", loader)
+    assert cache.local.get("k") is None
+
+
+def test_capacity_changes_keep_the_show_listing(redis_client):
+    show_cache.local.discard()
+    show_cache.set("all", [{"id": 1}])
+    show_cache.set(1, {"id": 1})
+
+    invalidate_show(1, listing=False)
+    assert show_cache.get(1) is None
+    assert show_cache.get("all") == [{"id": 1}]
+
+    invalidate_show(1)
+    assert show_cache.get("all") is None
@@ -0,0 +1,113 @@
+"""Redis vs DB capacity reconciliation: drift is repaired, busy shows are skipped."""
+from cache.seat_cache import seat_cache
+from tasks.reconciliation import (
+    RECONCILE_LOCK_KEY,
+    last_reconciliation_report,
+    reconcile_show_capacities,
+    reconcile_show_capacities_from_db,
+)
+
+
+def test_drift_is_repaired_around_pending_reservations(make_show, redis_client):
+    show = make_show(capacity=10)
+    seat_cache.set_show_capacity(show.id, 5)
+    seat_cache.reserve_seats_atomic(show.id, 2)
+
+    report = reconcile_show_capacities_from_db()
+    assert report["redis_drift"] == 1 and report["repaired"] == 1
+    entry = report["discrepancies"][0]
+    assert entry["kind"] == "redis_drift"
+    assert (entry["redis_capacity"], entry["pending"], entry["expected"]) == (3, 2, 8)
+    # The two pending seats stay taken
+    assert seat_cache.get_show_capacity(show.id) == 8
+    assert last_reconciliation_report()["repaired"] == 1
+
+
+def test_missing_capacity_is_restored(make_show, redis_client):
+    show = make_show(capacity=6)
+
+    report = reconcile_show_capacities_from_db()
+    assert report["redis_missing"] == 1
+    assert seat_cache.get_show_capacity(show.id) == 6
+
+
+def test_consistent_shows_are_left_alone(make_show, redis_client):
+    show = make_show(capacity=6)
+    seat_cache.set_show_capacity(show.id, 6)
+
+    report = reconcile_show_capacities_from_db()
+    assert report["shows"] == 1 and report["discrepancies"] == []
+
+
+def test_report_only_run_changes_nothing(make_show, redis_client):
+    show = make_show(capacity=6)
+    seat_cache.set_show_capacity(show.id, 1)
+
+    report = reconcile_show_capacities_from_db(repair=False)
+    assert report["redis_drift"] == 1 and report["repaired"] == 0
+    assert seat_cache.get_show_capacity(show.id) == 1
+
+
+def test_repair_skips_shows_changed_since_the_read(make_show, redis_client):
+    show = make_show(capacity=10)
+    seat_cache.set_show_capacity(show.id, 4)
+    rev = seat_cache.get_inventory_states([show.id])[show.id]["rev"]
+    # A booking lands between the revision read and the repair
+    seat_cache.reserve_seats_atomic(show.id, 1)
+
+    assert seat_cache.repair_show_capacities({show.id: (10, rev)}) == {show.id: None}
+    assert seat_cache.get_show_capacity(show.id) == 3
+
+
+def test_db_capacity_is_checked_against_sold_tickets(make_show, redis_client):
+    from extensions import db
+    from models import Screen
+
+    show = make_show(capacity=8)
+    screen = Screen(theatre_id=show.theatre_id, name="Screen 1", capacity=10)
+    db.session.add(screen)
+    db.session.flush()
+    show.screen_id = screen.id
+    db.session.commit()
+    seat_cache.set_show_capacity(show.id, 8)
+
+    report = reconcile_show_capacities_from_db()
+    assert report["db_vs_tickets"] == 1
+    assert report["discrepancies"][0] == {"show_id": show.id, "kind": "db_vs_tickets", "db_capacity": 8,
+                                         "sold": 0, "screen_capacity": 10}
+    # Reported, not changed
+    assert show.capacity == 8
+
+
+def test_overlapping_runs_are_skipped(app, redis_client):
+    redis_client.set(RECONCILE_LOCK_KEY, "1")
+    assert reconcile_show_capacities() == {"skipped": True}
+
+
+def test_admin_capacity_edit_shifts_the_cached_count(client, make_show, auth_headers, redis_client):
+    show = make_show(capacity=10)
+    seat_cache.set_show_capacity(show.id, 10)
+    seat_cache.reserve_seats_atomic(show.id, 2)
+    _, headers = auth_headers("admin", is_admin=True)
+
+    res = client.put(f"/admin/shows/{show.id}", json={"capacity": 15}, headers=headers)
+    assert res.status_code == 200
+    assert seat_cache.get_show_capacity(show.id) == 13
+
+
+def test_a_run_past_its_lock_ttl_keeps_the_next_runs_lock(app, redis_client, monkeypatch):
+    import tasks.reconciliation as reconciliation
+
+    def slow_run(repair=True):
+        # The lock expired mid-run and another run took it
+        redis_client.set(RECONCILE_LOCK_KEY, "next-run")
+        return {}
+
+    monkeypatch.setattr(reconciliation, "reconcile_show_capacities_from_db", slow_run)
+    reconcile_show_capacities()
+    assert redis_client.get(RECONCILE_LOCK_KEY) == "next-run"
+
+
+def test_lock_is_released_after_a_run(app, redis_client):
+    reconcile_show_capacities()
+    assert not redis_client.exists(RECONCILE_LOCK_KEY)
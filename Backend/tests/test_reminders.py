@@ -0,0 +1,35 @@
+"""Reminder dispatch: every beat run starts over, a redelivered run resumes."""
+import pytest
+
+import tasks.emails as emails
+
+
+@pytest.fixture
+def dispatched(app, auth_headers, redis_client, monkeypatch):
+    for name in ("ann", "ben", "cat"):
+        auth_headers(name)
+    app.config["REMINDER_CHUNK_SIZE"] = 2
+    chunks = []
+
+    class _Group:
+        def __init__(self, signatures):
+            self.signatures = signatures
+
+        def apply_async(self):
+            chunks.extend(self.signatures)
+
+    monkeypatch.setattr(emails, "group", _Group)
+    return chunks
+
+
+def test_back_to_back_runs_each_send_everything(dispatched):
+    assert emails.send_email_reminder.apply().get() == 2
+    # Beat jitter can fire the next run moments later; it must not be skipped
+    assert emails.send_email_reminder.apply().get() == 2
+    first, second = {c.args[0] for c in dispatched[:2]}, {c.args[0] for c in dispatched[2:]}
+    assert len(first) == len(second) == 1 and first != second
+
+
+def test_redelivered_run_resumes_from_its_cursor(dispatched):
+    assert emails.send_email_reminder.apply(task_id="run-1").get() == 2
+    assert emails.send_email_reminder.apply(task_id="run-1").get() == 0
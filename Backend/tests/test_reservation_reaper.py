@@ -0,0 +1,106 @@
+"""Expired count-based reservations give their seats back exactly once."""
+from cache.hold_expiry import handle_expired_key
+from cache.seat_cache import PENDING_SHOWS_KEY, seat_cache, show_key
+
+SHOW_ID = 4
+
+
+def _capacity():
+    return seat_cache.get_show_capacity(SHOW_ID)
+
+
+def _reserve(seats, expired=False):
+    reservation_id = seat_cache.reserve_seats_atomic(SHOW_ID, seats)["reservation_id"]
+    if expired:
+        # As if the reservation's TTL had passed without a confirm or release
+        seat_cache.get_redis().zadd(show_key(SHOW_ID, "pending"), {reservation_id: 0})
+    return reservation_id
+
+
+def test_reserve_takes_seats_and_refuses_overbooking(redis_client):
+    seat_cache.set_show_capacity(SHOW_ID, 5)
+
+    assert seat_cache.reserve_seats_atomic(SHOW_ID, 3)["new_capacity"] == 2
+    res = seat_cache.reserve_seats_atomic(SHOW_ID, 3)
+    assert res == {"success": False, "error": "INSUFFICIENT_CAPACITY"}
+    assert _capacity() == 2
+    assert redis_client.sismember(PENDING_SHOWS_KEY, SHOW_ID)
+
+
+def test_next_reservation_reclaims_expired_ones(redis_client):
+    seat_cache.set_show_capacity(SHOW_ID, 5)
+    _reserve(4, expired=True)
+
+    # Only one seat is cached as free, but the expired four come back first
+    res = seat_cache.reserve_seats_atomic(SHOW_ID, 3)
+    assert res["success"]
+    assert res["new_capacity"] == 2
+    assert seat_cache.reservation_reaper_stats()["seats_reclaimed_by_reserve"] == 4
+
+
+def test_reclaim_is_exactly_once(redis_client):
+    seat_cache.set_show_capacity(SHOW_ID, 10)
+    reservation_id = _reserve(3, expired=True)
+
+    assert seat_cache.reclaim_expired_reservations(SHOW_ID) == {"reservations": 1, "seats": 3}
+    assert seat_cache.reclaim_expired_reservations(SHOW_ID) == {"reservations": 0, "seats": 0}
+    # A late release or confirm of the reclaimed reservation changes nothing
+    seat_cache.release_reservation(SHOW_ID, reservation_id)
+    assert not seat_cache.confirm_booking(reservation_id, 1, SHOW_ID, 3)
+    assert _capacity() == 10
+
+
+def test_unexpired_reservations_are_left_alone(redis_client):
+    seat_cache.set_show_capacity(SHOW_ID, 10)
+    reservation_id = _reserve(3)
+
+    assert seat_cache.reclaim_expired_reservations(SHOW_ID)["reservations"] == 0
+    assert seat_cache.confirm_booking(reservation_id, 1, SHOW_ID, 3)
+    assert _capacity() == 7
+
+
+def test_expiry_event_reclaims(redis_client):
+    seat_cache.set_show_capacity(SHOW_ID, 10)
+    reservation_id = _reserve(2, expired=True)
+
+    assert handle_expired_key(show_key(SHOW_ID, "reservation", reservation_id))
+    assert _capacity() == 10
+    assert seat_cache.reservation_reaper_stats()["seats_reclaimed_by_listener"] == 2
+
+
+def test_sweep_reclaims_and_forgets_idle_shows(app, redis_client):
+    from tasks.reservations import sweep_expired_reservations
+
+    seat_cache.set_show_capacity(SHOW_ID, 10)
+    # Expire both only once made; the second reserve would reclaim the first
+    reservations = [_reserve(2), _reserve(1)]
+    redis_client.zadd(show_key(SHOW_ID, "pending"), {r: 0 for r in reservations})
+
+    result = sweep_expired_reservations()
+    assert result["reservations"] == 2 and result["seats"] == 3 and result["shows"] == 1
+    assert _capacity() == 10
+    assert not redis_client.sismember(PENDING_SHOWS_KEY, SHOW_ID)
+    stats = seat_cache.reservation_reaper_stats()
+    assert stats["sweeps"] == 1
+    assert stats["seats_reclaimed_by_sweeper"] == 3
+
+
+def test_sweep_keeps_a_show_reserved_during_cleanup(app, redis_client, monkeypatch):
+    from tasks.reservations import sweep_expired_reservations
+
+    seat_cache.set_show_capacity(SHOW_ID, 10)
+    redis_client.sadd(PENDING_SHOWS_KEY, SHOW_ID)
+
+    class ReserveBeforeSrem:
+        def __getattr__(self, name):
+            return getattr(redis_client, name)
+
+        def srem(self, *args):
+            # A reservation's ZADD and SADD land between the sweep's ZCARD and SREM
+            monkeypatch.setattr(seat_cache, "get_redis", lambda: redis_client)
+            _reserve(1)
+            return redis_client.srem(*args)
+
+    monkeypatch.setattr(seat_cache, "get_redis", lambda: ReserveBeforeSrem())
+    sweep_expired_reservations()
+    assert redis_client.sismember(PENDING_SHOWS_KEY, SHOW_ID)
@@ -0,0 +1,33 @@
+"""Seat cache keys are hash-tagged per show, so every script stays in one cluster slot."""
+from redis.crc import key_slot
+
+from cache.seat_cache import seat_cache, show_key
+
+
+def test_show_key_format():
+    assert show_key(5) == "{show:5}"
+    assert show_key(5, "hold", "A1") == "{show:5}:hold:A1"
+
+
+def test_reservation_ids_are_sequenced_per_show(redis_client):
+    seat_cache.set_show_capacity(1, 10)
+    seat_cache.set_show_capacity(2, 10)
+
+    assert seat_cache.reserve_seats_atomic(1, 1)["reservation_id"] == 1
+    assert seat_cache.reserve_seats_atomic(2, 1)["reservation_id"] == 1
+    assert seat_cache.reserve_seats_atomic(1, 1)["reservation_id"] == 2
+    assert not redis_client.exists("reservation_counter")
+
+
+def test_every_key_a_show_touches_shares_its_slot(redis_client):
+    seat_cache.set_show_capacity(3, 10)
+    reservation = seat_cache.reserve_seats_atomic(3, 2)["reservation_id"]
+    seat_cache.confirm_booking(reservation, 1, 3, 2)
+    hold = seat_cache.hold_seats_bulk("alice", 3, ["A1", "A2"])["reservation_id"]
+    seat_cache.extend_seat_hold(hold, 3, 60, 900, user_id="alice")
+    seat_cache.confirm_seat_hold(hold, "alice", 3)
+
+    keys = [k for k in redis_client.keys("*") if not k.startswith(("metrics:", "reservations:"))]
+    assert keys
+    assert all(k.startswith("{show:3}:") for k in keys)
+    assert {key_slot(k.encode()) for k in keys} == {key_slot(b"{show:3}")}
@@ -0,0 +1,77 @@
+"""Bulk seat holds: every conflict is reported, partial holds and same-row substitutes."""
+from cache.seat_cache import seat_cache, show_key
+
+SHOW_ID = 7
+
+
+def _holder(redis_client, seat):
+    return redis_client.get(show_key(SHOW_ID, "hold", seat))
+
+
+def test_holds_all_free_seats(redis_client):
+    res = seat_cache.hold_seats_bulk("alice", SHOW_ID, ["A1", "A2"])
+    assert res["success"]
+    assert res["seats"] == ["A1", "A2"]
+    assert res["conflicts"] == [] and res["unavailable"] == []
+    assert _holder(redis_client, "A1") == str(res["reservation_id"])
+    reservation = redis_client.hgetall(show_key(SHOW_ID, "reservation", res["reservation_id"]))
+    assert reservation["user_id"] == "alice"
+    assert reservation["seats"] == "A1,A2"
+
+
+def test_strict_hold_reports_every_conflict_and_holds_nothing(redis_client):
+    seat_cache.hold_seats_bulk("bob", SHOW_ID, ["A2", "A4"])
+
+    res = seat_cache.hold_seats_bulk("alice", SHOW_ID, ["A1", "A2", "A3", "A4"])
+    assert not res["success"]
+    assert res["error"] == "SEATS_UNAVAILABLE"
+    assert res["conflicts"] == ["A2", "A4"]
+    assert res["unavailable"] == ["A2", "A4"]
+    assert _holder(redis_client, "A1") is None
+    assert _holder(redis_client, "A3") is None
+
+
+def test_partial_hold_keeps_the_free_seats(redis_client):
+    seat_cache.hold_seats_bulk("bob", SHOW_ID, ["A2"])
+
+    res = seat_cache.hold_seats_bulk("alice", SHOW_ID, ["A1", "A2", "A3"], partial=True)
+    assert res["success"]
+    assert res["seats"] == ["A1", "A3"]
+    assert res["unavailable"] == ["A2"]
+
+
+def test_conflicts_are_substituted_without_taking_requested_seats(redis_client):
+    seat_cache.hold_seats_bulk("bob", SHOW_ID, ["A2"])
+
+    # A3 is requested too, so it must not be used as A2's substitute
+    res = seat_cache.hold_seats_bulk("alice", SHOW_ID, ["A2", "A3"], alternatives={"A2": ["A3", "A1", "A4"]})
+    assert res["success"]
+    assert res["substitutions"] == {"A2": "A1"}
+    assert sorted(res["seats"]) == ["A1", "A3"]
+    assert res["unavailable"] == []
+
+
+def test_booked_seats_are_refused(redis_client):
+    redis_client.hset(show_key(SHOW_ID, "seat_state"), "A1", "booked")
+
+    res = seat_cache.hold_seats_bulk("alice", SHOW_ID, ["A1"])
+    assert not res["success"]
+    assert res["unavailable"] == ["A1"]
+    assert _holder(redis_client, "A1") is None
+
+
+def test_hold_endpoint_substitutes_from_the_seat_map(client, make_show, auth_headers, redis_client):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    _, headers = auth_headers()
+    seat_cache.hold_seats_bulk("bob", show.id, ["A3"])
+
+    strict = client.post(f"/shows/{show.id}/hold", json={"seats": ["A3"]}, headers=headers)
+    assert strict.status_code == 409
+    assert strict.get_json()["message"] == "SEAT_ALREADY_HELD:A3"
+    assert strict.get_json()["conflicts"] == ["A3"]
+
+    res = client.post(f"/shows/{show.id}/hold", json={"seats": ["A3"], "substitute": True}, headers=headers)
+    assert res.status_code == 201
+    body = res.get_json()
+    assert body["substitutions"] == {"A3": "A2"}
+    assert body["seats"] == ["A2"]
@@ -0,0 +1,90 @@
+"""Heartbeat extension of seat holds: lifetime cap, ownership and lost seats."""
+from cache.seat_cache import seat_cache, show_key
+
+SHOW_ID = 9
+
+
+def _hold(user, seats, ttl=10):
+    res = seat_cache.hold_seats_bulk(user, SHOW_ID, seats, ttl_seconds=ttl)
+    assert res["success"]
+    return res["reservation_id"]
+
+
+def test_extend_pushes_every_hold_and_the_reservation(redis_client):
+    reservation_id = _hold("alice", ["A1", "A2"])
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 60, 900, user_id="alice")
+    assert res["success"] and res["lost"] == [] and not res["capped"]
+    for key in (show_key(SHOW_ID, "hold", "A1"), show_key(SHOW_ID, "hold", "A2"),
+                show_key(SHOW_ID, "reservation", reservation_id)):
+        assert redis_client.pttl(key) > 50_000
+        assert redis_client.pexpiretime(key) == res["expires_at_ms"]
+
+
+def test_extend_stops_at_the_lifetime_cap(redis_client):
+    reservation_id = _hold("alice", ["A1"])
+    created = int(redis_client.hget(show_key(SHOW_ID, "reservation", reservation_id), "timestamp"))
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 60, 30, user_id="alice")
+    assert res["capped"]
+    assert res["expires_at_ms"] == (created + 30) * 1000
+
+
+def test_extend_never_shortens_a_hold(redis_client):
+    reservation_id = _hold("alice", ["A1"], ttl=120)
+    before = redis_client.pexpiretime(show_key(SHOW_ID, "hold", "A1"))
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 10, 900, user_id="alice")
+    assert res["success"]
+    assert redis_client.pexpiretime(show_key(SHOW_ID, "hold", "A1")) >= before
+
+
+def test_only_the_owner_can_extend(redis_client):
+    reservation_id = _hold("alice", ["A1"])
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 60, 900, user_id="mallory")
+    assert not res["success"]
+    assert "NOT_OWNER" in res["error"]
+
+
+def test_lost_seats_leave_the_reservation(redis_client):
+    reservation_id = _hold("alice", ["A1", "A2"])
+    # A2's hold expired and bob took the seat
+    redis_client.delete(show_key(SHOW_ID, "hold", "A2"))
+    bob = _hold("bob", ["A2"])
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 60, 900, user_id="alice")
+    assert res["success"] and res["lost"] == ["A2"]
+    assert redis_client.hget(show_key(SHOW_ID, "reservation", reservation_id), "seats") == "A1"
+
+    # Releasing alice's reservation must leave bob's hold alone
+    assert seat_cache.release_seat_hold(reservation_id, SHOW_ID)
+    assert redis_client.get(show_key(SHOW_ID, "hold", "A2")) == str(bob)
+
+
+def test_extend_with_no_seat_left_expires_the_reservation(redis_client):
+    reservation_id = _hold("alice", ["A1"])
+    redis_client.delete(show_key(SHOW_ID, "hold", "A1"))
+
+    res = seat_cache.extend_seat_hold(reservation_id, SHOW_ID, 60, 900, user_id="alice")
+    assert "HOLD_EXPIRED" in res["error"]
+    assert not redis_client.exists(show_key(SHOW_ID, "reservation", reservation_id))
+
+
+def test_heartbeat_endpoint(client, make_show, auth_headers, redis_client):
+    show = make_show(capacity=10)
+    _, alice = auth_headers("alice")
+    _, bob = auth_headers("bob")
+    reservation_id = seat_cache.hold_seats_bulk("alice", show.id, ["A1"], ttl_seconds=10)["reservation_id"]
+    url = f"/shows/{show.id}/hold/{reservation_id}/heartbeat"
+
+    ok = client.post(url, json={"ttl_seconds": 60}, headers=alice)
+    assert ok.status_code == 200
+    assert ok.get_json()["lost"] == []
+
+    assert client.post(url, headers=bob).status_code == 403
+
+    redis_client.delete(show_key(show.id, "hold", "A1"))
+    gone = client.post(url, headers=alice)
+    assert gone.status_code == 410
+    assert gone.get_json()["error"] == "HOLD_EXPIRED"
@@ -0,0 +1,69 @@
+"""Compact seat layouts for the bulk seat endpoint."""
+import pytest
+
+from resources.theatre_seats import MAX_BULK_SEATS, expand_seat_layout
+
+
+def test_expand_layout_with_overrides():
+    seats = expand_seat_layout({
+        "rows": "A-C", "seats": "1-4",
+        "overrides": [
+            {"rows": "C", "seat_type": "premium"},
+            {"rows": "A", "seats": [1, 4], "seat_type": "wheelchair"},
+        ],
+    })
+    types = {(s["row_label"], s["seat_number"]): s["seat_type"] for s in seats}
+    assert len(seats) == 12
+    assert types[("B", 2)] == "regular"
+    assert types[("C", 1)] == types[("C", 4)] == "premium"
+    assert types[("A", 1)] == types[("A", 4)] == "wheelchair"
+    assert types[("A", 2)] == "regular"
+
+
+def test_override_outside_block_adds_no_seats():
+    seats = expand_seat_layout({"rows": "A", "seats": "1-2", "overrides": [{"rows": "B", "seat_type": "premium"}]})
+    assert {(s["row_label"], s["seat_number"]) for s in seats} == {("A", 1), ("A", 2)}
+
+
+@pytest.mark.parametrize("layout", [
+    {"rows": "A", "seats": "1-1000000000"},
+    {"rows": "A-Z", "seats": "1-200"},
+    [{"rows": "A-J", "seats": "1-400"}, {"rows": "K-T", "seats": "1-400"}],
+    {"rows": "A", "seats": "1-10", "overrides": [{"rows": "A", "seats": "1-1000000000", "seat_type": "premium"}]},
+])
+def test_oversized_layout_rejected_before_expanding(layout):
+    with pytest.raises(ValueError):
+        expand_seat_layout(layout, max_seats=MAX_BULK_SEATS)
+
+
+@pytest.mark.parametrize("layout", [
+    {"rows": "C-A", "seats": "1-5"},
+    {"rows": "A", "seats": "5-1"},
+    {"rows": "A", "seats": "0-3"},
+])
+def test_bad_ranges_rejected(layout):
+    with pytest.raises(ValueError):
+        expand_seat_layout(layout, max_seats=MAX_BULK_SEATS)
+
+
+def test_bulk_endpoint_creates_layout_and_skips_existing(client, make_show, auth_headers):
+    show = make_show(rows="A", seats_per_row=2)
+    _, headers = auth_headers()
+
+    resp = client.post(f"/theatres/{show.theatre_id}/seats", headers=headers,
+                       json={"layout": {"rows": "A-B", "seats": "1-3"}})
+
+    assert resp.status_code in (200, 201), resp.get_json()
+    seats = client.get(f"/theatres/{show.theatre_id}/seats").get_json()["seats"]
+    assert sorted(s["seat_id"] for s in seats) == ["A1", "A2", "A3", "B1", "B2", "B3"]
+
+
+def test_bulk_endpoint_rejects_huge_range(client, make_show, auth_headers):
+    show = make_show()
+    _, headers = auth_headers()
+
+    resp = client.post(f"/theatres/{show.theatre_id}/seats", headers=headers,
+                       json={"layout": {"rows": "A", "seats": "1-1000000000"}})
+
+    assert resp.status_code == 400
+    assert "more than" in resp.get_json()["message"]
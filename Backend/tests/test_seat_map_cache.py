@@ -0,0 +1,61 @@
+"""Seat map cache: a map read before an invalidation is not kept locally."""
+import pytest
+
+from cache.seat_cache import seat_cache
+from resources.theatre_seats import load_theatre_seat_map
+
+
+@pytest.fixture(autouse=True)
+def _clear_local():
+    seat_cache._seat_map_local.discard()
+    yield
+    seat_cache._seat_map_local.discard()
+
+
+def test_seat_map_is_cached_in_both_tiers(make_show, redis_client):
+    show = make_show(rows="A", seats_per_row=3)
+
+    seats = load_theatre_seat_map(show.theatre_id)
+    assert [s["seat_id"] for s in seats] == ["A1", "A2", "A3"]
+    assert seat_cache._seat_map_local.get(seat_cache._seat_map_scope(show.theatre_id)) is seats
+    seat_cache._seat_map_local.discard()
+    assert seat_cache.get_theatre_seat_map(show.theatre_id) == seats
+
+
+def test_db_load_racing_an_invalidation_is_not_kept(make_show, redis_client, monkeypatch):
+    show = make_show(rows="A", seats_per_row=3)
+    read_version = seat_cache.get_theatre_seat_map_version
+
+    def version_then_invalidate(theatre_id, screen_id=None):
+        version = read_version(theatre_id, screen_id)
+        # A layout change lands while the rows are being read
+        seat_cache.delete_theatre_seat_map(theatre_id, screen_id)
+        return version
+
+    monkeypatch.setattr(seat_cache, "get_theatre_seat_map_version", version_then_invalidate)
+    load_theatre_seat_map(show.theatre_id)
+    monkeypatch.undo()
+
+    assert seat_cache._seat_map_local.get(seat_cache._seat_map_scope(show.theatre_id)) is None
+    assert seat_cache.get_theatre_seat_map(show.theatre_id) is None
+
+
+def test_redis_read_racing_an_invalidation_is_not_kept(make_show, redis_client, monkeypatch):
+    show = make_show(rows="A", seats_per_row=3)
+    load_theatre_seat_map(show.theatre_id)
+    scope = seat_cache._seat_map_scope(show.theatre_id)
+    seat_cache._seat_map_local.discard()
+
+    class InvalidatedDuringRead:
+        def __getattr__(self, name):
+            return getattr(redis_client, name)
+
+        def mget(self, *keys):
+            values = redis_client.mget(*keys)
+            # Another worker's invalidation reaches this process mid-read
+            seat_cache._seat_map_local.discard(scope)
+            return values
+
+    monkeypatch.setattr(seat_cache, "get_redis", lambda: InvalidatedDuringRead())
+    assert seat_cache.get_theatre_seat_map(show.theatre_id) is not None
+    assert seat_cache._seat_map_local.get(scope) is None
@@ -0,0 +1,71 @@
+"""Seat state versions: deltas match live holds, bookings are logged, diffs keep the newest state."""
+import sockets
+from cache.seat_cache import seat_cache, show_key
+
+
+def _changes(show_id, since=0):
+    _, changes = seat_cache.get_seat_changes(show_id, since)
+    return {c["seat_id"]: (c["state"], c["reservation_id"]) for c in changes}
+
+
+def test_delta_reports_live_holds(redis_client):
+    hold = seat_cache.hold_seats_bulk("alice", 1, ["A1"])["reservation_id"]
+    assert _changes(1) == {"A1": ("held", hold)}
+
+
+def test_delta_drops_holds_whose_expiry_was_missed(redis_client):
+    seat_cache.hold_seats_bulk("alice", 1, ["A1", "A2"])
+    # The key expired but no expiry event reached seat_state
+    redis_client.delete(show_key(1, "hold", "A1"))
+    changes = _changes(1)
+    assert changes["A1"] == ("free", None)
+    assert changes["A2"][0] == "held"
+
+
+def test_count_based_booking_is_logged_and_broadcast(client, make_show, auth_headers, redis_client, monkeypatch):
+    import resources.booking as booking
+
+    events = []
+    monkeypatch.setattr(booking, "emit_seat_update", lambda *args: events.append(args))
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    seat_cache.set_show_capacity(show.id, 10)
+    _, headers = auth_headers()
+    before = seat_cache.get_seat_version(show.id)
+
+    resp = client.post(f"/bookshows/{show.id}/book", headers=headers,
+                       json={"seats": [{"row": "A", "num": 1}, {"row": "A", "num": 2}], "payment": {"force": "success"}})
+    assert resp.status_code == 201
+
+    assert _changes(show.id, before) == {"A1": ("booked", None), "A2": ("booked", None)}
+    assert len(events) == 1
+    show_id, event_type, payload = events[0]
+    assert (show_id, event_type, payload["seats"]) == (show.id, "seat_confirmed", ["A1", "A2"])
+    assert payload["version"] == seat_cache.get_seat_version(show.id)
+
+
+class _FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, room=None):
+        self.emitted.append((event, data, room))
+
+    def start_background_task(self, *args, **kwargs):
+        pass
+
+
+def test_diff_keeps_the_newest_version_of_each_seat(redis_client, monkeypatch):
+    fake = _FakeSocketIO()
+    monkeypatch.setattr(sockets, "socketio", fake)
+    broadcaster = sockets.SeatBroadcaster()
+
+    # Version 6 finished after version 5 in Redis but was queued first
+    broadcaster.enqueue(1, "seat_held", {"reservation_id": 9, "seats": ["A1"], "version": 6})
+    broadcaster.enqueue(1, "seat_released", {"reservation_id": 8, "seats": ["A1", "A2"], "version": 5})
+    broadcaster.flush()
+
+    (_, diff, room), = fake.emitted
+    assert room == "show_1"
+    assert diff["version"] == 6
+    assert diff["held"] == {"A1": 9}
+    assert diff["released"] == ["A2"]
@@ -0,0 +1,103 @@
+"""Which SMTP failures the pool retries on a fresh connection."""
+import smtplib
+import socket
+
+import pytest
+
+from utils import smtp_pool
+from utils.smtp_pool import SMTPConnectionPool, _PooledConnection, _TrackedSMTP
+
+
+class ScriptedSMTP(_TrackedSMTP):
+    """No network: `sendmail` fails with the scripted error, before or after DATA."""
+
+    def __init__(self, error=None, after_data=False):
+        super().__init__()
+        self.error = error
+        self.after_data = after_data
+        self.sent = 0
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        if self.after_data:
+            self.data_started = True
+        if self.error:
+            raise self.error
+        self.sent += 1
+        return {}
+
+    def quit(self):
+        pass
+
+    def noop(self):
+        return 250, b"ok"
+
+
+def _pool(monkeypatch, *servers):
+    pool = SMTPConnectionPool("localhost", 25)
+    queue = list(servers)
+    monkeypatch.setattr(pool, "_connect", lambda: _PooledConnection(queue.pop(0)))
+    return pool, queue
+
+
+@pytest.mark.parametrize("error", [smtplib.SMTPServerDisconnected("gone"), ConnectionResetError("reset")])
+def test_dropped_session_before_data_is_retried(monkeypatch, error):
+    fresh = ScriptedSMTP()
+    pool, queue = _pool(monkeypatch, ScriptedSMTP(error), fresh)
+
+    pool.send("a@example.com", ["b@example.com"], "hi")
+
+    assert fresh.sent == 1 and not queue
+
+
+@pytest.mark.parametrize("error", [
+    smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"no")}),
+    smtplib.SMTPDataError(554, b"rejected"),
+    smtplib.SMTPSenderRefused(550, b"no", "a@example.com"),
+])
+def test_smtp_replies_are_not_retried(monkeypatch, error):
+    pool, queue = _pool(monkeypatch, ScriptedSMTP(error), ScriptedSMTP())
+
+    with pytest.raises(type(error)):
+        pool.send("a@example.com", ["b@example.com"], "hi")
+    assert len(queue) == 1
+
+
+@pytest.mark.parametrize("error", [socket.timeout("timed out"), smtplib.SMTPServerDisconnected("gone")])
+def test_failure_after_data_is_not_retried(monkeypatch, error):
+    pool, queue = _pool(monkeypatch, ScriptedSMTP(error, after_data=True), ScriptedSMTP())
+
+    with pytest.raises(type(error)):
+        pool.send("a@example.com", ["b@example.com"], "hi")
+    assert len(queue) == 1
+
+
+def test_smtp_errors_are_not_connection_errors():
+    assert not smtp_pool._is_connection_error(smtplib.SMTPDataError(554, b"x"))
+    assert smtp_pool._is_connection_error(smtplib.SMTPConnectError(421, b"x"))
+    assert smtp_pool._is_connection_error(OSError("socket"))
+
+
+class DropsDuringData(_TrackedSMTP):
+    """Real `sendmail`; MAIL and RCPT succeed and the socket is gone at DATA."""
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def mail(self, *args, **kwargs):
+        return 250, b"ok"
+
+    def rcpt(self, *args, **kwargs):
+        return 250, b"ok"
+
+    def quit(self):
+        pass
+
+
+def test_drop_inside_data_is_tracked_and_not_retried(monkeypatch):
+    first = DropsDuringData()
+    pool, queue = _pool(monkeypatch, first, ScriptedSMTP())
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send("a@example.com", ["b@example.com"], "hi")
+    assert first.data_started
+    assert len(queue) == 1
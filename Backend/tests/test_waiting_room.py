@@ -0,0 +1,103 @@
+"""Waiting room: paced admission, stable tickets and tokens bound to show and user."""
+import pytest
+
+from cache.seat_cache import show_key
+from cache.waiting_room import waiting_room
+
+
+def _rewind(redis_client, show_id, ms):
+    """Pretend the last admission happened `ms` earlier."""
+    key = show_key(show_id, "queue")
+    redis_client.hset(key, "last_ms", int(redis_client.hget(key, "last_ms")) - ms)
+
+
+def test_admits_at_the_configured_rate(app, redis_client):
+    waiting_room.open(1, 2)
+    tickets = [waiting_room.join(1, f"user{i}")["ticket"] for i in range(5)]
+    assert tickets == [1, 2, 3, 4, 5]
+    assert waiting_room.admit(1)["admitted_through"] == 0
+
+    _rewind(redis_client, 1, 1000)
+    assert waiting_room.admit(1)["admitted_through"] == 2
+    # Calling again straight away admits nobody else
+    assert waiting_room.admit(1)["admitted_through"] == 2
+
+    _rewind(redis_client, 1, 60_000)
+    assert waiting_room.admit(1)["admitted_through"] == 5
+
+
+def test_idle_time_is_not_banked(app, redis_client):
+    waiting_room.open(1, 2)
+    waiting_room.admit(1)
+    _rewind(redis_client, 1, 60_000)
+    waiting_room.admit(1)
+    # Arrivals after a quiet spell still wait their turn
+    waiting_room.join(1, "late")
+    assert waiting_room.admit(1)["admitted_through"] == 0
+
+
+def test_rejoining_keeps_the_ticket(app, redis_client):
+    waiting_room.open(1, 1)
+    first = waiting_room.join(1, "alice")
+    waiting_room.join(1, "bob")
+    again = waiting_room.join(1, "alice")
+    assert again["ticket"] == first["ticket"] == 1
+    assert waiting_room.admit(1)["last_ticket"] == 2
+
+
+def test_admitted_user_gets_a_token(app, redis_client):
+    waiting_room.open(1, 1)
+    assert "admission_token" not in waiting_room.join(1, "alice")
+    _rewind(redis_client, 1, 1000)
+    joined = waiting_room.join(1, "alice")
+    assert joined["admitted"] and waiting_room.verify_token(joined["admission_token"], 1, "alice")
+
+
+def test_token_is_bound_to_show_and_user(app, redis_client):
+    token = waiting_room.issue_token(1, "alice")
+    assert waiting_room.verify_token(token, 1, "alice")
+    assert not waiting_room.verify_token(token, 2, "alice")
+    assert not waiting_room.verify_token(token, 1, "bob")
+    assert not waiting_room.verify_token(token[:-2] + "xx", 1, "alice")
+    assert not waiting_room.verify_token(None, 1, "alice")
+
+
+def test_hold_and_booking_need_a_token_while_open(client, make_show, auth_headers, redis_client):
+    show = make_show(capacity=10, rows="A", seats_per_row=5)
+    _, headers = auth_headers("alice")
+    waiting_room.open(show.id, 1)
+
+    held = client.post(f"/shows/{show.id}/hold", json={"seats": ["A1"]}, headers=headers)
+    assert held.status_code == 403 and held.get_json()["error"] == "ADMISSION_REQUIRED"
+    booked = client.post(f"/bookshows/{show.id}/book", json={"seats": [{"row": "A", "num": 1}]}, headers=headers)
+    assert booked.status_code == 403
+
+    other_show = waiting_room.issue_token(show.id + 1, "alice")
+    assert client.post(f"/shows/{show.id}/hold", json={"seats": ["A1"]},
+                       headers=dict(headers, **{"X-Admission-Token": other_show})).status_code == 403
+
+    token = waiting_room.issue_token(show.id, "alice")
+    held = client.post(f"/shows/{show.id}/hold", json={"seats": ["A1"]},
+                       headers=dict(headers, **{"X-Admission-Token": token}))
+    assert held.status_code == 201
+
+    waiting_room.close(show.id)
+    assert client.post(f"/shows/{show.id}/hold", json={"seats": ["A2"]}, headers=headers).status_code == 201
+
+
+@pytest.mark.parametrize("rate", ["nan", "inf", "-inf", 0, -1, "fast"])
+def test_admin_rejects_bad_rates(client, make_show, auth_headers, redis_client, rate):
+    show = make_show()
+    _, headers = auth_headers("admin", is_admin=True)
+    res = client.put(f"/admin/shows/{show.id}/queue", json={"rate_per_second": rate}, headers=headers)
+    assert res.status_code == 400
+    assert not waiting_room.is_active(show.id)
+
+
+def test_admin_opens_the_queue(client, make_show, auth_headers, redis_client):
+    show = make_show()
+    _, headers = auth_headers("admin", is_admin=True)
+    res = client.put(f"/admin/shows/{show.id}/queue", json={"rate_per_second": 5}, headers=headers)
+    assert res.status_code == 200
+    assert res.get_json()["rate_per_second"] == 5.0
+    assert waiting_room.active_show_ids() == [show.id]
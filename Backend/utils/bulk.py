@@ -0,0 +1,52 @@
+"""Set-based insert helpers for bulk imports."""
+import logging
+from typing import Iterable, List, Dict
+
+from sqlalchemy import insert
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_ignoring_conflicts(table):
+    """Return an INSERT for `table` that skips rows violating a unique constraint.
+
+    PostgreSQL and SQLite both support `ON CONFLICT DO NOTHING`; other
+    dialects get a plain INSERT, so callers must pre-filter known duplicates.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+def insert_ignore_conflicts(model, rows: Iterable[Dict], batch_size: int = 500) -> int:
+    """Insert `rows` (dicts of column values) in multi-row batches.
+
+    Each batch is one statement. Returns the number of rows actually
+    inserted; rows that hit a unique constraint are silently skipped.
+    Runs in the caller's transaction - commit or roll back afterwards.
+    """
+    table = model.__table__
+    inserted = 0
+    batch: List[Dict] = []
+
+    def _flush():
+        nonlocal inserted
+        if not batch:
+            return
+        result = db.session.execute(_insert_ignoring_conflicts(table).values(batch))
+        inserted += result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(batch)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _flush()
+    _flush()
+    return inserted
@@ -0,0 +1,74 @@
+"""Redis-backed token bucket shared by every worker process.
+
+`TokenBucket.acquire()` blocks until a token is available. When Redis is
+unreachable it degrades to a process-local pace of `rate` per second so a
+sender never runs unthrottled.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket from the time elapsed since the last call, then take one
+# token. Returns 0 when a token was taken, otherwise milliseconds to wait.
+_TOKEN_BUCKET_LUA = r"""
+    local key = KEYS[1]
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = math.ceil((1 - tokens) * 1000 / rate)
+    end
+
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+    return wait
+"""
+
+
+class TokenBucket:
+    def __init__(self, redis_client, key: str, rate: float, burst: int = 1):
+        self.key = key
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._script = None
+        self._last_local = 0.0
+        if redis_client is not None:
+            try:
+                self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+            except Exception as e:
+                logger.warning(f"Failed to register token bucket script: {e}")
+
+    def _acquire_local(self):
+        interval = 1.0 / self.rate
+        delay = self._last_local + interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_local = time.monotonic()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._script is None:
+            self._acquire_local()
+            return
+        while True:
+            try:
+                wait_ms = int(self._script(keys=[self.key], args=[self.rate, self.burst]))
+            except Exception as e:
+                logger.warning(f"Token bucket unavailable, pacing locally: {e}")
+                self._acquire_local()
+                return
+            if wait_ms <= 0:
+                return
+            time.sleep(wait_ms / 1000.0)
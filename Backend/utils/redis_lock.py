@@ -0,0 +1,38 @@
+"""Redis lock that keeps a periodic job to one run at a time.
+
+The lock holds a random token and is only deleted by the holder of that
+token, so a run that outlives the TTL does not release the lock the next
+run has taken since.
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Delete KEYS[1] only if it still holds ARGV[1]; returns 1 if deleted
+_RELEASE_LUA = r"""
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+"""
+
+
+@contextmanager
+def redis_lock(r, key: str, ttl_seconds: int):
+    """Yield True if the lock was taken (and release it afterwards), else False."""
+    token = uuid.uuid4().hex
+    if not r.set(key, token, nx=True, ex=ttl_seconds):
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        try:
+            if not r.eval(_RELEASE_LUA, 1, key, token):
+                logger.warning(f"Lock {key} expired before the run finished")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release lock {key}: {e}")
@@ -0,0 +1,123 @@
+"""Process-wide Redis connection pool shared by every Redis user in the app.
+
+SeatCache, the OTP endpoints, the payment simulator, the local cache tier and
+the rate limiter all talk to the same Redis. Going through one pool keeps
+the connection count per worker bounded by REDIS_MAX_CONNECTIONS. When the
+pool is exhausted, callers wait up to REDIS_POOL_TIMEOUT for a free
+connection instead of failing outright. Checkouts that had to wait, and
+those that gave up, are counted so saturation shows up in
+`redis_pool_stats()` (served at /admin/cache/stats).
+"""
+import threading
+from typing import Dict, Optional
+
+import redis
+
+from config import Config
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that counts checkouts made while it was exhausted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.saturated = 0
+        self.exhausted = 0
+        self.peak_in_use = 0
+
+    def _in_use(self) -> int:
+        created = len(getattr(self, "_connections", []))
+        idle = sum(1 for conn in list(self.pool.queue) if conn is not None)
+        return created - idle
+
+    def get_connection(self, *args, **kwargs):
+        # An empty queue means every allowed connection is checked out and
+        # this caller has to wait for one to be released
+        saturated = self.pool.empty()
+        self.checkouts += 1
+        if saturated:
+            self.saturated += 1
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except redis.ConnectionError:
+            if saturated:
+                self.exhausted += 1
+            raise
+        self.peak_in_use = max(self.peak_in_use, self._in_use())
+        return connection
+
+    def stats(self) -> Dict:
+        in_use = self._in_use()
+        return {
+            "max_connections": self.max_connections,
+            "created": len(getattr(self, "_connections", [])),
+            "in_use": in_use,
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "saturated_checkouts": self.saturated,
+            "exhausted": self.exhausted,
+        }
+
+
+_pool: Optional[InstrumentedConnectionPool] = None
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def get_redis_pool() -> InstrumentedConnectionPool:
+    """Return the shared pool, built from Config on first use.
+
+    redis-py resets pooled connections itself when it detects a fork, so the
+    pool can be created before Celery or gunicorn fork their workers.
+    """
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = InstrumentedConnectionPool.from_url(
+                    Config.REDIS_URL,
+                    max_connections=Config.REDIS_MAX_CONNECTIONS,
+                    timeout=Config.REDIS_POOL_TIMEOUT,
+                    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=Config.REDIS_SOCKET_CONNECT_TIMEOUT,
+                    health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+                    decode_responses=True,
+                )
+    return _pool
+
+
+def get_redis_client() -> redis.Redis:
+    """Return the shared client (string responses) backed by the pool.
+
+    With REDIS_CLUSTER set this is a `RedisCluster`, which keeps its own
+    per-node pools capped at REDIS_MAX_CONNECTIONS each.
+    """
+    global _client
+    if _client is None:
+        if Config.REDIS_CLUSTER:
+            from redis.cluster import RedisCluster
+            with _lock:
+                if _client is None:
+                    _client = RedisCluster.from_url(
+                        Config.REDIS_URL,
+                        max_connections=Config.REDIS_MAX_CONNECTIONS,
+                        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+                        socket_connect_timeout=Config.REDIS_SOCKET_CONNECT_TIMEOUT,
+                        health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+                        decode_responses=True,
+                    )
+            return _client
+        pool = get_redis_pool()
+        with _lock:
+            if _client is None:
+                _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def redis_pool_stats() -> Dict:
+    if Config.REDIS_CLUSTER:
+        return {"cluster": True, "max_connections_per_node": Config.REDIS_MAX_CONNECTIONS}
+    if _pool is None:
+        return {"max_connections": Config.REDIS_MAX_CONNECTIONS, "created": 0}
+    return _pool.stats()
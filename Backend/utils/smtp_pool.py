@@ -0,0 +1,201 @@
+"""Process-local pool of SMTP connections shared by the email tasks.
+
+Opening an SMTP session (TCP connect, STARTTLS, AUTH) costs far more than
+sending one message on it. Each Celery worker process keeps a few sessions
+open, probes idle ones with NOOP before reuse, retires a session after a
+configurable number of messages and reconnects once when the server drops
+a connection before the message reached DATA. Anything else (refused
+recipients, data errors, a drop or timeout once DATA started) is raised,
+since the server may already have accepted the message and a retry could
+deliver it twice.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from celery.signals import worker_process_shutdown
+
+logger = logging.getLogger(__name__)
+
+def _is_connection_error(error: BaseException) -> bool:
+    """True if the session is unusable and a fresh connection may succeed.
+
+    SMTPException subclasses OSError, so plain socket errors are told apart
+    from SMTP replies explicitly.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _TrackedSMTP(smtplib.SMTP):
+    """SMTP session that records whether the current message reached DATA."""
+
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP sessions for one process."""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 use_tls: bool = True, timeout: int = 10, max_idle: int = 2,
+                 max_messages_per_connection: int = 100, keepalive_seconds: int = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_messages_per_connection = max_messages_per_connection
+        self.keepalive_seconds = keepalive_seconds
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _PooledConnection:
+        server = _TrackedSMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            try:
+                server.starttls()
+            except smtplib.SMTPNotSupportedError:
+                # Dev SMTP servers (MailHog, Mailtrap, etc.) often lack STARTTLS
+                logger.debug('STARTTLS not supported by SMTP server; continuing without TLS')
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        logger.debug(f"Opened SMTP connection to {self.host}:{self.port}")
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(conn: _PooledConnection):
+        try:
+            conn.server.quit()
+        except Exception:
+            try:
+                conn.server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        if time.monotonic() - conn.last_used < self.keepalive_seconds:
+            return True
+        try:
+            code, _ = conn.server.noop()
+            return code == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_alive(conn):
+                return conn
+            self._close(conn)
+
+    def _checkin(self, conn: _PooledConnection):
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= self.max_messages_per_connection:
+            self._close(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Yield a live `smtplib.SMTP`; broken sessions are discarded, not returned."""
+        conn = self._checkout()
+        try:
+            yield conn.server
+        except Exception as e:
+            if _is_connection_error(e):
+                self._close(conn)
+            else:
+                self._checkin(conn)
+            raise
+        else:
+            conn.messages_sent += 1
+            self._checkin(conn)
+
+    def send(self, from_addr: str, to_addrs, msg: str):
+        """Send one message, reconnecting once if the session was dropped before DATA."""
+        server = None
+        try:
+            with self.connection() as server:
+                server.data_started = False
+                return server.sendmail(from_addr, to_addrs, msg)
+        except Exception as e:
+            if not _is_connection_error(e) or getattr(server, "data_started", False):
+                raise
+            logger.info(f"SMTP connection lost ({e}); retrying on a fresh connection")
+        with self.connection() as server:
+            server.data_started = False
+            return server.sendmail(from_addr, to_addrs, msg)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Return the SMTP pool for this process, built from the app config.
+
+    Sockets must not be shared across a fork, so a pool inherited from a
+    parent process is discarded and rebuilt.
+    """
+    global _pool, _pool_pid
+    from flask import current_app
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            cfg = current_app.config
+            _pool = SMTPConnectionPool(
+                host=cfg.get("SMTP_SERVER", "localhost"),
+                port=cfg.get("SMTP_PORT", 587),
+                username=cfg.get("SMTP_USERNAME", ""),
+                password=cfg.get("SMTP_PASSWORD", ""),
+                use_tls=cfg.get("MAIL_USE_TLS", True),
+                timeout=cfg.get("SMTP_TIMEOUT", 10),
+                max_idle=cfg.get("SMTP_POOL_SIZE", 2),
+                max_messages_per_connection=cfg.get("SMTP_MAX_MESSAGES_PER_CONNECTION", 100),
+                keepalive_seconds=cfg.get("SMTP_KEEPALIVE_SECONDS", 30),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def send_email(from_addr: str, to_addrs, msg: str):
+    """Send a fully rendered message through the process SMTP pool."""
+    return get_smtp_pool().send(from_addr, to_addrs, msg)
+
+
+@worker_process_shutdown.connect
+def _close_pool_on_shutdown(**kwargs):
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close_all()